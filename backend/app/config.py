@@ -13,10 +13,56 @@ class Settings(BaseSettings):
     backend_port: int = 8888
     backend_cors_origins: str = "http://localhost:3000"
     log_level: str = "info"
+    server_drain_timeout: float = 60.0  # Seconds in-flight requests and export jobs get to finish on shutdown
+    metrics_enabled: bool = True       # Prometheus /metrics endpoint and instrumentation
 
     # PDF Generation - Maximum quality settings
     pdf_compression_quality: int = 98  # Maximum quality for best OCR (95+ is excellent)
     pdf_max_image_size: int = 5000     # Allow very large images for maximum detail
+    pdf_jpeg_passthrough: bool = True  # Embed qualifying JPEGs as-is instead of re-encoding
+    pdf_mode_aware_encoding: bool = True  # Store colorless pages as grayscale, B&W pages as 1-bit
+    pdf_min_ocr_quality: int = 60      # Lowest JPEG quality a size target may pick (keeps text OCR-able)
+
+    # PDF Worker Pool - keeps CPU-heavy exports off the event loop
+    pdf_executor: str = "process"      # "process", "thread" or "inline"
+    pdf_worker_processes: int = 0      # 0 = one worker per available CPU (affinity and cgroup quota)
+    pdf_worker_max_tasks: int = 200    # Pages a worker encodes before it is replaced (caps memory growth), 0 = never
+    pdf_worker_preload: bool = True    # Fork workers from a forkserver with Pillow/numpy/reportlab imported
+    pdf_max_pending_jobs: int = 8      # Exports in flight before new ones are rejected with 503
+    pdf_memory_budget_mb: int = 1024   # Memory for decoded pages across all exports, 0 = unlimited
+    pdf_admission_timeout: float = 10.0  # Seconds an export waits for memory before a 429
+    pdf_scratch_dir: str = ""          # Spooled uploads and temp files, empty = system temp dir
+    upload_spool_threshold: int = 1048576  # Multipart pages larger than this are spooled to disk
+    pdf_spool_max_memory: int = 8388608    # Generated PDFs larger than this are spooled to disk
+
+    # Encoded Page Cache - pages exported again with the same settings skip decoding and encoding
+    page_cache_memory_mb: int = 256    # 0 = no in-memory tier
+    page_cache_dir: str = ""           # On-disk tier shared across restarts, empty = memory only
+    page_cache_disk_mb: int = 2048
+
+    # Document Store - generated PDFs kept briefly so they can be downloaded or uploaded again by handle
+    document_ttl_seconds: int = 900
+    document_store_dir: str = ""       # Empty = "docuscan-documents" in the scratch dir
+    document_store_max_mb: int = 1024
+
+    # Request Profiling - admins can sample single /api/pdf and /api/paperless requests
+    profile_token: str = ""            # X-Profile-Token header value that enables it, empty = off
+    profile_interval_ms: float = 5.0   # Sampling interval
+    profile_dir: str = ""              # Empty = "profiles" next to the settings file
+    profile_max_files: int = 100       # Oldest profiles are deleted beyond this
+    profile_max_age_hours: int = 168
+
+    # Scan Sessions - pages are encoded in the background as they are captured
+    session_ttl_seconds: int = 3600    # Idle sessions are discarded after this
+    session_max_sessions: int = 20
+    session_max_pages: int = 200
+    session_max_mb: int = 512          # Encoded pages held across all sessions, 0 = unlimited
+
+    # Export Jobs - background generate+upload with status polling
+    job_workers: int = 2
+    job_max_queued: int = 20
+    job_retention_seconds: int = 3600  # Finished jobs stay queryable this long
+    job_admission_timeout_seconds: float = 300.0  # A job waiting for PDF capacity fails after this
 
     # Paperless-ngx
     paperless_enabled: bool = True
@@ -24,6 +70,26 @@ class Settings(BaseSettings):
     paperless_token: str = ""
     paperless_default_tags: str = "scanned,mobile"
 
+    # Paperless HTTP connection pool
+    paperless_timeout: float = 60.0
+    paperless_max_connections: int = 10
+    paperless_max_keepalive_connections: int = 5
+    paperless_keepalive_expiry: float = 30.0
+    paperless_http2: bool = False      # Requires the h2 package (httpx[http2])
+    paperless_max_clients: int = 8     # Pools kept for per-request URL/token overrides
+    paperless_metadata_ttl: int = 300  # Seconds before mirrored tags/correspondents/types are refreshed
+
+    # Paperless outbox - PDFs that couldn't be delivered are kept on disk and retried
+    outbox_enabled: bool = True
+    outbox_dir: str = ""               # Empty = "outbox" next to the settings file
+    outbox_max_items: int = 500
+    outbox_retry_base_delay: float = 10.0   # First retry after ~this many seconds, doubling each time
+    outbox_retry_max_delay: float = 900.0
+    outbox_max_age_seconds: int = 604800    # Give up (move to outbox/failed) after a week
+
+    # Storage sinks - every generated PDF can be written to several at once
+    storage_timeout: float = 120.0     # Per sink and document
+
     # WebDAV Storage
     webdav_enabled: bool = False
     webdav_url: str = ""
@@ -46,7 +112,8 @@ class Settings(BaseSettings):
     ftp_port: int = 21
     ftp_username: str = ""
     ftp_password: str = ""
-    ftp_tls: bool = False
+    ftp_tls: bool = False              # Explicit FTPS: AUTH TLS after connecting to FTP_PORT (usually 21)
+    ftp_tls_implicit: bool = False     # Implicit FTPS instead: TLS from the start (usually port 990)
     ftp_default_path: str = "/Scans/"
 
     @property
@@ -1,12 +1,42 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.routers import pdf, paperless, settings as settings_router
+from app.routers import jobs, pdf, paperless, sessions, storage, settings as settings_router
+from app.services.executor_service import get_executor, get_executor_status, shutdown_executor
+from app.services.job_service import get_job_status, start_job_workers, stop_job_workers
+from app.services.metrics_service import MetricsMiddleware, render_metrics
+from app.services.outbox_service import get_outbox_status, start_outbox, stop_outbox
+from app.services.page_cache_service import get_page_cache_status
+from app.services.profiling_service import ProfilingMiddleware, is_profiling_enabled
+from app.services.paperless_client import close_paperless_clients, open_paperless_clients
+from app.services.paperless_metadata import warm_metadata_mirror
+from app.services.storage_service import close_storage_sinks, get_enabled_sinks
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start shared resources on startup and release them on shutdown"""
+    # Create the PDF worker pool up front so the first export doesn't pay for it
+    get_executor()
+    open_paperless_clients()
+    warm_metadata_mirror()
+    start_job_workers()
+    start_outbox()
+    yield
+    # Requests in flight were already drained by the server (see app/server.py)
+    await stop_job_workers(settings.server_drain_timeout)
+    await stop_outbox()
+    await close_storage_sinks()
+    await close_paperless_clients()
+    shutdown_executor()
+
 
 app = FastAPI(
     title="Document Scanner API",
     description="Backend API for privacy-first document scanning application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS Configuration - Allow all origins for local network
@@ -16,11 +46,23 @@ app.add_middleware(
     allow_credentials=False,  # Must be False when allow_origins is ["*"]
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients read the handle of a stored document (/api/pdf/generate?store=true)
+    expose_headers=["X-Document-Handle", "X-Document-Expires"],
 )
 
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+# Not installed at all unless PROFILE_TOKEN is set
+if is_profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+
 # Register routers
 app.include_router(pdf.router)
 app.include_router(paperless.router)
+app.include_router(sessions.router)
+app.include_router(storage.router)
+app.include_router(jobs.router)
 app.include_router(settings_router.router)
 
 
@@ -32,10 +74,24 @@ async def health_check():
         "paperless_enabled": settings.paperless_enabled,
         "webdav_enabled": settings.webdav_enabled,
         "smb_enabled": settings.smb_enabled,
-        "ftp_enabled": settings.ftp_enabled
+        "ftp_enabled": settings.ftp_enabled,
+        "storage_sinks": get_enabled_sinks(),
+        "pdf_workers": get_executor_status(),
+        "page_cache": get_page_cache_status(),
+        "export_jobs": get_job_status(),
+        "paperless_outbox": get_outbox_status()
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: per-stage PDF and Paperless timings, request counts and bytes"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -46,12 +102,17 @@ async def root():
         "endpoints": {
             "pdf": "/api/pdf",
             "paperless": "/api/paperless",
+            "sessions": "/api/sessions",
+            "storage": "/api/storage",
+            "jobs": "/api/jobs",
             "settings": "/api/settings",
-            "health": "/health"
+            "health": "/health",
+            "metrics": "/metrics"
         }
     }
 
 
+# Development server with auto-reload; production runs `python -m app.server`
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException
+
+from app.services.job_service import JobNotFoundError, get_job
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}")
+async def job_status(job_id: str):
+    """
+    Get the status of a background export job
+
+    Returns:
+        Job stage (queued, generating, waiting, uploading, done, failed), progress,
+        per-stage timings and, once done, the result including the
+        Paperless task ID
+    """
+    try:
+        return get_job(job_id).to_dict()
+    except JobNotFoundError:
+        raise HTTPException(status_code=404, detail="Job not found")
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
+from typing import Callable, Dict, List, Optional, Union
 from pydantic import BaseModel
+import asyncio
 import base64
 
+from app.config import settings
 from app.services.paperless_service import (
     upload_to_paperless,
     get_paperless_tags,
@@ -10,62 +13,143 @@ from app.services.paperless_service import (
     get_paperless_document_types,
     test_paperless_connection
 )
-from app.services.pdf_service import generate_pdf_from_images
+from app.services.document_store_service import (
+    DocumentNotFoundError,
+    get_document,
+    open_document
+)
+from app.services.executor_service import PDFQueueFullError, PixelBudgetExceededError
+from app.services.job_service import ExportJob, JobQueueFullError, submit_job
+from app.services.outbox_service import (
+    OutboxFullError,
+    enqueue_upload,
+    get_outbox_items,
+    get_outbox_status,
+    is_outbox_running,
+    is_transient_error
+)
+from app.services.pdf_service import PageSource, PDFBuildResult, build_pdf
+from app.services.upload_service import read_multipart_pages
 
 router = APIRouter(prefix="/api/paperless", tags=["paperless"])
 
 
-class PaperlessUploadRequest(BaseModel):
-    images: List[str]  # Base64-encoded images
+class PaperlessDocumentMetadata(BaseModel):
     title: str
     tags: Optional[List[str]] = None
     correspondent: Optional[str] = None
     document_type: Optional[str] = None
-    compression_quality: Optional[int] = None
     paperless_url: Optional[str] = None  # Override URL from frontend
     paperless_token: Optional[str] = None  # Override token from frontend
 
 
+class PaperlessUploadRequest(PaperlessDocumentMetadata):
+    images: List[str] = []  # Base64-encoded images
+    document_handle: Optional[str] = None  # Or a PDF kept by /api/pdf/generate?store=true
+    compression_quality: Optional[int] = None
+    enhancement: Optional[Union[str, List[Optional[str]]]] = None  # One mode for all pages, or one per page
+    target_kb_per_page: Optional[int] = None  # Pick the JPEG quality per page to fit this size
+    target_total_kb: Optional[int] = None     # ... or this size for the whole document
+
+
 @router.post("/upload")
-async def upload_document(request: PaperlessUploadRequest):
+async def upload_document(request: PaperlessUploadRequest, background: bool = False):
     """
     Generate PDF and upload to Paperless-ngx
 
     Args:
-        request: PaperlessUploadRequest with images and metadata
+        request: PaperlessUploadRequest with images (or a document handle) and metadata
+        background: Return a job ID right away and do the work in the
+            background (poll GET /api/jobs/{id})
 
     Returns:
-        Upload result with document ID
+        Upload result with document ID, or the queued job
     """
     try:
-        if not request.images:
+        if not request.images and not request.document_handle:
             raise HTTPException(status_code=400, detail="No images provided")
 
-        # Generate PDF from images
-        pdf_bytes = await generate_pdf_from_images(
-            images_base64=request.images,
-            title=request.title,
-            compression_quality=request.compression_quality
+        if background:
+            if request.document_handle:
+                # Fail now rather than in the job if the handle is already gone
+                await get_document(request.document_handle)
+            return _submit_upload_job(request, request.images)
+
+        return await _generate_and_upload(request, request.images)
+    except HTTPException:
+        raise
+    except DocumentNotFoundError:
+        raise HTTPException(status_code=404, detail="Document not found or expired")
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    except PDFQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except PixelBudgetExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Upload failed: {str(e)}"
         )
 
-        # Upload to Paperless
-        result = await upload_to_paperless(
-            pdf_bytes=pdf_bytes,
-            title=request.title,
-            tags=request.tags,
-            correspondent=request.correspondent,
-            document_type=request.document_type,
-            paperless_url=request.paperless_url,
-            paperless_token=request.paperless_token
+
+@router.post("/upload-multipart")
+async def upload_document_multipart(request: Request, background: bool = False):
+    """
+    Generate PDF from pages uploaded as multipart/form-data and upload to Paperless-ngx
+
+    Every file part is one page, in order. Text fields mirror
+    PaperlessUploadRequest: title, tags (repeated or comma-separated),
+    correspondent, document_type, compression_quality, enhancement
+    (repeated or comma-separated), target_kb_per_page, target_total_kb,
+    paperless_url, paperless_token.
+
+    Args:
+        request: Incoming multipart request
+        background: Return a job ID right away and do the work in the
+            background (poll GET /api/jobs/{id})
+
+    Returns:
+        Upload result with document ID, or the queued job
+    """
+    upload = None
+    try:
+        upload = await read_multipart_pages(request)
+        if not upload.pages:
+            raise HTTPException(status_code=400, detail="No images provided")
+
+        tags = upload.field_list("tags")
+        metadata = PaperlessUploadRequest(
+            images=[],
+            title=upload.field("title") or "Scanned Document",
+            tags=tags or None,
+            correspondent=upload.field("correspondent") or None,
+            document_type=upload.field("document_type") or None,
+            compression_quality=upload.field("compression_quality") or None,
+            enhancement=upload.field_list("enhancement") or None,
+            target_kb_per_page=upload.field("target_kb_per_page") or None,
+            target_total_kb=upload.field("target_total_kb") or None,
+            paperless_url=upload.field("paperless_url") or None,
+            paperless_token=upload.field("paperless_token") or None
         )
 
-        return {
-            "success": True,
-            "message": "Document uploaded successfully to Paperless-ngx",
-            "document_id": result.get('id'),
-            "file_size_bytes": len(pdf_bytes),
-            "file_size_mb": round(len(pdf_bytes) / (1024 * 1024), 2)
-        }
+        if background:
+            # The job owns the spooled pages from here on
+            job = _submit_upload_job(metadata, upload.sources, cleanup=upload.cleanup)
+            upload = None
+            return job
+
+        return await _generate_and_upload(metadata, upload.sources)
+    except HTTPException:
+        raise
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    except PDFQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except PixelBudgetExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -73,6 +157,154 @@ async def upload_document(request: PaperlessUploadRequest):
             status_code=500,
             detail=f"Upload failed: {str(e)}"
         )
+    finally:
+        if upload is not None:
+            upload.cleanup()
+
+
+def _submit_upload_job(
+    request: PaperlessUploadRequest,
+    images: List[PageSource],
+    cleanup: Optional[Callable[[], None]] = None
+) -> JSONResponse:
+    """Queue generate+upload as a background job and answer 202 with its ID"""
+    async def run(job: ExportJob) -> Dict:
+        loop = asyncio.get_running_loop()
+        job.set_stage("generating")
+
+        # Wait for room in the PDF queue and memory budget instead of failing the job,
+        # but not forever: a waiting job holds one of the job workers
+        deadline = loop.time() + settings.job_admission_timeout_seconds
+        delay = 1.0
+        while True:
+            try:
+                pdf_result = await request_pdf(
+                    request,
+                    images,
+                    on_progress=lambda done, total: job.set_progress(0.9 * done / total)
+                )
+                break
+            except (PDFQueueFullError, PixelBudgetExceededError) as e:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"No capacity to generate the PDF within "
+                        f"{settings.job_admission_timeout_seconds:g}s: {e}"
+                    )
+                if job.stage != "waiting":
+                    job.set_stage("waiting")
+                if isinstance(e, PixelBudgetExceededError):
+                    wait = e.retry_after
+                else:
+                    wait = delay
+                    delay = min(delay * 2, 10.0)
+                await asyncio.sleep(min(wait, remaining))
+                job.set_stage("generating")
+
+        job.set_stage("uploading")
+        result = await upload_pdf_result(request, pdf_result)
+        result["paperless_task_id"] = result.get("document_id")
+        return result
+
+    job = submit_job("paperless", run, cleanup=cleanup)
+    return JSONResponse(
+        status_code=202,
+        content={**job.to_dict(), "status_url": f"/api/jobs/{job.id}"}
+    )
+
+
+async def _generate_and_upload(request: PaperlessUploadRequest, images: List[PageSource]) -> Dict:
+    """Generate the PDF for an upload request and send it to Paperless-ngx"""
+    pdf_result = await request_pdf(request, images)
+    return await upload_pdf_result(request, pdf_result)
+
+
+async def request_pdf(
+    request: PaperlessUploadRequest,
+    images: List[PageSource],
+    on_progress: Optional[Callable[[int, int], None]] = None
+) -> PDFBuildResult:
+    """
+    Generate the PDF for an upload request, or open the stored one it refers to
+
+    Raises:
+        DocumentNotFoundError: If document_handle is unknown or has expired
+    """
+    if request.document_handle:
+        return await open_document(request.document_handle)
+
+    return await build_pdf(
+        images=images,
+        title=request.title,
+        compression_quality=request.compression_quality,
+        on_progress=on_progress,
+        enhancement=request.enhancement,
+        target_kb_per_page=request.target_kb_per_page,
+        target_total_kb=request.target_total_kb
+    )
+
+
+async def upload_pdf_result(metadata: PaperlessDocumentMetadata, pdf_result: PDFBuildResult) -> Dict:
+    """
+    Send a generated PDF to Paperless-ngx and build the API response
+
+    If Paperless is unreachable or overloaded, the PDF is put in the outbox
+    and delivered later; the response then has queued=True and no document ID.
+
+    Args:
+        metadata: Title, tags and connection overrides for the document
+        pdf_result: Generated PDF (closed afterwards)
+
+    Returns:
+        Upload result with document ID and generation stats
+    """
+    document = dict(
+        title=metadata.title,
+        tags=metadata.tags,
+        correspondent=metadata.correspondent,
+        document_type=metadata.document_type,
+        paperless_url=metadata.paperless_url,
+        paperless_token=metadata.paperless_token
+    )
+    outbox_item = None
+    try:
+        # Upload to Paperless
+        try:
+            result = await upload_to_paperless(pdf=pdf_result.file, **document)
+        except Exception as e:
+            if not (is_outbox_running() and is_transient_error(e)):
+                raise
+            print(f"Warning: Paperless-ngx upload failed, queueing document for retry: {e}")
+            try:
+                outbox_item = await enqueue_upload(pdf_result.file, error=e, **document)
+            except OutboxFullError as full:
+                raise OutboxFullError(f"{e} ({full}, document not queued)") from e
+            result = {}
+    finally:
+        pdf_result.close()
+
+    return {
+        "success": True,
+        "message": (
+            "Paperless-ngx is unavailable, document queued for delivery"
+            if outbox_item else "Document uploaded successfully to Paperless-ngx"
+        ),
+        "document_id": result.get('id'),
+        "queued": outbox_item is not None,
+        "outbox_id": outbox_item.id if outbox_item else None,
+        "file_size_bytes": pdf_result.size,
+        "file_size_mb": round(pdf_result.size / (1024 * 1024), 2),
+        "page_count": pdf_result.page_count,
+        "skipped_pages": pdf_result.skipped_page_numbers,
+        "passthrough_pages": pdf_result.passthrough_pages,
+        "grayscale_pages": pdf_result.grayscale_pages,
+        "bitonal_pages": pdf_result.bitonal_pages,
+        "cached_pages": pdf_result.cached_pages,
+        "enhancements": pdf_result.page_enhancements,
+        "page_qualities": pdf_result.page_qualities,
+        "timings_ms": pdf_result.timings,
+        "parallel_speedup": pdf_result.speedup
+    }
 
 
 @router.get("/tags")
@@ -129,6 +361,17 @@ async def list_document_types():
         )
 
 
+@router.get("/outbox")
+async def list_outbox():
+    """
+    Get documents waiting for delivery to Paperless-ngx
+
+    Returns:
+        Outbox status (depth, oldest item age) and the queued items
+    """
+    return {**get_outbox_status(), "items": get_outbox_items()}
+
+
 @router.get("/test-connection")
 async def test_connection():
     """
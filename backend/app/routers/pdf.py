@@ -1,14 +1,24 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
-import io
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
+from app.services.document_store_service import (
+    DocumentNotFoundError,
+    StoredPDF,
+    delete_document,
+    get_document,
+    open_document,
+    store_document
+)
+from app.services.executor_service import PDFQueueFullError, PixelBudgetExceededError
 from app.services.pdf_service import (
-    generate_pdf_from_images,
-    get_pdf_file_size,
-    estimate_pdf_size
+    PDFBuildResult,
+    build_pdf,
+    estimate_pdf_size,
+    estimate_pdf_size_from_pages
 )
+from app.services.upload_service import read_multipart_pages
 
 router = APIRouter(prefix="/api/pdf", tags=["pdf"])
 
@@ -17,20 +27,30 @@ class PDFGenerateRequest(BaseModel):
     images: List[str]  # Base64-encoded images
     title: str = "Scanned Document"
     compression_quality: int | None = None
+    enhancement: str | List[Optional[str]] | None = None  # One mode for all pages, or one per page
+    target_kb_per_page: int | None = None  # Pick the JPEG quality per page to fit this size
+    target_total_kb: int | None = None     # ... or this size for the whole document
 
 
 class PDFEstimateRequest(BaseModel):
-    num_pages: int
+    num_pages: int | None = None  # Defaults to the number of images
     compression_quality: int = 85
+    images: List[str] = []  # Base64-encoded sample pages and/or thumbnails
+    enhancement: str | List[Optional[str]] | None = None
+    page_width: int | None = None   # Full-resolution page size the thumbnails were made from,
+    page_height: int | None = None  # defaults to the largest image
 
 
 @router.post("/generate")
-async def generate_pdf(request: PDFGenerateRequest):
+async def generate_pdf(request: PDFGenerateRequest, store: bool = False):
     """
     Generate a PDF from a list of base64-encoded images
 
     Args:
         request: PDFGenerateRequest with images and metadata
+        store: Also keep the PDF on the server for DOCUMENT_TTL_SECONDS; the
+            X-Document-Handle header can then be passed to the upload
+            endpoints or GET /api/pdf/documents/{handle} instead of the pages
 
     Returns:
         PDF file as streaming response
@@ -40,51 +60,229 @@ async def generate_pdf(request: PDFGenerateRequest):
             raise HTTPException(status_code=400, detail="No images provided")
 
         # Generate PDF
-        pdf_bytes = await generate_pdf_from_images(
-            images_base64=request.images,
+        result = await build_pdf(
+            images=request.images,
             title=request.title,
-            compression_quality=request.compression_quality
+            compression_quality=request.compression_quality,
+            enhancement=request.enhancement,
+            target_kb_per_page=request.target_kb_per_page,
+            target_total_kb=request.target_total_kb
         )
 
-        # Get file size
-        file_size = get_pdf_file_size(pdf_bytes)
-
-        # Return as streaming response
-        return StreamingResponse(
-            io.BytesIO(pdf_bytes),
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f'attachment; filename="{request.title}.pdf"',
-                "Content-Length": str(file_size),
-                "X-File-Size": str(file_size)
-            }
+        document = await _store_result(result, request.title) if store else None
+        return pdf_response(result, request.title, document)
+    except HTTPException:
+        raise
+    except PDFQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except PixelBudgetExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"PDF generation failed: {str(e)}")
+
+
+@router.post("/generate-multipart")
+async def generate_pdf_multipart(request: Request, store: bool = False):
+    """
+    Generate a PDF from pages uploaded as multipart/form-data
+
+    Every file part is one page, in order. Optional text fields: title,
+    compression_quality, enhancement (one mode, or one per page repeated or
+    comma-separated), target_kb_per_page, target_total_kb. Avoids the base64/JSON overhead of /generate.
+
+    Args:
+        request: Incoming multipart request
+        store: Also keep the PDF on the server under a handle (see /generate)
+
+    Returns:
+        PDF file as streaming response
+    """
+    upload = None
+    try:
+        upload = await read_multipart_pages(request)
+        if not upload.pages:
+            raise HTTPException(status_code=400, detail="No images provided")
+
+        metadata = PDFGenerateRequest(
+            images=[],
+            title=upload.field("title") or "Scanned Document",
+            compression_quality=upload.field("compression_quality") or None,
+            enhancement=upload.field_list("enhancement") or None,
+            target_kb_per_page=upload.field("target_kb_per_page") or None,
+            target_total_kb=upload.field("target_total_kb") or None
         )
+
+        # Generate PDF
+        result = await build_pdf(
+            images=upload.sources,
+            title=metadata.title,
+            compression_quality=metadata.compression_quality,
+            enhancement=metadata.enhancement,
+            target_kb_per_page=metadata.target_kb_per_page,
+            target_total_kb=metadata.target_total_kb
+        )
+
+        document = await _store_result(result, metadata.title) if store else None
+        return pdf_response(result, metadata.title, document)
+    except HTTPException:
+        raise
+    except PDFQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except PixelBudgetExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"PDF generation failed: {str(e)}")
+    finally:
+        if upload is not None:
+            upload.cleanup()
+
+
+async def _store_result(result: PDFBuildResult, title: str) -> StoredPDF:
+    """Keep a generated PDF in the document store, closing it if that fails"""
+    try:
+        return await store_document(result, title)
+    except BaseException:
+        result.close()
+        raise
+
+
+@router.get("/documents/{handle}")
+async def download_document(handle: str):
+    """
+    Download a PDF kept by /generate?store=true again
+
+    Args:
+        handle: Document handle from the X-Document-Handle header
+
+    Returns:
+        PDF file as streaming response
+    """
+    try:
+        document = await get_document(handle)
+        result = await open_document(handle)
+    except DocumentNotFoundError:
+        raise HTTPException(status_code=404, detail="Document not found or expired")
+
+    return pdf_response(result, document.title, document)
+
+
+@router.delete("/documents/{handle}")
+async def discard_document(handle: str):
+    """
+    Remove a stored PDF before it expires
+
+    Args:
+        handle: Document handle from the X-Document-Handle header
+    """
+    try:
+        await delete_document(handle)
+    except DocumentNotFoundError:
+        raise HTTPException(status_code=404, detail="Document not found or expired")
+
+    return {"success": True}
+
+
+def pdf_response(result: PDFBuildResult, title: str, document: Optional[StoredPDF] = None) -> StreamingResponse:
+    """Stream a generated PDF from its temp file, with generation stats as headers"""
+    file_size = result.size
+    headers = {}
+    if document is not None:
+        headers["X-Document-Handle"] = document.handle
+        headers["X-Document-Expires"] = str(int(document.expires_at))
+
+    # Return as streaming response (closes the temp file when done)
+    return StreamingResponse(
+        result.iter_chunks(),
+        media_type="application/pdf",
+        headers={
+            **headers,
+            "Content-Disposition": f'attachment; filename="{title}.pdf"',
+            "Content-Length": str(file_size),
+            "X-File-Size": str(file_size),
+            "X-Page-Count": str(result.page_count),
+            "X-Passthrough-Pages": str(result.passthrough_pages),
+            "X-Grayscale-Pages": str(result.grayscale_pages),
+            "X-Bitonal-Pages": str(result.bitonal_pages),
+            "X-Cached-Pages": str(result.cached_pages),
+            "X-Skipped-Pages": ",".join(str(number) for number in result.skipped_page_numbers),
+            "X-Page-Enhancements": ",".join(mode or "skipped" for mode in result.page_enhancements),
+            "X-Page-Qualities": ",".join(str(quality or "") for quality in result.page_qualities),
+            "X-PDF-Workers": str(result.workers),
+            "X-PDF-Speedup": str(result.speedup),
+            "Server-Timing": result.server_timing()
+        }
+    )
 
 
 @router.post("/estimate-size")
 async def estimate_size(request: PDFEstimateRequest):
     """
-    Estimate PDF file size based on number of pages
+    Estimate PDF file size
+
+    With images, pages are trial-encoded: full-resolution samples are
+    measured on a few strips, thumbnails are scaled up (and calibrated
+    against any full-resolution samples sent along). Without images, falls
+    back to a per-page rule of thumb.
 
     Args:
-        request: PDFEstimateRequest with num_pages and compression_quality
+        request: PDFEstimateRequest with images and/or num_pages
 
     Returns:
-        Estimated file size in bytes
+        Estimated file size in bytes, per image and in total
     """
+    compression_quality = request.compression_quality
     try:
-        estimated_size = estimate_pdf_size(
+        if not request.images:
+            if not request.num_pages:
+                raise HTTPException(status_code=400, detail="Provide images or num_pages")
+
+            estimated_size = estimate_pdf_size(
+                num_pages=request.num_pages,
+                compression_quality=compression_quality
+            )
+            return {
+                "estimated_size_bytes": estimated_size,
+                "estimated_size_mb": round(estimated_size / (1024 * 1024), 2),
+                "num_pages": request.num_pages,
+                "compression_quality": compression_quality,
+                "method": "heuristic"
+            }
+
+        page_size = None
+        if request.page_width and request.page_height:
+            page_size = (request.page_width, request.page_height)
+
+        estimate = await estimate_pdf_size_from_pages(
+            images=request.images,
             num_pages=request.num_pages,
-            compression_quality=request.compression_quality
+            compression_quality=compression_quality,
+            enhancement=request.enhancement,
+            page_size=page_size
         )
-
         return {
-            "estimated_size_bytes": estimated_size,
-            "estimated_size_mb": round(estimated_size / (1024 * 1024), 2),
-            "num_pages": request.num_pages,
-            "compression_quality": request.compression_quality
+            "estimated_size_bytes": estimate.size,
+            "estimated_size_mb": round(estimate.size / (1024 * 1024), 2),
+            "num_pages": estimate.num_pages,
+            "compression_quality": compression_quality,
+            "method": "measured",
+            "page_sizes_bytes": estimate.page_sizes,
+            "enhancements": estimate.page_enhancements,
+            "measured_pages": estimate.measured_pages,
+            "thumbnail_pages": estimate.thumbnail_pages,
+            "thumbnail_calibration": estimate.calibration,
+            "elapsed_ms": estimate.elapsed_ms
         }
+    except HTTPException:
+        raise
+    except PDFQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except PixelBudgetExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Estimation failed: {str(e)}")
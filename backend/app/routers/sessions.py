@@ -0,0 +1,205 @@
+from fastapi import APIRouter, HTTPException, Request
+from typing import List, Optional
+from pydantic import BaseModel
+
+from app.routers.paperless import PaperlessDocumentMetadata, upload_pdf_result
+from app.routers.pdf import pdf_response
+from app.services.executor_service import PDFQueueFullError, PixelBudgetExceededError
+from app.services.session_service import (
+    SessionLimitError,
+    SessionMemoryError,
+    SessionNotFoundError,
+    create_session,
+    delete_page,
+    delete_session,
+    finalize_session,
+    get_session,
+    put_page,
+    reorder_pages
+)
+
+router = APIRouter(prefix="/api/sessions", tags=["sessions"])
+
+
+class SessionCreateRequest(BaseModel):
+    title: str = "Scanned Document"
+    compression_quality: Optional[int] = None
+    enhancement: Optional[str] = None  # Default mode for pages: color, grayscale, bw, enhanced
+    target_kb_per_page: Optional[int] = None  # Pick the JPEG quality per page to fit this size
+
+
+class SessionReorderRequest(BaseModel):
+    order: List[int]  # Page numbers in the new order
+
+
+class SessionPaperlessRequest(PaperlessDocumentMetadata):
+    title: Optional[str] = None  # Defaults to the session title
+
+
+@router.post("")
+async def start_session(request: SessionCreateRequest):
+    """
+    Start a scan session that encodes pages as they are captured
+
+    Args:
+        request: SessionCreateRequest with title, compression quality, enhancement
+            and size target
+
+    Returns:
+        Session ID and current state
+    """
+    try:
+        session = create_session(
+            request.title,
+            request.compression_quality,
+            request.enhancement,
+            request.target_kb_per_page
+        )
+        return session.to_dict()
+    except SessionLimitError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{session_id}")
+async def session_status(session_id: str):
+    """
+    Get the pages of a session and their encoding status
+
+    Returns:
+        Session state with per-page status (processing, ready, failed)
+    """
+    try:
+        return get_session(session_id).to_dict()
+    except SessionNotFoundError:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+
+@router.put("/{session_id}/pages/{page_number}", status_code=202)
+async def upload_page(session_id: str, page_number: int, request: Request, enhancement: Optional[str] = None):
+    """
+    Upload page N as a raw image body (e.g. Content-Type: image/jpeg)
+
+    Encoding starts immediately in the background. Uploading an existing
+    page number replaces that page.
+
+    Args:
+        enhancement: Enhancement mode for this page, defaults to the session's
+
+    Returns:
+        Page status
+    """
+    try:
+        data = await request.body()
+        if not data:
+            raise HTTPException(status_code=400, detail="No image provided")
+
+        page = await put_page(session_id, page_number, data, enhancement)
+        return {
+            "page": page.number,
+            "status": page.status,
+            "received_bytes": page.received_bytes,
+            "enhancement": page.enhancement
+        }
+    except HTTPException:
+        raise
+    except SessionNotFoundError:
+        raise HTTPException(status_code=404, detail="Session not found")
+    except PixelBudgetExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except SessionMemoryError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/{session_id}/pages/{page_number}")
+async def remove_page(session_id: str, page_number: int):
+    """Delete page N from a session"""
+    try:
+        delete_page(session_id, page_number)
+        return {"success": True}
+    except SessionNotFoundError:
+        raise HTTPException(status_code=404, detail="Page not found")
+
+
+@router.put("/{session_id}/order")
+async def set_page_order(session_id: str, request: SessionReorderRequest):
+    """
+    Reorder the pages of a session
+
+    Args:
+        request: SessionReorderRequest listing every page number once
+
+    Returns:
+        Session state in the new order
+    """
+    try:
+        return reorder_pages(session_id, request.order).to_dict()
+    except SessionNotFoundError:
+        raise HTTPException(status_code=404, detail="Session not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/{session_id}")
+async def discard_session(session_id: str):
+    """Discard a session and all of its pages"""
+    try:
+        delete_session(session_id)
+        return {"success": True}
+    except SessionNotFoundError:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+
+@router.post("/{session_id}/pdf")
+async def finalize_to_pdf(session_id: str):
+    """
+    Assemble the session's pages into a PDF download
+
+    Returns:
+        PDF file as streaming response
+    """
+    try:
+        result = await finalize_session(session_id)
+        return pdf_response(result, get_session(session_id).title)
+    except SessionNotFoundError:
+        raise HTTPException(status_code=404, detail="Session not found")
+    except PDFQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"PDF generation failed: {str(e)}")
+
+
+@router.post("/{session_id}/paperless")
+async def finalize_to_paperless(session_id: str, request: SessionPaperlessRequest):
+    """
+    Assemble the session's pages into a PDF and upload it to Paperless-ngx
+
+    Args:
+        request: SessionPaperlessRequest with tags and connection overrides
+
+    Returns:
+        Upload result with document ID
+    """
+    try:
+        session = get_session(session_id)
+        if request.title is None:
+            request.title = session.title
+
+        result = await finalize_session(session_id)
+        return await upload_pdf_result(request, result)
+    except SessionNotFoundError:
+        raise HTTPException(status_code=404, detail="Session not found")
+    except PDFQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Upload failed: {str(e)}"
+        )
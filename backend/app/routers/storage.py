@@ -0,0 +1,90 @@
+from fastapi import APIRouter, HTTPException
+from typing import List, Optional
+
+from app.routers.paperless import PaperlessUploadRequest, request_pdf
+from app.services.document_store_service import DocumentNotFoundError
+from app.services.executor_service import PDFQueueFullError, PixelBudgetExceededError
+from app.services.storage_service import get_enabled_sinks, resolve_sinks, store_pdf
+
+router = APIRouter(prefix="/api/storage", tags=["storage"])
+
+
+class StorageUploadRequest(PaperlessUploadRequest):
+    sinks: Optional[List[str]] = None  # paperless, webdav, ftp, smb; defaults to every enabled sink
+
+
+@router.get("/sinks")
+async def list_sinks():
+    """
+    Get the storage sinks that are enabled and configured
+
+    Returns:
+        List of sink names
+    """
+    return {"sinks": get_enabled_sinks()}
+
+
+@router.post("/upload")
+async def upload_to_sinks(request: StorageUploadRequest):
+    """
+    Generate PDF and store it in every requested sink at once
+
+    Args:
+        request: StorageUploadRequest with images (or a document handle), metadata and sink names
+
+    Returns:
+        Per-sink results (location or error, elapsed time) and PDF stats
+    """
+    try:
+        if not request.images and not request.document_handle:
+            raise HTTPException(status_code=400, detail="No images provided")
+
+        # Reject unknown or disabled sinks before paying for the PDF
+        resolve_sinks(request.sinks)
+
+        pdf_result = await request_pdf(request, request.images)
+        try:
+            results = await store_pdf(
+                pdf_result,
+                title=request.title,
+                tags=request.tags,
+                correspondent=request.correspondent,
+                document_type=request.document_type,
+                paperless_url=request.paperless_url,
+                paperless_token=request.paperless_token,
+                sinks=request.sinks
+            )
+        finally:
+            pdf_result.close()
+
+        if not any(result.success for result in results):
+            raise HTTPException(
+                status_code=502,
+                detail=[result.to_dict() for result in results]
+            )
+
+        return {
+            "success": all(result.success for result in results),
+            "results": [result.to_dict() for result in results],
+            "file_size_bytes": pdf_result.size,
+            "page_count": pdf_result.page_count,
+            "skipped_pages": pdf_result.skipped_page_numbers,
+            "enhancements": pdf_result.page_enhancements,
+            "page_qualities": pdf_result.page_qualities,
+            "timings_ms": pdf_result.timings
+        }
+    except HTTPException:
+        raise
+    except DocumentNotFoundError:
+        raise HTTPException(status_code=404, detail="Document not found or expired")
+    except PDFQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except PixelBudgetExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Storage upload failed: {str(e)}"
+        )
@@ -0,0 +1,51 @@
+"""
+Production server: python -m app.server
+
+Runs a single uvicorn process. Sessions, export jobs, the outbox and the
+PDF memory budget live in this process's memory, so several server workers
+would each see only part of them (and deliver the outbox twice); CPU-bound
+work scales through the PDF worker pool instead, sized from the CPUs and
+cgroup quota available to the container.
+"""
+import importlib.util
+import uvicorn
+from app.config import settings
+# Importing the app loads FastAPI, Pillow, numpy and reportlab before the
+# server starts, so the first request doesn't pay for them
+from app.main import app
+from app.services.executor_service import get_available_cpus, get_worker_count
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def main() -> None:
+    # uvloop and httptools are C implementations of the event loop and HTTP
+    # parser; fall back to the pure-Python ones where they aren't installed
+    loop = "uvloop" if _installed("uvloop") else "asyncio"
+    http = "httptools" if _installed("httptools") else "h11"
+
+    if settings.pdf_executor == "process":
+        pool = f"{get_worker_count()} PDF worker process(es) of {get_available_cpus()} CPU(s)"
+    else:
+        pool = f"{settings.pdf_executor} PDF executor"
+    print(f"Starting DocuScan backend on {settings.backend_host}:{settings.backend_port} ({loop}, {http}, {pool})")
+
+    # On SIGTERM uvicorn stops accepting connections, gives in-flight
+    # requests SERVER_DRAIN_TIMEOUT seconds to finish, then runs the
+    # lifespan shutdown, which drains export jobs for as long again
+    uvicorn.run(
+        app,
+        host=settings.backend_host,
+        port=settings.backend_port,
+        loop=loop,
+        http=http,
+        log_level=settings.log_level,
+        proxy_headers=True,
+        timeout_graceful_shutdown=settings.server_drain_timeout
+    )
+
+
+if __name__ == "__main__":
+    main()
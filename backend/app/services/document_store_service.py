@@ -0,0 +1,260 @@
+import asyncio
+import json
+import os
+import re
+import secrets
+import shutil
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+from app.config import settings
+from app.services.pdf_service import PDFBuildResult
+from app.services.upload_service import get_scratch_dir
+
+# Handles are unguessable tokens, so holding one is what grants access to the document
+_HANDLE_PATTERN = re.compile(r"^[A-Za-z0-9_-]{22}$")
+
+
+class DocumentNotFoundError(KeyError):
+    """Raised when a document handle is unknown or has expired"""
+
+
+@dataclass
+class StoredPDF:
+    """A generated PDF kept on disk for a while, persisted as <handle>.json next to <handle>.pdf"""
+    handle: str
+    title: str
+    size: int
+    created_at: float
+    expires_at: float
+    page_count: int = 0
+    skipped_pages: List[int] = field(default_factory=list)
+    passthrough_pages: int = 0
+    grayscale_pages: int = 0
+    bitonal_pages: int = 0
+    cached_pages: int = 0
+    page_enhancements: List[Optional[str]] = field(default_factory=list)
+    page_qualities: List[Optional[int]] = field(default_factory=list)
+    page_numbers: Optional[List[int]] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "document_handle": self.handle,
+            "title": self.title,
+            "file_size_bytes": self.size,
+            "page_count": self.page_count,
+            "created_at": self.created_at,
+            "expires_at": self.expires_at,
+            "download_url": f"/api/pdf/documents/{self.handle}"
+        }
+
+
+def get_document_dir() -> Path:
+    """
+    DOCUMENT_STORE_DIR, or 'docuscan-documents' in the scratch directory
+
+    The default lives in the shared temp dir, so the directory must be
+    owned by this process and closed to everyone else; otherwise another
+    local user could list or read the stored scans.
+    """
+    if settings.document_store_dir:
+        path = Path(settings.document_store_dir)
+    else:
+        path = Path(get_scratch_dir() or tempfile.gettempdir()) / "docuscan-documents"
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    info = path.stat()
+    if info.st_uid != os.getuid():
+        raise PermissionError(f"Document store {path} is owned by another user")
+    if info.st_mode & 0o077:
+        os.chmod(path, 0o700)
+    return path
+
+
+def _open_private(path: Path, mode: str):
+    """Open a file for writing that only the owner can read; documents are scanned originals"""
+    return os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), mode)
+
+
+def _paths(handle: str) -> tuple:
+    directory = get_document_dir()
+    return directory / f"{handle}.pdf", directory / f"{handle}.json"
+
+
+def _remove(handle: str) -> None:
+    for path in _paths(handle):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _read_meta(path: Path) -> Optional[StoredPDF]:
+    try:
+        return StoredPDF(**json.loads(path.read_text()))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _prune(incoming: int = 0) -> None:
+    """
+    Delete expired documents, then the oldest ones while the store is over DOCUMENT_STORE_MAX_MB
+
+    The store lives on disk only, so every process sharing the directory
+    sees the same documents.
+    """
+    now = time.time()
+    directory = get_document_dir()
+    documents = []
+    for meta_path in directory.glob("*.json"):
+        document = _read_meta(meta_path)
+        if document is None or document.expires_at <= now:
+            _remove(meta_path.stem)
+        else:
+            documents.append(document)
+
+    # PDFs without metadata and leftover .tmp files are interrupted writes (or being written right now)
+    orphans = [p for p in directory.glob("*.pdf") if not p.with_suffix(".json").exists()]
+    for path in orphans + list(directory.glob("*.tmp")):
+        try:
+            if now - path.stat().st_mtime > settings.document_ttl_seconds:
+                path.unlink()
+        except OSError:
+            pass
+
+    budget = settings.document_store_max_mb * 1024 * 1024 - incoming
+    total = sum(document.size for document in documents)
+    for document in sorted(documents, key=lambda d: d.created_at):
+        if total <= budget:
+            break
+        _remove(document.handle)
+        total -= document.size
+
+
+def _store(pdf_result: PDFBuildResult, title: str) -> StoredPDF:
+    _prune(incoming=pdf_result.size)
+
+    now = time.time()
+    document = StoredPDF(
+        handle=secrets.token_urlsafe(16),
+        title=title,
+        size=pdf_result.size,
+        created_at=now,
+        expires_at=now + settings.document_ttl_seconds,
+        page_count=pdf_result.page_count,
+        skipped_pages=pdf_result.skipped_pages,
+        passthrough_pages=pdf_result.passthrough_pages,
+        grayscale_pages=pdf_result.grayscale_pages,
+        bitonal_pages=pdf_result.bitonal_pages,
+        cached_pages=pdf_result.cached_pages,
+        page_enhancements=pdf_result.page_enhancements,
+        page_qualities=pdf_result.page_qualities,
+        page_numbers=pdf_result.page_numbers
+    )
+
+    pdf_path, meta_path = _paths(document.handle)
+    tmp = pdf_path.with_suffix(".pdf.tmp")
+    position = pdf_result.file.tell()
+    try:
+        pdf_result.file.seek(0)
+        with _open_private(tmp, "wb") as f:
+            shutil.copyfileobj(pdf_result.file, f)
+    finally:
+        pdf_result.file.seek(position)
+    os.replace(tmp, pdf_path)
+
+    # A document exists once its metadata is in place
+    tmp = meta_path.with_suffix(".json.tmp")
+    with _open_private(tmp, "w") as f:
+        f.write(json.dumps(asdict(document)))
+    os.replace(tmp, meta_path)
+    return document
+
+
+def _get(handle: str) -> StoredPDF:
+    if not _HANDLE_PATTERN.match(handle):
+        raise DocumentNotFoundError(handle)
+
+    pdf_path, meta_path = _paths(handle)
+    document = _read_meta(meta_path)
+    if document is None or not pdf_path.exists():
+        raise DocumentNotFoundError(handle)
+    if document.expires_at <= time.time():
+        _remove(handle)
+        raise DocumentNotFoundError(handle)
+    return document
+
+
+async def store_document(pdf_result: PDFBuildResult, title: str) -> StoredPDF:
+    """
+    Keep a generated PDF on disk for DOCUMENT_TTL_SECONDS under a new handle
+
+    The PDF can then be downloaded again or uploaded (to Paperless or the
+    storage sinks) by handle, without re-sending or re-encoding the pages.
+
+    Args:
+        pdf_result: Generated PDF (left open, its read position is kept)
+        title: Document title
+
+    Returns:
+        StoredPDF with the handle and expiry time
+    """
+    return await asyncio.to_thread(_store, pdf_result, title)
+
+
+async def get_document(handle: str) -> StoredPDF:
+    """
+    Look up a stored document
+
+    Raises:
+        DocumentNotFoundError: If the handle is unknown or has expired
+    """
+    return await asyncio.to_thread(_get, handle)
+
+
+async def open_document(handle: str) -> PDFBuildResult:
+    """
+    Open a stored document as a PDFBuildResult, as if it had just been generated
+
+    Timings are empty since nothing was generated. Close the result when
+    done; the document itself stays in the store until it expires.
+
+    Raises:
+        DocumentNotFoundError: If the handle is unknown or has expired
+    """
+    document = await get_document(handle)
+    pdf_path, _ = _paths(handle)
+    try:
+        file = await asyncio.to_thread(open, pdf_path, "rb")
+    except FileNotFoundError:
+        raise DocumentNotFoundError(handle)
+
+    return PDFBuildResult(
+        file=file,
+        size=document.size,
+        page_count=document.page_count,
+        skipped_pages=document.skipped_pages,
+        passthrough_pages=document.passthrough_pages,
+        grayscale_pages=document.grayscale_pages,
+        bitonal_pages=document.bitonal_pages,
+        cached_pages=document.cached_pages,
+        page_enhancements=document.page_enhancements,
+        page_qualities=document.page_qualities,
+        timings={},
+        workers=0,
+        speedup=0.0,
+        page_numbers=document.page_numbers
+    )
+
+
+async def delete_document(handle: str) -> None:
+    """
+    Remove a stored document before it expires
+
+    Raises:
+        DocumentNotFoundError: If the handle is unknown or has expired
+    """
+    await get_document(handle)
+    await asyncio.to_thread(_remove, handle)
@@ -0,0 +1,177 @@
+from typing import List, Optional, Tuple, Union
+import numpy as np
+from PIL import Image, ImageFilter
+
+# Same modes as the frontend's utils/imageEnhancement.ts; "auto" picks one per page
+ENHANCEMENT_MODES = ("auto", "color", "grayscale", "bw", "enhanced")
+
+# Per-document mode, or one mode per page (None = color)
+EnhancementSpec = Union[str, List[Optional[str]], None]
+
+# OpenCV's sigma for a given kernel size when sigma=0 is passed: 0.3 * ((k - 1) / 2 - 1) + 0.8
+_BLUR_SIGMA = 1.1       # GaussianBlur 5x5
+_THRESHOLD_SIGMA = 2.0  # adaptiveThreshold block size 11
+_THRESHOLD_C = 2
+
+_SHARPEN_KERNEL = ImageFilter.Kernel((3, 3), [0, -1, 0, -1, 5, -1, 0, -1, 0], scale=1)
+
+# Auto detection runs on a copy downsampled to about this many pixels on the long side;
+# large enough that text strokes survive as dark pixels
+DETECT_SIZE = 512
+# Share of clearly colored pixels (saturation and brightness both high) that keeps a page in color
+COLOR_PIXEL_SATURATION = 80
+COLOR_PIXEL_VALUE = 60
+COLOR_FRACTION = 0.05
+# 5th-95th percentile luminance spread below which a page is too flat and gets "enhanced"
+LOW_CONTRAST_SPREAD = 90
+# Blur used to estimate the paper background, so shadows and uneven lighting don't hide text
+BACKGROUND_SIGMA = 12
+# Otsu separability (between-class / total variance) above which a page is two-tone text
+BIMODAL_SEPARABILITY = 0.8
+# ... as long as the dark class (ink) is a plausible share of the page
+MIN_INK_FRACTION = 0.02
+MAX_INK_FRACTION = 0.4
+
+
+def resolve_page_modes(enhancement: EnhancementSpec, page_count: int) -> List[str]:
+    """
+    Expand a per-document or per-page enhancement spec to one mode per page
+
+    A single mode, or a list with just one, applies to every page.
+
+    Raises:
+        ValueError: If a mode is unknown or the per-page list has the wrong length
+    """
+    if enhancement is not None and not isinstance(enhancement, str) and len(enhancement) == 1:
+        enhancement = enhancement[0]
+
+    if enhancement is None or isinstance(enhancement, str):
+        modes = [enhancement or "color"] * page_count
+    else:
+        if len(enhancement) != page_count:
+            raise ValueError(
+                f"Got {len(enhancement)} enhancement modes for {page_count} pages"
+            )
+        modes = [mode or "color" for mode in enhancement]
+
+    for mode in modes:
+        if mode not in ENHANCEMENT_MODES:
+            raise ValueError(
+                f"Unknown enhancement mode '{mode}', expected one of: {', '.join(ENHANCEMENT_MODES)}"
+            )
+    return modes
+
+
+def detect_enhancement(img: Image.Image) -> str:
+    """
+    Pick an enhancement mode for a page from cheap image statistics
+
+    Replaces detectBestEnhancement from the frontend. Works on a copy
+    downsampled to about DETECT_SIZE pixels, so the cost is a few
+    milliseconds regardless of the page resolution:
+
+    - color: a noticeable share of saturated pixels (photos, colored forms)
+    - enhanced: narrow luminance spread (faded or low-contrast scans)
+    - bw: after flattening the paper background, the luminance histogram
+      is clearly two-tone with a modest share of ink (text pages)
+    - grayscale: everything else
+
+    Args:
+        img: Decoded page (any mode); may already be a reduced preview
+
+    Returns:
+        One of color, grayscale, bw, enhanced
+    """
+    factor = max(img.size) // DETECT_SIZE
+    small = img.reduce(factor) if factor > 1 else img
+    if small.mode != "RGB":
+        small = small.convert("RGB")
+
+    hsv = np.asarray(small.convert("HSV"))
+    colorful = (hsv[..., 1] > COLOR_PIXEL_SATURATION) & (hsv[..., 2] > COLOR_PIXEL_VALUE)
+    if colorful.mean() > COLOR_FRACTION:
+        return "color"
+
+    gray = small.convert("L")
+    pixels = np.asarray(gray)
+    cdf = np.cumsum(np.bincount(pixels.ravel(), minlength=256)) / pixels.size
+    p5, p95 = np.searchsorted(cdf, 0.05), np.searchsorted(cdf, 0.95)
+    if p95 - p5 < LOW_CONTRAST_SPREAD:
+        return "enhanced"
+
+    # Divide by the local background (blurred, then dilated so ink doesn't darken it)
+    background = gray.filter(ImageFilter.GaussianBlur(BACKGROUND_SIGMA)).filter(ImageFilter.MaxFilter(3))
+    flat = pixels * 255.0 / np.maximum(np.asarray(background, dtype=np.float32), 1.0)
+    flat_hist = np.bincount(np.clip(flat, 0, 255).astype(np.uint8).ravel(), minlength=256).astype(np.float64)
+
+    separability, ink_fraction = _otsu(flat_hist)
+    if separability > BIMODAL_SEPARABILITY and MIN_INK_FRACTION <= ink_fraction < MAX_INK_FRACTION:
+        return "bw"
+
+    return "grayscale"
+
+
+def _otsu(hist: np.ndarray) -> Tuple[float, float]:
+    """
+    Otsu's threshold over a 256-bin histogram
+
+    Returns:
+        Tuple of (between-class variance / total variance, share of pixels below the threshold)
+    """
+    p = hist / hist.sum()
+    levels = np.arange(256, dtype=np.float64)
+    omega = np.cumsum(p)
+    mu = np.cumsum(p * levels)
+    mu_total = mu[-1]
+    total_variance = float(np.sum(p * (levels - mu_total) ** 2))
+    if total_variance == 0:
+        return 0.0, 0.0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mu_total * omega - mu) ** 2 / (omega * (1.0 - omega))
+    between = np.nan_to_num(between, nan=0.0, posinf=0.0)
+    k = int(np.argmax(between))
+    return float(between[k]) / total_variance, float(omega[k])
+
+
+def apply_enhancement(img: Image.Image, mode: str) -> Image.Image:
+    """
+    Apply an enhancement mode to a decoded RGB page
+
+    Mirrors the OpenCV.js pipeline of the frontend with Pillow filters and
+    NumPy array operations, so it runs in C over the whole image.
+
+    Args:
+        img: RGB image
+        mode: One of ENHANCEMENT_MODES other than "auto" (see detect_enhancement)
+
+    Returns:
+        The RGB image unchanged for "color", otherwise a single-channel ("L") image
+    """
+    if mode == "color":
+        return img
+
+    gray = img.convert("L")
+
+    if mode == "grayscale":
+        return gray
+
+    if mode == "bw":
+        # Gaussian blur, then adaptive Gaussian threshold: white where the
+        # pixel is brighter than its neighbourhood's weighted mean minus C
+        blurred = gray.filter(ImageFilter.GaussianBlur(_BLUR_SIGMA))
+        local_mean = blurred.filter(ImageFilter.GaussianBlur(_THRESHOLD_SIGMA))
+        pixels = np.asarray(blurred, dtype=np.int16)
+        threshold = np.asarray(local_mean, dtype=np.int16) - _THRESHOLD_C
+        return Image.fromarray(np.where(pixels > threshold, np.uint8(255), np.uint8(0)), "L")
+
+    if mode == "enhanced":
+        # Stretch contrast to the full 0-255 range, then sharpen
+        pixels = np.asarray(gray, dtype=np.float32)
+        low, high = float(pixels.min()), float(pixels.max())
+        if high > low:
+            pixels = (pixels - low) * (255.0 / (high - low))
+        normalized = Image.fromarray(np.rint(pixels).astype(np.uint8), "L")
+        return normalized.filter(_SHARPEN_KERNEL)
+
+    raise ValueError(f"Unknown enhancement mode '{mode}'")
@@ -0,0 +1,319 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+from app.config import settings
+from app.services.profiling_service import current_profile, profiled_call
+
+
+class PDFQueueFullError(Exception):
+    """Raised when the PDF worker pool already has the maximum number of exports queued"""
+
+
+class PixelBudgetExceededError(Exception):
+    """Raised when an export's pages don't fit in the decode memory budget in time"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# Working memory per decoded pixel: RGB decode, resized or enhanced copies, encoder buffers
+BYTES_PER_PIXEL = 8
+
+_executor: Optional[Executor] = None
+_pending_jobs = 0
+
+# Decode memory admission (see acquire_pixels)
+_pixels_in_use = 0
+_pixel_waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+_pixel_rejections = 0
+_lease_seconds = 2.0  # Moving average of how long exports hold their pixels, for Retry-After
+
+
+# Imported once by the forkserver, so pool workers (and their replacements) start with them loaded
+PRELOAD_MODULES = ["app.services.pdf_service"]
+
+
+def get_available_cpus() -> int:
+    """
+    Number of CPUs this process can actually use
+
+    Its CPU affinity, capped by a cgroup CPU quota (docker --cpus,
+    Kubernetes CPU limits) rounded up, which os.cpu_count() ignores.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def _cgroup_cpu_quota() -> Optional[float]:
+    """CPU quota of this container in CPUs, None if unlimited or not in a cgroup"""
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v1: quota is -1 when unlimited
+    try:
+        quota = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())
+        period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+        return quota / period if quota > 0 and period > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def get_worker_count() -> int:
+    """
+    Number of workers in the PDF pool
+
+    Returns:
+        Configured pool size, or the number of CPUs available to this process
+    """
+    if settings.pdf_worker_processes > 0:
+        return settings.pdf_worker_processes
+
+    return get_available_cpus()
+
+
+def _worker_context() -> multiprocessing.context.BaseContext:
+    """
+    Start method for pool workers
+
+    spawn or forkserver instead of fork: the parent runs an event loop and
+    threads. With PDF_WORKER_PRELOAD, a forkserver imports Pillow, numpy and
+    reportlab once and every worker is forked from it, so starting or
+    replacing a worker doesn't pay for those imports again.
+    """
+    if settings.pdf_worker_preload and "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(PRELOAD_MODULES)
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def get_executor() -> Optional[Executor]:
+    """
+    Get the shared executor for CPU-bound PDF work, creating it on first use
+
+    Returns:
+        The executor, or None when PDF_EXECUTOR is "inline"
+    """
+    global _executor
+
+    if settings.pdf_executor == "inline":
+        return None
+
+    if _executor is None:
+        if settings.pdf_executor == "thread":
+            _executor = ThreadPoolExecutor(
+                max_workers=get_worker_count(),
+                thread_name_prefix="pdf-worker"
+            )
+        else:
+            # Workers are replaced after PDF_WORKER_MAX_TASKS pages, returning
+            # whatever memory Pillow's allocator held on to
+            _executor = ProcessPoolExecutor(
+                max_workers=get_worker_count(),
+                mp_context=_worker_context(),
+                max_tasks_per_child=settings.pdf_worker_max_tasks or None
+            )
+
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Shut down the PDF worker pool, waiting for running exports to finish"""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+async def run_cpu_bound(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run a CPU-bound function without blocking the event loop
+
+    Args:
+        func: Module-level function (must be picklable in process mode)
+        *args: Positional arguments for func
+
+    Returns:
+        The function's return value
+    """
+    executor = get_executor()
+    if executor is None:
+        return func(*args)
+
+    loop = asyncio.get_running_loop()
+    profile = current_profile()
+    if profile is None:
+        return await loop.run_in_executor(executor, func, *args)
+
+    # The request is being profiled: sample the worker as well
+    result, stacks = await loop.run_in_executor(executor, profiled_call, profile.interval, func, args)
+    profile.add(stacks, "[pdf worker]")
+    return result
+
+
+@asynccontextmanager
+async def pdf_job_slot():
+    """
+    Reserve a slot in the bounded PDF export queue
+
+    Raises:
+        PDFQueueFullError: If PDF_MAX_PENDING_JOBS exports are already in flight
+    """
+    global _pending_jobs
+
+    if _pending_jobs >= settings.pdf_max_pending_jobs:
+        raise PDFQueueFullError(
+            f"PDF export queue is full ({_pending_jobs} exports in progress), try again shortly"
+        )
+
+    _pending_jobs += 1
+    try:
+        yield
+    finally:
+        _pending_jobs -= 1
+
+
+def get_pixel_budget() -> int:
+    """Decoded pixels allowed in flight across all exports (PDF_MEMORY_BUDGET_MB), 0 = unlimited"""
+    return settings.pdf_memory_budget_mb * 1024 * 1024 // BYTES_PER_PIXEL
+
+
+async def acquire_pixels(pixels: int) -> int:
+    """
+    Reserve decode memory for pages about to be decoded
+
+    Waits up to PDF_ADMISSION_TIMEOUT for other exports to release theirs.
+    Waiters are admitted in arrival order, so a large export is not starved
+    by a stream of small ones; one larger than the whole budget is admitted
+    once nothing else is running.
+
+    Args:
+        pixels: Decoded pixels the caller keeps in flight at once
+
+    Returns:
+        Pixels reserved, to pass to release_pixels()
+
+    Raises:
+        PixelBudgetExceededError: If the budget did not free up in time
+    """
+    global _pixels_in_use, _pixel_rejections
+
+    budget = get_pixel_budget()
+    if budget <= 0:
+        return 0
+    pixels = min(pixels, budget)
+
+    if not _pixel_waiters and _pixels_in_use + pixels <= budget:
+        _pixels_in_use += pixels
+        return pixels
+
+    entry = (pixels, asyncio.get_running_loop().create_future())
+    _pixel_waiters.append(entry)
+    try:
+        await asyncio.wait([entry[1]], timeout=settings.pdf_admission_timeout)
+    except BaseException:
+        _abandon_wait(entry)
+        raise
+
+    if not entry[1].done():
+        _abandon_wait(entry)
+        _pixel_rejections += 1
+        raise PixelBudgetExceededError(
+            f"Server is busy decoding other exports ({_pixels_in_use / 1e6:.0f} of "
+            f"{budget / 1e6:.0f} megapixels in use), try again shortly",
+            retry_after=max(1, math.ceil(_lease_seconds))
+        )
+    return pixels
+
+
+def release_pixels(pixels: int, held_since: Optional[float] = None) -> None:
+    """Give back pixels reserved with acquire_pixels and admit waiting exports"""
+    global _pixels_in_use, _lease_seconds
+
+    if pixels <= 0:
+        return
+    _pixels_in_use -= pixels
+    if held_since is not None:
+        _lease_seconds = 0.8 * _lease_seconds + 0.2 * (time.monotonic() - held_since)
+    _admit_waiters()
+
+
+def _abandon_wait(entry: Tuple[int, asyncio.Future]) -> None:
+    """Withdraw a waiter that timed out or was cancelled"""
+    pixels, future = entry
+    if future.done() and not future.cancelled():
+        # Admitted just as it gave up
+        release_pixels(pixels)
+        return
+    future.cancel()
+    _pixel_waiters.remove(entry)
+    # Smaller waiters queued behind it may fit now
+    _admit_waiters()
+
+
+def _admit_waiters() -> None:
+    global _pixels_in_use
+
+    budget = get_pixel_budget()
+    while _pixel_waiters and _pixels_in_use + _pixel_waiters[0][0] <= budget:
+        pixels, future = _pixel_waiters.popleft()
+        _pixels_in_use += pixels
+        future.set_result(None)
+
+
+@asynccontextmanager
+async def pixel_budget_slot(pixels: int):
+    """
+    Hold decode memory for the duration of an export (see acquire_pixels)
+
+    Raises:
+        PixelBudgetExceededError: If the budget did not free up in time
+    """
+    reserved = await acquire_pixels(pixels)
+    held_since = time.monotonic()
+    try:
+        yield
+    finally:
+        release_pixels(reserved, held_since)
+
+
+def get_executor_status() -> Dict:
+    """
+    Get the current state of the PDF worker pool
+
+    Returns:
+        Dict with mode, worker count, queue usage and decode memory budget usage
+    """
+    return {
+        "mode": settings.pdf_executor,
+        "workers": get_worker_count() if settings.pdf_executor != "inline" else 0,
+        "pending_jobs": _pending_jobs,
+        "max_pending_jobs": settings.pdf_max_pending_jobs,
+        "memory_budget": {
+            "budget_megapixels": round(get_pixel_budget() / 1e6, 1),
+            "in_use_megapixels": round(_pixels_in_use / 1e6, 1),
+            "in_use_ratio": round(_pixels_in_use / get_pixel_budget(), 3) if get_pixel_budget() else 0.0,
+            "waiting": len(_pixel_waiters),
+            "rejected": _pixel_rejections
+        }
+    }
@@ -0,0 +1,196 @@
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.config import settings
+
+
+class JobQueueFullError(Exception):
+    """Raised when the export job queue is full"""
+
+
+class JobNotFoundError(KeyError):
+    """Raised when a job does not exist or has been pruned"""
+
+
+@dataclass
+class ExportJob:
+    """State of a background export, as reported by GET /api/jobs/{id}"""
+    id: str
+    kind: str
+    stage: str = "queued"  # queued, generating, waiting (for PDF capacity), uploading, done, failed
+    progress: float = 0.0  # 0.0 - 1.0
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    timings: Dict[str, float] = field(default_factory=dict)  # milliseconds per stage, summed if re-entered
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    _stage_started: float = field(default_factory=time.perf_counter, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.stage in ("done", "failed")
+
+    def set_stage(self, stage: str, progress: Optional[float] = None) -> None:
+        """Move to the next stage, recording how long the previous one took"""
+        now = time.perf_counter()
+        elapsed = (now - self._stage_started) * 1000
+        self.timings[self.stage] = round(self.timings.get(self.stage, 0.0) + elapsed, 1)
+        self._stage_started = now
+        self.stage = stage
+        if progress is not None:
+            self.progress = progress
+        self.updated_at = time.time()
+
+    def set_progress(self, progress: float) -> None:
+        self.progress = round(min(max(progress, 0.0), 1.0), 3)
+        self.updated_at = time.time()
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "stage": self.stage,
+            "progress": self.progress,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "timings_ms": self.timings,
+            "result": self.result,
+            "error": self.error
+        }
+
+
+JobRunner = Callable[[ExportJob], Awaitable[Dict]]
+
+_jobs: Dict[str, ExportJob] = {}
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+
+
+def _prune_jobs() -> None:
+    """Forget finished jobs older than JOB_RETENTION_SECONDS"""
+    cutoff = time.time() - settings.job_retention_seconds
+    for job_id in [jid for jid, job in _jobs.items() if job.finished and job.updated_at < cutoff]:
+        del _jobs[job_id]
+
+
+def submit_job(kind: str, run: JobRunner, cleanup: Optional[Callable[[], None]] = None) -> ExportJob:
+    """
+    Queue a job for the background workers
+
+    Args:
+        kind: Short label for the job type (e.g. "paperless")
+        run: Coroutine function doing the work; receives the job to report
+            stage and progress, returns the result dict
+        cleanup: Called once the job has finished, whatever the outcome
+
+    Returns:
+        The queued job
+
+    Raises:
+        JobQueueFullError: If JOB_MAX_QUEUED jobs are already waiting
+    """
+    if _queue is None:
+        raise RuntimeError("Job workers are not running")
+
+    _prune_jobs()
+
+    job = ExportJob(id=uuid.uuid4().hex, kind=kind)
+    try:
+        _queue.put_nowait((job, run, cleanup))
+    except asyncio.QueueFull:
+        raise JobQueueFullError("Export job queue is full, try again shortly")
+
+    _jobs[job.id] = job
+    return job
+
+
+def get_job(job_id: str) -> ExportJob:
+    """
+    Look up a job
+
+    Raises:
+        JobNotFoundError: If the job does not exist or has been pruned
+    """
+    job = _jobs.get(job_id)
+    if job is None:
+        raise JobNotFoundError(job_id)
+    return job
+
+
+async def _worker(queue: asyncio.Queue) -> None:
+    while True:
+        job, run, cleanup = await queue.get()
+        try:
+            job.result = await run(job)
+            job.set_stage("done", progress=1.0)
+        except asyncio.CancelledError:
+            job.error = "Server shut down before the job finished"
+            job.set_stage("failed")
+            raise
+        except Exception as e:
+            print(f"Error: Export job {job.id} failed: {e}")
+            job.error = str(e)
+            job.set_stage("failed")
+        finally:
+            if cleanup is not None:
+                cleanup()
+            queue.task_done()
+
+
+def start_job_workers() -> None:
+    """Start the background job workers (called on startup)"""
+    global _queue
+
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=settings.job_max_queued)
+        _workers.extend(asyncio.ensure_future(_worker(_queue)) for _ in range(settings.job_workers))
+
+
+async def stop_job_workers(drain_timeout: float = 0.0) -> None:
+    """
+    Stop the job workers (called on shutdown)
+
+    Args:
+        drain_timeout: Seconds to let queued and running jobs finish before
+            the rest are cancelled (and marked failed)
+    """
+    global _queue
+
+    pending = sum(1 for job in _jobs.values() if not job.finished)
+    if _queue is not None and drain_timeout > 0 and pending:
+        print(f"Waiting up to {drain_timeout:g}s for {pending} export job(s) to finish")
+        try:
+            await asyncio.wait_for(_queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            print("Warning: Export jobs still running after the drain timeout are cancelled")
+
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+    # Jobs no worker picked up never run; fail them and remove their spooled pages
+    while _queue is not None and not _queue.empty():
+        job, _, cleanup = _queue.get_nowait()
+        job.error = "Server shut down before the job started"
+        job.set_stage("failed")
+        if cleanup is not None:
+            cleanup()
+    _queue = None
+
+
+def get_job_status() -> Dict[str, Any]:
+    """
+    Get job queue usage
+
+    Returns:
+        Dict with queued and active job counts
+    """
+    return {
+        "workers": settings.job_workers,
+        "queued": _queue.qsize() if _queue is not None else 0,
+        "max_queued": settings.job_max_queued,
+        "active": sum(1 for job in _jobs.values() if job.stage in ("generating", "waiting", "uploading"))
+    }
@@ -0,0 +1,184 @@
+import time
+from typing import Dict, Optional, Tuple
+import httpx
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from app.config import settings
+
+# Routers requests are counted under; anything else is "other"
+ROUTERS = ("pdf", "paperless", "sessions", "storage", "jobs", "settings")
+
+# Per-page stages run from about a millisecond (cache hits, small pages) to seconds (12 MP LANCZOS)
+_STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Observing is an in-memory counter increment; text is only rendered when /metrics is scraped
+PDF_STAGE_SECONDS = Histogram(
+    "docuscan_pdf_stage_seconds",
+    "Time per page in each PDF pipeline stage (read = base64 decode or spool read, "
+    "decode = Pillow decode and flatten, resize = LANCZOS downscale, assemble = PDF write)",
+    ["stage"],
+    buckets=_STAGE_BUCKETS
+)
+PDF_BUILD_SECONDS = Histogram(
+    "docuscan_pdf_build_seconds",
+    "Wall time to generate a PDF, from the first page to the finished file",
+    buckets=_REQUEST_BUCKETS
+)
+PDF_PAGES = Histogram(
+    "docuscan_pdf_pages",
+    "Pages per generated PDF",
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100, 200)
+)
+PDF_OUTPUT_BYTES = Counter(
+    "docuscan_pdf_output_bytes",
+    "Bytes of generated PDFs"
+)
+PDF_PAGE_RESULTS = Counter(
+    "docuscan_pdf_page_results",
+    "Pages handled while generating PDFs, by how they were stored",
+    ["result"]  # encoded, passthrough, cached, skipped
+)
+PAPERLESS_STAGE_SECONDS = Histogram(
+    "docuscan_paperless_stage_seconds",
+    "Time per Paperless upload in each stage (resolve_metadata = tag/correspondent/type lookup, "
+    "post = sending the document)",
+    ["stage"],
+    buckets=_REQUEST_BUCKETS
+)
+PAPERLESS_UPLOADS = Counter(
+    "docuscan_paperless_uploads",
+    "Paperless upload attempts by outcome (success, http_4xx, http_5xx, timeout, connection, error)",
+    ["outcome"]
+)
+HTTP_REQUESTS = Counter(
+    "docuscan_http_requests",
+    "HTTP requests by router and status class",
+    ["router", "status"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "docuscan_http_request_seconds",
+    "HTTP request duration until the last response byte, by router",
+    ["router"],
+    buckets=_REQUEST_BUCKETS
+)
+HTTP_RECEIVED_BYTES = Counter(
+    "docuscan_http_received_bytes",
+    "Request body bytes received, by router",
+    ["router"]
+)
+HTTP_SENT_BYTES = Counter(
+    "docuscan_http_sent_bytes",
+    "Response body bytes sent, by router",
+    ["router"]
+)
+
+
+def observe_page(result: str, timings: Dict[str, float]) -> None:
+    """
+    Record one page written to a PDF
+
+    Args:
+        result: encoded, passthrough or cached
+        timings: Milliseconds per stage
+    """
+    if not settings.metrics_enabled:
+        return
+    PDF_PAGE_RESULTS.labels(result).inc()
+    for stage, duration in timings.items():
+        PDF_STAGE_SECONDS.labels(stage).observe(duration / 1000)
+
+
+def observe_pdf(seconds: float, pages: int, size: int, skipped: int) -> None:
+    """Record a finished PDF"""
+    if not settings.metrics_enabled:
+        return
+    PDF_BUILD_SECONDS.observe(seconds)
+    PDF_PAGES.observe(pages)
+    PDF_OUTPUT_BYTES.inc(size)
+    if skipped:
+        PDF_PAGE_RESULTS.labels("skipped").inc(skipped)
+
+
+def observe_paperless_stage(stage: str, seconds: float) -> None:
+    if settings.metrics_enabled:
+        PAPERLESS_STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def observe_paperless_upload(error: Optional[BaseException] = None) -> None:
+    """Count a Paperless upload attempt, classifying the error if it failed"""
+    if not settings.metrics_enabled:
+        return
+    if error is None:
+        outcome = "success"
+    elif isinstance(error, httpx.HTTPStatusError):
+        outcome = f"http_{error.response.status_code // 100}xx"
+    elif isinstance(error, httpx.TimeoutException):
+        outcome = "timeout"
+    elif isinstance(error, httpx.TransportError):
+        outcome = "connection"
+    else:
+        outcome = "error"
+    PAPERLESS_UPLOADS.labels(outcome).inc()
+
+
+def _router_for(path: str) -> str:
+    parts = path.split("/", 3)
+    if len(parts) > 2 and parts[1] == "api" and parts[2] in ROUTERS:
+        return parts[2]
+    return "other"
+
+
+class MetricsMiddleware:
+    """
+    Count requests, body bytes and duration per router
+
+    Plain ASGI, so streamed responses pass through unbuffered and are timed
+    until their last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        router = _router_for(scope["path"])
+        started = time.perf_counter()
+        received = 0
+        sent = 0
+        status = 500
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal sent, status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            HTTP_REQUESTS.labels(router, f"{status // 100}xx").inc()
+            HTTP_REQUEST_SECONDS.labels(router).observe(time.perf_counter() - started)
+            HTTP_RECEIVED_BYTES.labels(router).inc(received)
+            HTTP_SENT_BYTES.labels(router).inc(sent)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render every metric of this server process in the Prometheus text format
+
+    Returns:
+        Tuple of (body, content type)
+    """
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,357 @@
+import asyncio
+import json
+import os
+import random
+import shutil
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+import httpx
+from app.config import settings
+from app.services.paperless_service import upload_to_paperless
+from app.services.settings_service import SETTINGS_FILE
+
+
+class OutboxFullError(Exception):
+    """Raised when the outbox already holds OUTBOX_MAX_ITEMS documents"""
+
+
+@dataclass
+class OutboxItem:
+    """A generated PDF waiting for delivery to Paperless-ngx, persisted as <id>.json next to <id>.pdf"""
+    id: str
+    title: str
+    tags: Optional[List[str]] = None
+    correspondent: Optional[str] = None
+    document_type: Optional[str] = None
+    paperless_url: Optional[str] = None  # None = use the configured URL at delivery time
+    paperless_token: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    attempts: int = 0
+    next_attempt_at: float = field(default_factory=time.time)
+    last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        """Public view of the item (without the token)"""
+        return {
+            "id": self.id,
+            "title": self.title,
+            "created_at": self.created_at,
+            "attempts": self.attempts,
+            "next_attempt_at": self.next_attempt_at,
+            "last_error": self.last_error
+        }
+
+
+_items: Dict[str, OutboxItem] = {}
+_host_retry_at: Dict[str, float] = {}  # Paperless URL -> earliest next attempt after a failure
+_wakeup: Optional[asyncio.Event] = None
+_worker: Optional[asyncio.Task] = None
+_outbox_dir: Optional[Path] = None
+
+
+def get_outbox_dir() -> Path:
+    """OUTBOX_DIR, or 'outbox' next to the settings file"""
+    if settings.outbox_dir:
+        return Path(settings.outbox_dir)
+    return Path(SETTINGS_FILE).parent / "outbox"
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Whether an upload failure is worth retrying later
+
+    Connection problems, timeouts, 5xx, 408 and 429 are transient.
+    Other 4xx responses and configuration errors are not.
+    """
+    if isinstance(error, (httpx.TransportError, TimeoutError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status in (408, 429)
+    return False
+
+
+def _open_private(path: Path, mode: str):
+    """Open a file for writing that only the owner can read; items may hold Paperless tokens"""
+    return os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), mode)
+
+
+def _write_json_atomic(path: Path, data: Dict) -> None:
+    tmp = path.with_suffix(".json.tmp")
+    with _open_private(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _store_item(item: OutboxItem, pdf: Union[bytes, BinaryIO, Path]) -> None:
+    """Write the PDF, then the metadata; an item only exists once its .json is in place"""
+    pdf_path = _outbox_dir / f"{item.id}.pdf"
+    tmp = pdf_path.with_suffix(".pdf.tmp")
+    with _open_private(tmp, "wb") as f:
+        if isinstance(pdf, bytes):
+            f.write(pdf)
+        elif isinstance(pdf, Path):
+            with open(pdf, "rb") as src:
+                shutil.copyfileobj(src, f)
+        else:
+            pdf.seek(0)
+            shutil.copyfileobj(pdf, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, pdf_path)
+    _write_json_atomic(_outbox_dir / f"{item.id}.json", asdict(item))
+
+
+def _remove_item(item_id: str) -> None:
+    for suffix in (".json", ".pdf"):
+        try:
+            os.unlink(_outbox_dir / f"{item_id}{suffix}")
+        except OSError:
+            pass
+
+
+def _move_to_failed(item: OutboxItem) -> None:
+    """Keep undeliverable documents in outbox/failed/ for manual recovery"""
+    failed_dir = _outbox_dir / "failed"
+    failed_dir.mkdir(exist_ok=True)
+    _write_json_atomic(_outbox_dir / f"{item.id}.json", asdict(item))
+    for suffix in (".pdf", ".json"):
+        try:
+            os.replace(_outbox_dir / f"{item.id}{suffix}", failed_dir / f"{item.id}{suffix}")
+        except OSError:
+            pass
+
+
+async def enqueue_upload(
+    pdf: Union[bytes, BinaryIO, Path],
+    title: str,
+    tags: Optional[List[str]] = None,
+    correspondent: Optional[str] = None,
+    document_type: Optional[str] = None,
+    paperless_url: Optional[str] = None,
+    paperless_token: Optional[str] = None,
+    error: Optional[Exception] = None
+) -> OutboxItem:
+    """
+    Persist a generated PDF for later delivery to Paperless-ngx
+
+    Args:
+        pdf: PDF as bytes, open binary file or path (copied into the outbox)
+        title, tags, correspondent, document_type: Document metadata
+        paperless_url, paperless_token: Per-request overrides, if any
+        error: The failure that caused the document to be queued
+
+    Returns:
+        The queued item
+
+    Raises:
+        OutboxFullError: If OUTBOX_MAX_ITEMS documents are already queued
+        RuntimeError: If the outbox is not running
+    """
+    if _outbox_dir is None:
+        raise RuntimeError("Paperless outbox is not available")
+
+    if len(_items) >= settings.outbox_max_items:
+        raise OutboxFullError("Paperless outbox is full")
+
+    item = OutboxItem(
+        id=uuid.uuid4().hex,
+        title=title,
+        tags=tags,
+        correspondent=correspondent,
+        document_type=document_type,
+        paperless_url=paperless_url,
+        paperless_token=paperless_token,
+        attempts=1 if error is not None else 0,
+        last_error=str(error) if error is not None else None
+    )
+    if error is not None:
+        item.next_attempt_at = time.time() + _backoff_delay(item.attempts)
+
+    await asyncio.to_thread(_store_item, item, pdf)
+    _items[item.id] = item
+    _wakeup.set()
+    return item
+
+
+def _backoff_delay(attempts: int) -> float:
+    """Exponential backoff with jitter: base * 2^(attempts-1), capped, scaled by 0.5-1.0"""
+    delay = min(
+        settings.outbox_retry_max_delay,
+        settings.outbox_retry_base_delay * 2 ** max(attempts - 1, 0)
+    )
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _item_url(item: OutboxItem) -> str:
+    return (item.paperless_url or settings.paperless_url or "").rstrip('/')
+
+
+def _due_items(now: float) -> List[OutboxItem]:
+    """Items ready for another attempt, oldest first, skipping hosts that are backing off"""
+    return sorted(
+        (
+            item for item in _items.values()
+            if item.next_attempt_at <= now and _host_retry_at.get(_item_url(item), 0.0) <= now
+        ),
+        key=lambda item: item.created_at
+    )
+
+
+async def _deliver(item: OutboxItem) -> None:
+    """Try to upload one item, then remove, reschedule or give up on it"""
+    url = _item_url(item)
+    try:
+        await upload_to_paperless(
+            pdf=_outbox_dir / f"{item.id}.pdf",
+            title=item.title,
+            tags=item.tags,
+            correspondent=item.correspondent,
+            document_type=item.document_type,
+            paperless_url=item.paperless_url,
+            paperless_token=item.paperless_token
+        )
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        item.attempts += 1
+        item.last_error = str(e)
+
+        expired = time.time() - item.created_at > settings.outbox_max_age_seconds
+        if not is_transient_error(e) or expired:
+            print(f"Error: Giving up on outbox item {item.id} after {item.attempts} attempts: {e}")
+            del _items[item.id]
+            await asyncio.to_thread(_move_to_failed, item)
+            return
+
+        item.next_attempt_at = time.time() + _backoff_delay(item.attempts)
+        # Paperless is likely down for every queued document, not just this one
+        _host_retry_at[url] = item.next_attempt_at
+        await asyncio.to_thread(_write_json_atomic, _outbox_dir / f"{item.id}.json", asdict(item))
+        return
+
+    _host_retry_at.pop(url, None)
+    del _items[item.id]
+    await asyncio.to_thread(_remove_item, item.id)
+    print(f"Outbox item {item.id} delivered to Paperless-ngx after {item.attempts} failed attempts")
+
+
+async def _run_outbox(wakeup: asyncio.Event) -> None:
+    while True:
+        for item in _due_items(time.time()):
+            if _host_retry_at.get(_item_url(item), 0.0) <= time.time():
+                try:
+                    await _deliver(item)
+                except OSError as e:
+                    print(f"Error: Outbox bookkeeping for item {item.id} failed: {e}")
+
+        now = time.time()
+        upcoming = [
+            max(item.next_attempt_at, _host_retry_at.get(_item_url(item), 0.0))
+            for item in _items.values()
+        ]
+        timeout = max(min(upcoming) - now, 0.0) if upcoming else None
+
+        wakeup.clear()
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+def _load_items(outbox_dir: Path) -> Dict[str, OutboxItem]:
+    """Read queued items from disk, dropping leftovers of interrupted writes"""
+    items: Dict[str, OutboxItem] = {}
+    for tmp in outbox_dir.glob("*.tmp"):
+        tmp.unlink(missing_ok=True)
+
+    for meta_path in outbox_dir.glob("*.json"):
+        pdf_path = meta_path.with_suffix(".pdf")
+        try:
+            with open(meta_path) as f:
+                item = OutboxItem(**json.load(f))
+        except (json.JSONDecodeError, TypeError, OSError) as e:
+            print(f"Warning: Skipping unreadable outbox item {meta_path.name}: {e}")
+            continue
+        if not pdf_path.exists():
+            print(f"Warning: Outbox item {item.id} has no PDF, removing it")
+            meta_path.unlink(missing_ok=True)
+            continue
+        items[item.id] = item
+
+    # PDFs whose metadata was never written belong to uploads that were answered with an error
+    for pdf_path in outbox_dir.glob("*.pdf"):
+        if pdf_path.stem not in items:
+            pdf_path.unlink(missing_ok=True)
+
+    return items
+
+
+def start_outbox() -> None:
+    """Load queued documents and start delivering them (called on startup)"""
+    global _outbox_dir, _wakeup, _worker
+
+    if not settings.outbox_enabled or _worker is not None:
+        return
+
+    outbox_dir = get_outbox_dir()
+    try:
+        outbox_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        _items.update(_load_items(outbox_dir))
+    except OSError as e:
+        print(f"Warning: Paperless outbox disabled, {outbox_dir} is not usable: {e}")
+        return
+
+    if _items:
+        print(f"Paperless outbox: {len(_items)} document(s) waiting for delivery")
+
+    _outbox_dir = outbox_dir
+    _wakeup = asyncio.Event()
+    _worker = asyncio.ensure_future(_run_outbox(_wakeup))
+
+
+async def stop_outbox() -> None:
+    """Stop delivering (called on shutdown); queued documents stay on disk"""
+    global _outbox_dir, _wakeup, _worker
+
+    if _worker is not None:
+        _worker.cancel()
+        await asyncio.gather(_worker, return_exceptions=True)
+
+    _items.clear()
+    _host_retry_at.clear()
+    _outbox_dir = None
+    _wakeup = None
+    _worker = None
+
+
+def is_outbox_running() -> bool:
+    return _worker is not None
+
+
+def get_outbox_items() -> List[Dict]:
+    """Queued items, oldest first"""
+    return [item.to_dict() for item in sorted(_items.values(), key=lambda item: item.created_at)]
+
+
+def get_outbox_status() -> Dict[str, Any]:
+    """
+    Get outbox usage
+
+    Returns:
+        Dict with queue depth, age of the oldest item and undeliverable count
+    """
+    now = time.time()
+    failed_dir = _outbox_dir / "failed" if _outbox_dir is not None else None
+    return {
+        "enabled": is_outbox_running(),
+        "depth": len(_items),
+        "max_items": settings.outbox_max_items,
+        "oldest_age_seconds": round(now - min(item.created_at for item in _items.values()), 1) if _items else 0.0,
+        "failed": len(list(failed_dir.glob("*.json"))) if failed_dir is not None and failed_dir.exists() else 0
+    }
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+from app.config import settings
+
+# Cache entry: (metadata, encoded image stream)
+CacheEntry = Tuple[Dict[str, Any], bytes]
+
+# First line of every on-disk entry, bumped if the format changes
+DISK_MAGIC = b"docuscan-page-1\n"
+# Rough per-entry bookkeeping cost counted against the memory budget
+ENTRY_OVERHEAD = 256
+# Temp files older than this are leftovers of an interrupted write
+STALE_TEMP_SECONDS = 3600
+
+_lock = threading.Lock()
+_memory: "OrderedDict[str, CacheEntry]" = OrderedDict()
+_memory_bytes = 0
+# Disk tier index in least-recently-used order, loaded from the directory on first use
+_disk: Optional["OrderedDict[str, int]"] = None
+_disk_bytes = 0
+_stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+
+def is_page_cache_enabled() -> bool:
+    """Whether either cache tier is configured"""
+    return settings.page_cache_memory_mb > 0 or bool(settings.page_cache_dir)
+
+
+def page_cache_key(chunks: Iterable[bytes], params: Tuple) -> str:
+    """
+    Content address of an encoded page
+
+    Args:
+        chunks: The input as received, in pieces (raw image bytes or base64 text)
+        params: Everything else the encoded result depends on (quality,
+            size limit, enhancement mode, ...)
+    """
+    digest = hashlib.blake2b(repr(params).encode(), digest_size=20)
+    digest.update(b"\0")
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_cached(key: str) -> Optional[CacheEntry]:
+    """
+    Look up an encoded page, in memory first, then on disk (blocking I/O)
+
+    Disk hits are promoted to the memory tier.
+    """
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            _memory.move_to_end(key)
+            _stats["hits"] += 1
+            return entry
+
+    entry = _read_disk(key)
+    with _lock:
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        _stats["hits"] += 1
+        _stats["disk_hits"] += 1
+        _remember(key, entry)
+    return entry
+
+
+def put_cached(key: str, meta: Dict[str, Any], data: bytes) -> None:
+    """Store an encoded page in both tiers, evicting least recently used entries (blocking I/O)"""
+    with _lock:
+        _remember(key, (meta, data))
+    _write_disk(key, meta, data)
+
+
+def drop_cached(key: str) -> None:
+    """Remove an entry from both tiers, e.g. because it could not be used (blocking I/O)"""
+    global _memory_bytes, _disk_bytes
+
+    with _lock:
+        entry = _memory.pop(key, None)
+        if entry is not None:
+            _memory_bytes -= len(entry[1]) + ENTRY_OVERHEAD
+        if _disk is not None:
+            _disk_bytes -= _disk.pop(key, 0)
+
+    if settings.page_cache_dir:
+        try:
+            _disk_path(key).unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+def _remember(key: str, entry: CacheEntry) -> None:
+    """Add an entry to the memory tier (caller holds _lock)"""
+    global _memory_bytes
+
+    budget = settings.page_cache_memory_mb * 1024 * 1024
+    size = len(entry[1]) + ENTRY_OVERHEAD
+    if size > budget or key in _memory:
+        return
+
+    _memory[key] = entry
+    _memory_bytes += size
+    while _memory_bytes > budget:
+        _, (_, evicted) = _memory.popitem(last=False)
+        _memory_bytes -= len(evicted) + ENTRY_OVERHEAD
+
+
+def _disk_path(key: str) -> Path:
+    return Path(settings.page_cache_dir) / key[:2] / key
+
+
+def _load_disk_index() -> "OrderedDict[str, int]":
+    """Index the disk tier by modification time (caller holds _lock)"""
+    global _disk, _disk_bytes
+
+    if _disk is None:
+        entries = []
+        root = Path(settings.page_cache_dir)
+        if root.is_dir():
+            for path in root.glob("??/*"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if path.suffix == ".tmp":
+                    if time.time() - stat.st_mtime > STALE_TEMP_SECONDS:
+                        path.unlink(missing_ok=True)
+                    continue
+                entries.append((stat.st_mtime, path.name, stat.st_size))
+        entries.sort()
+        _disk = OrderedDict((name, size) for _, name, size in entries)
+        _disk_bytes = sum(_disk.values())
+    return _disk
+
+
+def _read_disk(key: str) -> Optional[CacheEntry]:
+    if not settings.page_cache_dir:
+        return None
+
+    path = _disk_path(key)
+    try:
+        raw = path.read_bytes()
+        os.utime(path)
+    except OSError:
+        return None
+
+    header_end = raw.find(b"\n", len(DISK_MAGIC))
+    try:
+        if not raw.startswith(DISK_MAGIC) or header_end < 0:
+            raise ValueError("bad header")
+        meta = json.loads(raw[len(DISK_MAGIC):header_end])
+    except ValueError:
+        # Truncated or corrupt entry
+        drop_cached(key)
+        return None
+
+    with _lock:
+        index = _load_disk_index()
+        if key in index:
+            index.move_to_end(key)
+    return meta, raw[header_end + 1:]
+
+
+def _write_disk(key: str, meta: Dict[str, Any], data: bytes) -> None:
+    global _disk_bytes
+
+    if not settings.page_cache_dir:
+        return
+
+    budget = settings.page_cache_disk_mb * 1024 * 1024
+    header = DISK_MAGIC + json.dumps(meta).encode() + b"\n"
+    size = len(header) + len(data)
+    if size > budget:
+        return
+
+    path = _disk_path(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as tmp:
+            tmp.write(header)
+            tmp.write(data)
+        os.replace(tmp.name, path)
+    except OSError as e:
+        print(f"Warning: Could not write page cache entry {key}: {e}")
+        return
+
+    evicted = []
+    with _lock:
+        index = _load_disk_index()
+        _disk_bytes += size - index.pop(key, 0)
+        index[key] = size
+        while _disk_bytes > budget and len(index) > 1:
+            old_key, old_size = index.popitem(last=False)
+            _disk_bytes -= old_size
+            evicted.append(old_key)
+
+    for old_key in evicted:
+        _disk_path(old_key).unlink(missing_ok=True)
+
+
+def get_page_cache_status() -> Dict:
+    """
+    Get cache usage and hit counts
+
+    Returns:
+        Dict with entries and bytes per tier, budgets, hits and misses
+    """
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            "enabled": is_page_cache_enabled(),
+            "memory_entries": len(_memory),
+            "memory_bytes": _memory_bytes,
+            "memory_max_bytes": settings.page_cache_memory_mb * 1024 * 1024,
+            "disk_entries": len(_disk) if _disk is not None else None,
+            "disk_bytes": _disk_bytes if _disk is not None else None,
+            "disk_max_bytes": settings.page_cache_disk_mb * 1024 * 1024 if settings.page_cache_dir else 0,
+            "hits": _stats["hits"],
+            "disk_hits": _stats["disk_hits"],
+            "misses": _stats["misses"],
+            "hit_ratio": round(_stats["hits"] / lookups, 3) if lookups else 0.0
+        }
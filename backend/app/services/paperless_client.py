@@ -0,0 +1,127 @@
+import asyncio
+import httpx
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Tuple
+from app.config import settings
+from app.services.settings_service import UserSettings, on_settings_change
+
+
+@dataclass
+class _PooledClient:
+    """A shared client plus the number of requests currently using it"""
+    client: httpx.AsyncClient
+    users: int = 0
+    evicted: bool = False
+
+
+# One keep-alive connection pool per (base URL, token), least recently used first
+_clients: "OrderedDict[Tuple[str, str], _PooledClient]" = OrderedDict()
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _create_client(url: str, token: str) -> httpx.AsyncClient:
+    """Create a pooled client for one Paperless instance"""
+    http2 = settings.paperless_http2
+    if http2 and not _http2_available():
+        print("Warning: PAPERLESS_HTTP2 is enabled but the h2 package is not installed, using HTTP/1.1")
+        http2 = False
+
+    return httpx.AsyncClient(
+        base_url=url,
+        headers={'Authorization': f'Token {token}'},
+        timeout=settings.paperless_timeout,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.paperless_max_connections,
+            max_keepalive_connections=settings.paperless_max_keepalive_connections,
+            keepalive_expiry=settings.paperless_keepalive_expiry
+        )
+    )
+
+
+@asynccontextmanager
+async def paperless_client(url: str, token: str) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Borrow the shared HTTP client for a Paperless base URL and token
+
+    Clients are reused across requests so connections (and TLS sessions)
+    stay alive. Per-request URL/token overrides get their own pool; at most
+    PAPERLESS_MAX_CLIENTS pools are kept, the least recently used one is
+    closed once nothing is using it anymore.
+
+    Args:
+        url: Paperless base URL without trailing slash
+        token: Paperless API token
+
+    Yields:
+        httpx.AsyncClient with base_url and Authorization header set
+    """
+    key = (url, token)
+    entry = _clients.get(key)
+    if entry is None:
+        entry = _PooledClient(client=_create_client(url, token))
+        _clients[key] = entry
+
+        while len(_clients) > settings.paperless_max_clients:
+            _, evicted = _clients.popitem(last=False)
+            evicted.evicted = True
+            if evicted.users == 0:
+                await evicted.client.aclose()
+    else:
+        _clients.move_to_end(key)
+
+    entry.users += 1
+    try:
+        yield entry.client
+    finally:
+        entry.users -= 1
+        if entry.evicted and entry.users == 0:
+            await entry.client.aclose()
+
+
+def discard_paperless_client(url: str, token: str) -> None:
+    """Drop the pool for a URL/token; it is closed once no request is using it"""
+    entry = _clients.pop((url.rstrip('/'), token), None)
+    if entry is None:
+        return
+
+    entry.evicted = True
+    if entry.users == 0:
+        try:
+            asyncio.get_running_loop().create_task(entry.client.aclose())
+        except RuntimeError:
+            pass  # No loop running, nothing left to clean up
+
+
+def _on_settings_change(old: UserSettings, new: UserSettings) -> None:
+    """Release the pool for the previous saved Paperless URL/token once they change"""
+    if (old.paperlessUrl, old.paperlessToken) != (new.paperlessUrl, new.paperlessToken):
+        discard_paperless_client(old.paperlessUrl, old.paperlessToken)
+
+
+on_settings_change(_on_settings_change)
+
+
+def open_paperless_clients() -> None:
+    """Create the pool for the configured Paperless instance (called on startup)"""
+    if settings.paperless_enabled and settings.paperless_url and settings.paperless_token:
+        key = (settings.paperless_url.rstrip('/'), settings.paperless_token)
+        if key not in _clients:
+            _clients[key] = _PooledClient(client=_create_client(*key))
+
+
+async def close_paperless_clients() -> None:
+    """Close every pooled Paperless client (called on shutdown)"""
+    while _clients:
+        _, entry = _clients.popitem()
+        await entry.client.aclose()
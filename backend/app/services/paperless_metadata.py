@@ -0,0 +1,239 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.services.paperless_client import paperless_client
+from app.services.settings_service import UserSettings, on_settings_change
+
+KINDS = ("tags", "correspondents", "document_types")
+
+# Misses trigger a refresh, but not more often than this
+MISS_REFRESH_INTERVAL = 5.0
+
+
+@dataclass
+class _MetadataMirror:
+    """In-process copy of one Paperless instance's tags, correspondents and document types"""
+    url: str
+    token: str
+    items: Dict[str, List[Dict]] = field(default_factory=dict)
+    index: Dict[str, Dict[str, int]] = field(default_factory=dict)  # kind -> lowercase name -> id
+    loaded_at: Dict[str, float] = field(default_factory=dict)
+    refreshing: Dict[str, asyncio.Task] = field(default_factory=dict)
+    creating_tags: Dict[str, asyncio.Task] = field(default_factory=dict)
+
+
+# Per-request URL/token overrides get their own mirror; like the client pools, at
+# most PAPERLESS_MAX_CLIENTS are kept and the least recently used one is dropped
+_mirrors: "OrderedDict[Tuple[str, str], _MetadataMirror]" = OrderedDict()
+
+
+def _get_mirror(url: str, token: str) -> _MetadataMirror:
+    key = (url, token)
+    mirror = _mirrors.get(key)
+    if mirror is None:
+        mirror = _MetadataMirror(url=url, token=token)
+        _mirrors[key] = mirror
+        # Refreshes still running on an evicted mirror finish into it harmlessly
+        while len(_mirrors) > settings.paperless_max_clients:
+            _mirrors.popitem(last=False)
+    else:
+        _mirrors.move_to_end(key)
+    return mirror
+
+
+def _on_settings_change(old: UserSettings, new: UserSettings) -> None:
+    """Forget the mirror of the previous saved Paperless URL/token once they change"""
+    if (old.paperlessUrl, old.paperlessToken) != (new.paperlessUrl, new.paperlessToken):
+        _mirrors.pop((old.paperlessUrl.rstrip('/'), old.paperlessToken), None)
+
+
+on_settings_change(_on_settings_change)
+
+
+async def _fetch_all(url: str, token: str, kind: str) -> List[Dict]:
+    """Fetch every page of a Paperless list endpoint by following 'next'"""
+    results: List[Dict] = []
+    async with paperless_client(url, token) as client:
+        next_url: Optional[str] = f"/api/{kind}/?page_size=100"
+        while next_url:
+            response = await client.get(next_url, timeout=30.0)
+            response.raise_for_status()
+            data = response.json()
+            results.extend(data.get('results', []))
+            next_url = data.get('next')
+    return results
+
+
+def _store(mirror: _MetadataMirror, kind: str, items: List[Dict]) -> None:
+    mirror.items[kind] = items
+    mirror.index[kind] = {item['name'].lower(): item['id'] for item in items if 'name' in item}
+    mirror.loaded_at[kind] = time.monotonic()
+
+
+def _refresh(mirror: _MetadataMirror, kind: str) -> asyncio.Task:
+    """Start a refresh of one kind, or join the one already running"""
+    task = mirror.refreshing.get(kind)
+    if task is None or task.done():
+        async def run():
+            try:
+                _store(mirror, kind, await _fetch_all(mirror.url, mirror.token, kind))
+            finally:
+                mirror.refreshing.pop(kind, None)
+
+        task = asyncio.ensure_future(run())
+        mirror.refreshing[kind] = task
+    return task
+
+
+async def _ensure_loaded(mirror: _MetadataMirror, kind: str) -> None:
+    """
+    Make a kind available, stale-while-revalidate
+
+    The first call waits for a full load. Later calls return immediately
+    and, once the data is older than PAPERLESS_METADATA_TTL, kick off a
+    background refresh.
+    """
+    loaded_at = mirror.loaded_at.get(kind)
+    if loaded_at is None:
+        await asyncio.shield(_refresh(mirror, kind))
+    elif time.monotonic() - loaded_at > settings.paperless_metadata_ttl:
+        task = _refresh(mirror, kind)
+        task.add_done_callback(_log_refresh_failure)
+
+
+def _log_refresh_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception():
+        print(f"Warning: Background refresh of Paperless metadata failed: {task.exception()}")
+
+
+async def _refresh_after_miss(mirror: _MetadataMirror, kind: str) -> None:
+    """Re-fetch a kind after a lookup miss, unless it was refreshed moments ago"""
+    loaded_at = mirror.loaded_at.get(kind, 0.0)
+    if time.monotonic() - loaded_at > MISS_REFRESH_INTERVAL:
+        await asyncio.shield(_refresh(mirror, kind))
+
+
+async def get_metadata(url: str, token: str, kind: str) -> List[Dict]:
+    """
+    Get all tags, correspondents or document types from the mirror
+
+    Args:
+        url: Paperless base URL without trailing slash
+        token: Paperless API token
+        kind: One of "tags", "correspondents", "document_types"
+
+    Returns:
+        Every item across all result pages
+    """
+    mirror = _get_mirror(url, token)
+    await _ensure_loaded(mirror, kind)
+    return mirror.items.get(kind, [])
+
+
+async def _lookup(mirror: _MetadataMirror, kind: str, name: str) -> Optional[int]:
+    """Resolve a name to an ID, refreshing once on a miss"""
+    await _ensure_loaded(mirror, kind)
+    item_id = mirror.index.get(kind, {}).get(name.lower())
+    if item_id is None:
+        await _refresh_after_miss(mirror, kind)
+        item_id = mirror.index.get(kind, {}).get(name.lower())
+    return item_id
+
+
+async def _create_tag(mirror: _MetadataMirror, tag_name: str) -> int:
+    """Create a tag, sharing the request with concurrent uploads asking for the same name"""
+    key = tag_name.lower()
+    task = mirror.creating_tags.get(key)
+    if task is None:
+        async def run() -> int:
+            try:
+                async with paperless_client(mirror.url, mirror.token) as client:
+                    response = await client.post("/api/tags/", json={'name': tag_name})
+                    response.raise_for_status()
+                    tag = response.json()
+                mirror.items.setdefault("tags", []).append(tag)
+                mirror.index.setdefault("tags", {})[key] = tag['id']
+                return tag['id']
+            finally:
+                mirror.creating_tags.pop(key, None)
+
+        task = asyncio.ensure_future(run())
+        mirror.creating_tags[key] = task
+    return await asyncio.shield(task)
+
+
+async def _resolve_tag(mirror: _MetadataMirror, tag_name: str) -> Optional[int]:
+    """Get tag ID by name, creating it if it doesn't exist"""
+    try:
+        tag_id = await _lookup(mirror, "tags", tag_name)
+        if tag_id is None:
+            tag_id = await _create_tag(mirror, tag_name)
+        return tag_id
+    except Exception as e:
+        print(f"Warning: Failed to get/create tag '{tag_name}': {e}")
+        return None
+
+
+async def _resolve_name(mirror: _MetadataMirror, kind: str, name: str) -> Optional[int]:
+    """Get correspondent or document type ID by name"""
+    try:
+        return await _lookup(mirror, kind, name)
+    except Exception as e:
+        print(f"Warning: Failed to get {kind[:-1].replace('_', ' ')} '{name}': {e}")
+        return None
+
+
+async def resolve_metadata_ids(
+    url: str,
+    token: str,
+    tags: Optional[List[str]] = None,
+    correspondent: Optional[str] = None,
+    document_type: Optional[str] = None
+) -> Tuple[List[int], Optional[int], Optional[int]]:
+    """
+    Resolve tag, correspondent and document type names to Paperless IDs
+
+    Lookups are served from the mirror; only missing tags are created,
+    concurrently and at most once across simultaneous uploads. Names that
+    can't be resolved are skipped with a warning.
+
+    Args:
+        url: Paperless base URL without trailing slash
+        token: Paperless API token
+        tags: Tag names
+        correspondent: Correspondent name
+        document_type: Document type name
+
+    Returns:
+        Tuple of (tag IDs, correspondent ID, document type ID)
+    """
+    mirror = _get_mirror(url, token)
+
+    # Paperless tag names are case-insensitive, keep the first spelling of each
+    unique_tags: Dict[str, str] = {}
+    for tag in tags or []:
+        if tag:
+            unique_tags.setdefault(tag.lower(), tag)
+
+    tag_ids, correspondent_id, document_type_id = await asyncio.gather(
+        asyncio.gather(*(_resolve_tag(mirror, tag) for tag in unique_tags.values())),
+        _resolve_name(mirror, "correspondents", correspondent) if correspondent else _none(),
+        _resolve_name(mirror, "document_types", document_type) if document_type else _none()
+    )
+
+    return list(dict.fromkeys(tag_id for tag_id in tag_ids if tag_id)), correspondent_id, document_type_id
+
+
+async def _none() -> None:
+    return None
+
+
+def warm_metadata_mirror() -> None:
+    """Start loading the configured instance's metadata in the background (called on startup)"""
+    if settings.paperless_enabled and settings.paperless_url and settings.paperless_token:
+        mirror = _get_mirror(settings.paperless_url.rstrip('/'), settings.paperless_token)
+        for kind in KINDS:
+            _refresh(mirror, kind).add_done_callback(_log_refresh_failure)
@@ -1,29 +1,49 @@
 import httpx
 import asyncio
-from typing import List, Optional, Dict
+import os
+import time
+import uuid
+import aiofiles
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, BinaryIO, List, Optional, Dict, Tuple, Union
 from app.config import settings
+from app.services.metrics_service import observe_paperless_stage, observe_paperless_upload
+from app.services.paperless_client import paperless_client
+from app.services.paperless_metadata import get_metadata, resolve_metadata_ids
+
+# PDF to upload: in-memory bytes, a file path, an open binary file, or an async byte stream
+PDFBody = Union[bytes, str, Path, BinaryIO, AsyncIterable[bytes]]
+
+UPLOAD_CHUNK_SIZE = 256 * 1024
 
 
 async def upload_to_paperless(
-    pdf_bytes: bytes,
+    pdf: PDFBody,
     title: str,
     tags: Optional[List[str]] = None,
     correspondent: Optional[str] = None,
     document_type: Optional[str] = None,
     paperless_url: Optional[str] = None,
-    paperless_token: Optional[str] = None
+    paperless_token: Optional[str] = None,
+    pdf_size: Optional[int] = None
 ) -> Dict:
     """
     Upload a PDF document to Paperless-ngx via REST API
 
+    The multipart body is streamed in chunks, so files are never loaded
+    into memory as a whole. When the size is known (bytes, paths, seekable
+    files) it is sent with a Content-Length, otherwise chunked.
+
     Args:
-        pdf_bytes: PDF file as bytes
+        pdf: PDF as bytes, file path, open binary file or async byte stream
         title: Document title
         tags: List of tag names (will be converted to IDs)
         correspondent: Correspondent name
         document_type: Document type name
         paperless_url: Override Paperless URL (from frontend settings)
         paperless_token: Override Paperless token (from frontend settings)
+        pdf_size: Size in bytes of an async byte stream, so it can be sent
+            with a Content-Length
 
     Returns:
         Response from Paperless API with document ID
@@ -44,31 +64,20 @@ async def upload_to_paperless(
     # Remove trailing slash from URL to prevent double slashes
     url = url.rstrip('/')
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        # Get or create tag IDs from tag names
-        tag_ids = []
-        if tags:
-            for tag_name in tags:
-                tag_id = await _get_or_create_tag_id(client, tag_name, url, token)
-                if tag_id:
-                    tag_ids.append(tag_id)
-
-        # Get correspondent and document_type IDs if names provided
-        correspondent_id = None
-        if correspondent:
-            correspondent_id = await _get_correspondent_id(client, correspondent, url, token)
-
-        document_type_id = None
-        if document_type:
-            document_type_id = await _get_document_type_id(client, document_type, url, token)
+    # Resolve tag, correspondent and document type names from the metadata mirror
+    stage_start = time.perf_counter()
+    try:
+        tag_ids, correspondent_id, document_type_id = await resolve_metadata_ids(
+            url, token, tags, correspondent, document_type
+        )
+    except Exception as e:
+        observe_paperless_upload(e)
+        raise
+    observe_paperless_stage("resolve_metadata", time.perf_counter() - stage_start)
 
+    async with paperless_client(url, token) as client:
         # Prepare multipart form data
-        upload_url = f"{url}/api/documents/post_document/"
-
-        # Use bytes directly, not BytesIO (AsyncClient requires it)
-        files = {
-            'document': ('scan.pdf', pdf_bytes, 'application/pdf')
-        }
+        upload_url = "/api/documents/post_document/"
 
         # Build form data as dict (simpler approach)
         data = {'title': title}
@@ -84,16 +93,25 @@ async def upload_to_paperless(
             data['document_type'] = str(document_type_id)
 
         # Make request
-        response = await client.post(
-            upload_url,
-            files=files,
-            data=data,
-            headers={
-                'Authorization': f'Token {token}'
-            }
-        )
+        content_type, body, length = _multipart_body(data, 'document', 'scan.pdf', pdf, pdf_size)
+        headers = {'Content-Type': content_type}
+        if length is not None:
+            headers['Content-Length'] = str(length)
+
+        stage_start = time.perf_counter()
+        try:
+            response = await client.post(
+                upload_url,
+                content=body,
+                headers=headers
+            )
 
-        response.raise_for_status()
+            response.raise_for_status()
+        except Exception as e:
+            observe_paperless_upload(e)
+            raise
+        observe_paperless_stage("post", time.perf_counter() - stage_start)
+        observe_paperless_upload()
 
         # Paperless post_document returns just the task ID as a string
         task_id = response.json()
@@ -103,69 +121,74 @@ async def upload_to_paperless(
         return task_id
 
 
-async def _get_or_create_tag_id(client: httpx.AsyncClient, tag_name: str, paperless_url: str, paperless_token: str) -> Optional[int]:
-    """Get tag ID by name, creating it if it doesn't exist"""
-    try:
-        # Try to find existing tag - use URL encoding for name search
-        import urllib.parse
-        encoded_name = urllib.parse.quote(tag_name)
-        response = await client.get(
-            f"{paperless_url}/api/tags/?name__iexact={encoded_name}",
-            headers={'Authorization': f'Token {paperless_token}'}
-        )
-        response.raise_for_status()
-        results = response.json().get('results', [])
+def _pdf_size(pdf: PDFBody) -> Optional[int]:
+    """Size of the PDF body in bytes, if it can be known up front"""
+    if isinstance(pdf, bytes):
+        return len(pdf)
 
-        if results:
-            return results[0]['id']
-
-        # Create new tag
-        create_response = await client.post(
-            f"{paperless_url}/api/tags/",
-            json={'name': tag_name},
-            headers={'Authorization': f'Token {paperless_token}'}
-        )
-        create_response.raise_for_status()
-        return create_response.json()['id']
+    if isinstance(pdf, (str, Path)):
+        return os.path.getsize(pdf)
 
-    except Exception as e:
-        print(f"Warning: Failed to get/create tag '{tag_name}': {e}")
+    if hasattr(pdf, 'seek') and hasattr(pdf, 'tell'):
+        pdf.seek(0, os.SEEK_END)
+        size = pdf.tell()
+        pdf.seek(0)
+        return size
 
     return None
 
 
-async def _get_correspondent_id(client: httpx.AsyncClient, correspondent_name: str, paperless_url: str, paperless_token: str) -> Optional[int]:
-    """Get correspondent ID by name"""
-    try:
-        import urllib.parse
-        encoded_name = urllib.parse.quote(correspondent_name)
-        response = await client.get(
-            f"{paperless_url}/api/correspondents/?name__iexact={encoded_name}",
-            headers={'Authorization': f'Token {paperless_token}'}
-        )
-        response.raise_for_status()
-        results = response.json().get('results', [])
-        return results[0]['id'] if results else None
-    except Exception as e:
-        print(f"Warning: Failed to get correspondent '{correspondent_name}': {e}")
-        return None
-
+async def _pdf_chunks(pdf: PDFBody) -> AsyncIterator[bytes]:
+    """Read the PDF body in chunks without blocking the event loop"""
+    if isinstance(pdf, bytes):
+        yield pdf
+    elif isinstance(pdf, (str, Path)):
+        async with aiofiles.open(pdf, 'rb') as f:
+            while chunk := await f.read(UPLOAD_CHUNK_SIZE):
+                yield chunk
+    elif hasattr(pdf, 'read'):
+        pdf.seek(0)
+        while chunk := await asyncio.to_thread(pdf.read, UPLOAD_CHUNK_SIZE):
+            yield chunk
+    else:
+        async for chunk in pdf:
+            yield chunk
+
+
+def _multipart_body(
+    fields: Dict[str, str],
+    file_field: str,
+    filename: str,
+    pdf: PDFBody,
+    pdf_size: Optional[int] = None
+) -> Tuple[str, AsyncIterator[bytes], Optional[int]]:
+    """
+    Build a streaming multipart/form-data body
 
-async def _get_document_type_id(client: httpx.AsyncClient, document_type_name: str, paperless_url: str, paperless_token: str) -> Optional[int]:
-    """Get document type ID by name"""
-    try:
-        import urllib.parse
-        encoded_name = urllib.parse.quote(document_type_name)
-        response = await client.get(
-            f"{paperless_url}/api/document_types/?name__iexact={encoded_name}",
-            headers={'Authorization': f'Token {paperless_token}'}
-        )
-        response.raise_for_status()
-        results = response.json().get('results', [])
-        return results[0]['id'] if results else None
-    except Exception as e:
-        print(f"Warning: Failed to get document type '{document_type_name}': {e}")
-        return None
+    Returns:
+        Tuple of (Content-Type header, async body iterator, total length or None)
+    """
+    boundary = uuid.uuid4().hex
+    head = b''.join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode('utf-8')
+        + value.encode('utf-8') + b'\r\n'
+        for name, value in fields.items()
+    )
+    head += (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+        f'Content-Type: application/pdf\r\n\r\n'
+    ).encode('utf-8')
+    tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+
+    async def body() -> AsyncIterator[bytes]:
+        yield head
+        async for chunk in _pdf_chunks(pdf):
+            yield chunk
+        yield tail
+
+    size = pdf_size if pdf_size is not None else _pdf_size(pdf)
+    length = len(head) + size + len(tail) if size is not None else None
+    return f'multipart/form-data; boundary={boundary}', body(), length
 
 
 async def get_paperless_tags() -> List[Dict]:
@@ -173,21 +196,13 @@ async def get_paperless_tags() -> List[Dict]:
     Get available tags from Paperless-ngx
 
     Returns:
-        List of tags with id and name
+        List of tags with id and name (all result pages, served from the metadata mirror)
     """
     if not settings.paperless_enabled or not settings.paperless_token:
         return []
 
-    url = f"{settings.paperless_url.rstrip('/')}/api/tags/"
-
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(
-            url,
-            headers={'Authorization': f'Token {settings.paperless_token}'}
-        )
-        response.raise_for_status()
-        data = response.json()
-        return data.get('results', [])
+    url = settings.paperless_url.rstrip('/')
+    return await get_metadata(url, settings.paperless_token, "tags")
 
 
 async def get_paperless_correspondents() -> List[Dict]:
@@ -195,21 +210,13 @@ async def get_paperless_correspondents() -> List[Dict]:
     Get available correspondents from Paperless-ngx
 
     Returns:
-        List of correspondents with id and name
+        List of correspondents with id and name (all result pages, served from the metadata mirror)
     """
     if not settings.paperless_enabled or not settings.paperless_token:
         return []
 
-    url = f"{settings.paperless_url.rstrip('/')}/api/correspondents/"
-
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(
-            url,
-            headers={'Authorization': f'Token {settings.paperless_token}'}
-        )
-        response.raise_for_status()
-        data = response.json()
-        return data.get('results', [])
+    url = settings.paperless_url.rstrip('/')
+    return await get_metadata(url, settings.paperless_token, "correspondents")
 
 
 async def get_paperless_document_types() -> List[Dict]:
@@ -217,21 +224,13 @@ async def get_paperless_document_types() -> List[Dict]:
     Get available document types from Paperless-ngx
 
     Returns:
-        List of document types with id and name
+        List of document types with id and name (all result pages, served from the metadata mirror)
     """
     if not settings.paperless_enabled or not settings.paperless_token:
         return []
 
-    url = f"{settings.paperless_url.rstrip('/')}/api/document_types/"
-
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(
-            url,
-            headers={'Authorization': f'Token {settings.paperless_token}'}
-        )
-        response.raise_for_status()
-        data = response.json()
-        return data.get('results', [])
+    url = settings.paperless_url.rstrip('/')
+    return await get_metadata(url, settings.paperless_token, "document_types")
 
 
 async def test_paperless_connection() -> Dict:
@@ -254,13 +253,10 @@ async def test_paperless_connection() -> Dict:
         }
 
     try:
-        url = f"{settings.paperless_url.rstrip('/')}/api/documents/"
+        url = settings.paperless_url.rstrip('/')
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(
-                url,
-                headers={'Authorization': f'Token {settings.paperless_token}'}
-            )
+        async with paperless_client(url, settings.paperless_token) as client:
+            response = await client.get("/api/documents/", timeout=10.0)
             response.raise_for_status()
 
             return {
@@ -1,12 +1,183 @@
 import io
+import asyncio
 import base64
-from typing import List
+import math
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
 from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
+import numpy as np
 from PIL import Image
 from datetime import datetime
 from app.config import settings
+from app.services.enhancement_service import (
+    DETECT_SIZE,
+    EnhancementSpec,
+    apply_enhancement,
+    detect_enhancement,
+    resolve_page_modes
+)
+from app.services.executor_service import get_worker_count, pdf_job_slot, pixel_budget_slot, run_cpu_bound
+from app.services.metrics_service import observe_page, observe_pdf
+from app.services.page_cache_service import (
+    drop_cached,
+    get_cached,
+    is_page_cache_enabled,
+    page_cache_key,
+    put_cached
+)
+from app.services.pdf_writer import ImagePDFWriter
+from app.services.upload_service import get_scratch_dir
+
+# A page as received: base64 string (optionally a data URI), raw bytes, or a spooled upload file
+PageSource = Union[str, bytes, Path]
+
+# Image headers are read from at most this many leading bytes (room for a 64 KB EXIF
+# block before the JPEG frame header); the whole image is read if that's not enough
+PROBE_HEADER_BYTES = 128 * 1024
+
+# Re-encoding is only worth it when the requested quality is clearly below the source's
+PASSTHROUGH_QUALITY_TOLERANCE = 5
+
+# A page counts as colorless if fewer than this share of pixels differ by more than
+# COLORLESS_TOLERANCE between their R, G and B values
+COLORLESS_TOLERANCE = 16
+COLORLESS_MAX_COLORED = 0.005
+
+# A single-channel page counts as bitonal if fewer than this share of pixels are
+# more than BITONAL_MARGIN away from pure black or white (leaves room for JPEG noise)
+BITONAL_MARGIN = 32
+BITONAL_MAX_MIDTONES = 0.005
+
+# Size-targeted encoding: container bytes per page (page, content stream, image
+# dictionary, xref) and per document (catalog, info, trailer) outside the image data
+PDF_PAGE_OVERHEAD = 600
+PDF_DOCUMENT_OVERHEAD = 1500
+# When the full-size encode misses the budget, step quality down by this much and retry
+TARGET_QUALITY_STEP = 4
+
+# Size estimation: full-resolution pages are trial-encoded as this many full-width
+# strips of this many rows. Strips start on the 16-row grid of (subsampled) JPEG
+# MCUs, so each cuts the same blocks a full encode would; an unaligned strip splits
+# blocks across the seams and overestimates. Shorter strips sample text lines
+# unevenly; at 64 rows estimates land within 5% of real output on the benchmark
+# corpus at quality 75-98 (tests/test_pdf_estimate.py)
+ESTIMATE_STRIPS = 12
+ESTIMATE_STRIP_ROWS = 64
+ESTIMATE_STRIP_ALIGN = 16
+# Images with less than this share of the page's pixels are treated as thumbnails
+ESTIMATE_THUMBNAIL_MAX_SHARE = 0.8
+# Thumbnails are trial-encoded whole and scaled to the page by (pixel ratio) ** exponent,
+# since downscaling removes fine detail; fitted on text, photo and mixed pages at
+# quality 75-95: JPEG exponent = 0.5 + 0.57 * quality / 100, 1-bit exponent = 1.25.
+# Sensor noise and fine print are invisible in a thumbnail, so these are only good to
+# about a factor of 1.7 per page; a full-resolution sample corrects the bias of a batch
+THUMBNAIL_JPEG_EXPONENT = (0.5, 0.57)
+THUMBNAIL_BITONAL_EXPONENT = 1.25
+
+# Standard JPEG luminance quantization table (ITU T.81, Annex K)
+_STANDARD_LUMINANCE_TABLE = [
+    16, 11, 10, 16, 24, 40, 51, 61, 12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56, 14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77, 24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101, 72, 92, 95, 98, 112, 100, 103, 99
+]
+
+
+@dataclass
+class EncodedPage:
+    """A single page after decoding, flattening, resizing, enhancement and encoding"""
+    index: int
+    data: bytes
+    width: int
+    height: int
+    timings: Dict[str, float] = field(default_factory=dict)  # milliseconds per stage
+    passthrough: bool = False  # original JPEG embedded without decoding
+    color_space: str = "DeviceRGB"  # DeviceGray for single-channel pages
+    bits_per_component: int = 8     # 1 for bitonal pages
+    filter_name: str = "DCTDecode"  # FlateDecode for bitonal pages
+    quality: Optional[int] = None   # JPEG quality used, None for passthrough and bitonal pages
+    enhancement: str = "color"  # Mode applied ("auto" already resolved)
+    cached: bool = False  # Served from the encoded page cache
+
+
+@dataclass
+class PageEstimate:
+    """Predicted image data size of one page"""
+    index: int
+    size: int
+    width: int
+    height: int
+    enhancement: str = "color"
+    measured: bool = True  # False if scaled up from a thumbnail
+    calibration: Optional[float] = None  # Measured size / size predicted from a thumbnail of the same page
+
+
+@dataclass
+class SizeEstimate:
+    """Predicted PDF size, from trial encodes of sample pages or thumbnails"""
+    size: int
+    num_pages: int
+    page_sizes: List[Optional[int]]  # Per image sent, None if it could not be decoded
+    page_enhancements: List[Optional[str]]
+    measured_pages: int
+    thumbnail_pages: int
+    calibration: float  # Correction applied to thumbnail estimates (1.0 without samples)
+    elapsed_ms: float
+
+
+@dataclass
+class PDFBuildResult:
+    """Generated PDF (in a spooled temp file) plus statistics about how it was produced"""
+    file: BinaryIO
+    size: int
+    page_count: int
+    skipped_pages: List[int]  # Positions of input pages that could not be decoded
+    passthrough_pages: int
+    grayscale_pages: int  # Stored as single-channel JPEG
+    bitonal_pages: int    # Stored as 1-bit Flate
+    cached_pages: int     # Served from the encoded page cache
+    page_enhancements: List[Optional[str]]  # Mode applied per input page, None if skipped
+    page_qualities: List[Optional[int]]     # JPEG quality per input page, None if not re-encoded
+    timings: Dict[str, float]  # milliseconds per stage
+    workers: int
+    speedup: float  # summed per-page work divided by wall time spent on pages
+    page_numbers: Optional[List[int]] = None  # Client's number per input page (sessions), None = 1..n
+
+    @property
+    def skipped_page_numbers(self) -> List[int]:
+        """Skipped pages as the client numbers them, for responses"""
+        if self.page_numbers is None:
+            return [idx + 1 for idx in self.skipped_pages]
+        return [self.page_numbers[idx] for idx in self.skipped_pages]
+
+    def server_timing(self) -> str:
+        """Format the stage timings as a Server-Timing header value"""
+        return ", ".join(f"{stage};dur={duration}" for stage, duration in self.timings.items())
+
+    def read_bytes(self) -> bytes:
+        """Read the whole PDF into memory"""
+        self.file.seek(0)
+        return self.file.read()
+
+    async def iter_chunks(self, chunk_size: int = 256 * 1024) -> AsyncIterator[bytes]:
+        """Stream the PDF in chunks, closing the file when done"""
+        try:
+            self.file.seek(0)
+            while True:
+                chunk = await asyncio.to_thread(self.file.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Release the temp file (deleted automatically)"""
+        self.file.close()
 
 
 async def generate_pdf_from_images(
@@ -24,104 +195,939 @@ async def generate_pdf_from_images(
 
     Returns:
         PDF file as bytes
+
+    Raises:
+        PDFQueueFullError: If too many exports are already in progress
+        ValueError: If no image could be decoded
+    """
+    result = await build_pdf(images_base64, title, compression_quality)
+    try:
+        return result.read_bytes()
+    finally:
+        result.close()
+
+
+async def build_pdf(
+    images: List[PageSource],
+    title: str = "Scanned Document",
+    compression_quality: int = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    enhancement: EnhancementSpec = None,
+    target_kb_per_page: Optional[int] = None,
+    target_total_kb: Optional[int] = None
+) -> PDFBuildResult:
+    """
+    Generate a PDF from uploaded images, encoding pages in parallel
+
+    Image headers are read first to admit the export against the decode
+    memory budget (PDF_MEMORY_BUDGET_MB), waiting briefly if other exports
+    are using it. Every page is decoded and JPEG-encoded as its own task in the PDF worker
+    pool (see PDF_EXECUTOR). Pages are written to a spooled temp file in
+    their original order as soon as they are ready and released right
+    after, with at most two pages per worker in flight, so memory stays
+    bounded by a few pages rather than the whole document. Pages that fail
+    to decode are skipped. JPEGs that are already RGB, within
+    PDF_MAX_IMAGE_SIZE and not enhanced are embedded without re-encoding.
+    Pages encoded before with the same settings come from the page cache
+    and skip decoding entirely (and don't count against the memory budget).
+
+    Args:
+        images: Base64-encoded images (with or without data URI prefix), raw
+            image bytes, or paths to spooled upload files
+        title: PDF title metadata
+        compression_quality: JPEG compression quality (1-100), uses config default if None
+        on_progress: Called with (pages done, total pages) after each page is written
+        enhancement: Enhancement mode for every page, or a list with one mode
+            per page (auto, color, grayscale, bw, enhanced); None keeps colors
+            as-is, "auto" picks a mode per page (see detect_enhancement)
+        target_kb_per_page: Size budget per page; each page gets the highest
+            quality up to compression_quality that fits, but never less than
+            PDF_MIN_OCR_QUALITY
+        target_total_kb: Size budget for the whole document, split evenly
+            across pages (combined with target_kb_per_page, the tighter wins)
+
+    Returns:
+        PDFBuildResult with the PDF file and per-stage timings (call close() when done)
+
+    Raises:
+        PDFQueueFullError: If too many exports are already in progress
+        PixelBudgetExceededError: If the decode memory budget stays exhausted
+        ValueError: If an enhancement mode or size budget is invalid, or no
+            image could be decoded
     """
     if compression_quality is None:
         compression_quality = settings.pdf_compression_quality
 
-    # Create PDF in memory
-    pdf_buffer = io.BytesIO()
-    c = canvas.Canvas(pdf_buffer, pagesize=A4)
+    modes = resolve_page_modes(enhancement, len(images))
+    target_bytes = page_size_budget(len(images), target_kb_per_page, target_total_kb)
 
-    # Set PDF metadata
-    c.setTitle(title)
-    c.setAuthor("Document Scanner")
-    c.setSubject("Scanned Document")
-    c.setCreator("Document Scanner v1.0")
+    workers = get_worker_count() if settings.pdf_executor != "inline" else 1
+    sizes = await asyncio.to_thread(probe_page_sizes, images)
 
-    # A4 dimensions
-    page_width, page_height = A4
+    cache_keys: List[Optional[str]] = [None] * len(images)
+    cached: List[Optional[EncodedPage]] = [None] * len(images)
+    if is_page_cache_enabled():
+        lookups = await asyncio.gather(*(
+            asyncio.to_thread(_cache_lookup, idx, source, _encode_params(compression_quality, modes[idx], target_bytes))
+            for idx, source in enumerate(images)
+        ))
+        cache_keys = [key for key, _ in lookups]
+        cached = [page for _, page in lookups]
+        sizes = [None if page is not None else size for size, page in zip(sizes, cached)]
 
-    for idx, img_base64 in enumerate(images_base64):
-        try:
-            # Remove data URI prefix if present
-            if ',' in img_base64:
-                img_base64 = img_base64.split(',', 1)[1]
-
-            # Decode base64 to image bytes
-            img_bytes = base64.b64decode(img_base64)
-            img = Image.open(io.BytesIO(img_bytes))
-
-            # Convert to RGB if needed (removes alpha channel)
-            if img.mode != 'RGB':
-                # Create white background
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'RGBA':
-                    background.paste(img, mask=img.split()[3])  # Use alpha as mask
-                else:
-                    background.paste(img)
-                img = background
-
-            # Resize if image is too large
-            max_size = settings.pdf_max_image_size
-            if img.width > max_size or img.height > max_size:
-                img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-
-            # Compress image
-            img_buffer = io.BytesIO()
-            img.save(
-                img_buffer,
-                'JPEG',
-                quality=compression_quality,
-                optimize=True,
-                progressive=True
+    # Bounds pages that are encoding or encoded-but-not-yet-written
+    window = asyncio.Semaphore(workers * 2)
+
+    async def encode(idx: int, source: PageSource) -> Optional[EncodedPage]:
+        await window.acquire()
+        if cached[idx] is not None:
+            page, cached[idx] = cached[idx], None
+            return page
+        return await encode_page(
+            idx, source, compression_quality, modes[idx], target_bytes, cache_key=cache_keys[idx]
+        )
+
+    tasks: List[Optional[asyncio.Task]] = []
+    try:
+        async with pdf_job_slot(), pixel_budget_slot(pixels_in_flight(sizes, workers * 2)):
+            tasks = [asyncio.ensure_future(encode(idx, source)) for idx, source in enumerate(images)]
+            return await assemble_pdf(
+                tasks,
+                title,
+                workers=workers,
+                on_page_done=window.release,
+                on_progress=on_progress
+            )
+    except BaseException:
+        for task in tasks:
+            if task is not None:
+                task.cancel()
+        raise
+
+
+async def encode_page(
+    idx: int,
+    source: PageSource,
+    compression_quality: int,
+    enhancement: str = "color",
+    target_bytes: Optional[int] = None,
+    cache_key: Optional[str] = None
+) -> Optional[EncodedPage]:
+    """
+    Encode one page in the PDF worker pool, or take it from the page cache
+
+    Args:
+        idx: Page index (used for error messages)
+        source: Base64 string, raw image bytes or spooled upload file path
+        compression_quality: JPEG compression quality (1-100)
+        enhancement: Enhancement mode applied during the same decode pass
+        target_bytes: Size budget for the image data, compression_quality
+            becomes the upper bound of a quality search
+        cache_key: Page cache key if the caller already looked the page up
+            (and missed)
+
+    Returns:
+        EncodedPage, or None if the image could not be processed
+    """
+    params = _encode_params(compression_quality, enhancement, target_bytes)
+
+    if is_page_cache_enabled() and cache_key is None:
+        cache_key, page = await asyncio.to_thread(_cache_lookup, idx, source, params)
+        if page is not None:
+            return page
+
+    page = await run_cpu_bound(_encode_page, idx, source, *params)
+
+    if cache_key is not None and page is not None:
+        await asyncio.to_thread(_cache_store, cache_key, page)
+    return page
+
+
+def _encode_params(compression_quality: int, enhancement: str, target_bytes: Optional[int]) -> Tuple:
+    """Arguments of _encode_page after the source, i.e. everything its output depends on"""
+    return (
+        compression_quality,
+        settings.pdf_max_image_size,
+        settings.pdf_jpeg_passthrough,
+        enhancement,
+        settings.pdf_mode_aware_encoding,
+        target_bytes,
+        settings.pdf_min_ocr_quality
+    )
+
+
+def _cache_lookup(idx: int, source: PageSource, params: Tuple) -> Tuple[Optional[str], Optional[EncodedPage]]:
+    """
+    Hash a page's input as received with its encode parameters and look it up in the page cache
+
+    Returns:
+        Tuple of (cache key, cached page or None); the key is None if the
+        source could not be read
+    """
+    start = time.perf_counter()
+    try:
+        # Base64 pages are hashed as text, so only the worker decodes them; the
+        # source type is part of the key as the same image hashes differently
+        key = page_cache_key(_iter_page_source(source), (type(source).__name__, params))
+    except Exception:
+        # Unreadable input, _encode_page reports it
+        return None, None
+
+    try:
+        entry = get_cached(key)
+        if entry is None:
+            return key, None
+
+        meta, data = entry
+        return key, EncodedPage(
+            index=idx,
+            data=data,
+            timings={"cache": (time.perf_counter() - start) * 1000},
+            cached=True,
+            **meta
+        )
+    except (ValueError, TypeError, OSError) as e:
+        # A corrupt or outdated entry is a miss: drop it and encode the page again
+        print(f"Warning: Dropping unusable page cache entry {key}: {e}")
+        drop_cached(key)
+        return key, None
+
+
+def _iter_page_source(source: PageSource, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """A page's input as received, in chunks: raw bytes, or base64 text without a data URI prefix"""
+    if isinstance(source, bytes):
+        yield source
+    elif isinstance(source, Path):
+        with open(source, 'rb') as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+    else:
+        start = source.find(',', 0, 100) + 1
+        for offset in range(start, len(source), chunk_size):
+            yield source[offset:offset + chunk_size].encode('ascii')
+
+
+def _cache_store(key: str, page: EncodedPage) -> None:
+    """Add an encoded page to the page cache"""
+    meta = {
+        "width": page.width,
+        "height": page.height,
+        "passthrough": page.passthrough,
+        "color_space": page.color_space,
+        "bits_per_component": page.bits_per_component,
+        "filter_name": page.filter_name,
+        "quality": page.quality,
+        "enhancement": page.enhancement
+    }
+    put_cached(key, meta, page.data)
+
+
+async def assemble_pdf(
+    pages: List[Optional[Awaitable[Optional[EncodedPage]]]],
+    title: str,
+    workers: int = 1,
+    on_page_done: Optional[Callable[[], None]] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    page_numbers: Optional[List[int]] = None
+) -> PDFBuildResult:
+    """
+    Write encoded pages into a spooled PDF file in page order
+
+    Each entry is awaited in turn, written, and then cleared from the list
+    so its data can be freed. Entries that resolve to None are skipped.
+
+    Args:
+        pages: Awaitables (usually tasks) resolving to encoded pages
+        title: PDF title metadata
+        workers: Worker count to report in the result
+        on_page_done: Called after each entry has been handled
+        on_progress: Called with (pages done, total pages) after each entry
+        page_numbers: The client's number for each entry, if not 1..n
+
+    Returns:
+        PDFBuildResult with the PDF file and per-stage timings (call close() when done)
+
+    Raises:
+        ValueError: If every entry was skipped (a PDF needs at least one page)
+    """
+    output = tempfile.SpooledTemporaryFile(
+        max_size=settings.pdf_spool_max_memory,
+        dir=get_scratch_dir()
+    )
+    stage_totals: Dict[str, float] = {}
+    skipped_pages: List[int] = []
+    page_enhancements: List[Optional[str]] = [None] * len(pages)
+    page_qualities: List[Optional[int]] = [None] * len(pages)
+    passthrough_pages = 0
+    grayscale_pages = 0
+    bitonal_pages = 0
+    cached_pages = 0
+    assemble_time = 0.0
+
+    try:
+        started = time.perf_counter()
+        writer = ImagePDFWriter(
+            output,
+            page_size=A4,
+            title=title,
+            author="Document Scanner",
+            subject="Scanned Document",
+            creator="Document Scanner v1.0"
+        )
+
+        # DON'T add page numbers - this causes OCRmyPDF to skip OCR!
+        # The PDF must be pure images for Paperless OCR to work
+        for idx in range(len(pages)):
+            page = await pages[idx]
+            pages[idx] = None
+            try:
+                if page is None:
+                    skipped_pages.append(idx)
+                    continue
+
+                for stage, duration in page.timings.items():
+                    stage_totals[stage] = stage_totals.get(stage, 0.0) + duration
+                passthrough_pages += page.passthrough
+                cached_pages += page.cached
+                if page.bits_per_component == 1:
+                    bitonal_pages += 1
+                elif page.color_space == "DeviceGray":
+                    grayscale_pages += 1
+                page_enhancements[idx] = page.enhancement
+                page_qualities[idx] = page.quality
+
+                write_start = time.perf_counter()
+                await asyncio.to_thread(
+                    writer.add_image_page,
+                    page.data,
+                    page.width,
+                    page.height,
+                    page.color_space,
+                    page.bits_per_component,
+                    page.filter_name
+                )
+                write_time = time.perf_counter() - write_start
+                assemble_time += write_time
+                observe_page(
+                    "cached" if page.cached else "passthrough" if page.passthrough else "encoded",
+                    {**page.timings, "assemble": write_time * 1000}
+                )
+                del page
+            finally:
+                if on_page_done is not None:
+                    on_page_done()
+                if on_progress is not None:
+                    on_progress(idx + 1, len(pages))
+
+        if writer.page_count == 0:
+            raise ValueError("None of the images could be decoded")
+        await asyncio.to_thread(writer.close)
+        finished = time.perf_counter()
+    except BaseException:
+        output.close()
+        raise
+
+    # Per-page stage times are summed across workers; "total" is wall time
+    timings = {stage: round(duration, 1) for stage, duration in stage_totals.items()}
+    page_work = sum(timings.values())
+    pages_wall = (finished - started) * 1000
+    timings["assemble"] = round(assemble_time * 1000, 1)
+    timings["total"] = round(pages_wall, 1)
+    observe_pdf(
+        finished - started,
+        pages=writer.page_count,
+        size=output.tell(),
+        skipped=len(skipped_pages)
+    )
+
+    return PDFBuildResult(
+        file=output,
+        size=output.tell(),
+        page_count=writer.page_count,
+        skipped_pages=skipped_pages,
+        passthrough_pages=passthrough_pages,
+        grayscale_pages=grayscale_pages,
+        bitonal_pages=bitonal_pages,
+        cached_pages=cached_pages,
+        page_enhancements=page_enhancements,
+        page_qualities=page_qualities,
+        timings=timings,
+        workers=workers,
+        speedup=round(page_work / pages_wall, 2) if pages_wall > 0 else 1.0,
+        page_numbers=page_numbers
+    )
+
+
+def _encode_page(
+    idx: int,
+    source: PageSource,
+    compression_quality: int,
+    max_size: int,
+    allow_passthrough: bool = True,
+    enhancement: str = "color",
+    mode_aware: bool = True,
+    target_bytes: Optional[int] = None,
+    min_quality: int = 1
+) -> Optional[EncodedPage]:
+    """Decode, flatten, resize, enhance and encode one page (runs inside the PDF worker pool)"""
+    try:
+        timings = {}
+        stage_start = time.perf_counter()
+
+        img_bytes = _read_page_source(source)
+        timings["read"] = (time.perf_counter() - stage_start) * 1000
+        stage_start = time.perf_counter()
+        img = Image.open(io.BytesIO(img_bytes))
+
+        # JPEGs can be judged from a reduced-size decode, before deciding on passthrough
+        preview = None
+        if enhancement == "auto" and img.format == 'JPEG':
+            detect_start = time.perf_counter()
+            preview = _jpeg_preview(img_bytes)
+            enhancement = detect_enhancement(preview)
+            timings["detect"] = (time.perf_counter() - detect_start) * 1000
+            stage_start += time.perf_counter() - detect_start
+
+        # Embed camera JPEGs directly when re-encoding would gain nothing; colorless
+        # ones (e.g. B&W pages enhanced on the phone) are worth storing as gray or 1-bit
+        if (
+            allow_passthrough
+            and enhancement == "color"
+            and _can_pass_through(img, img_bytes, compression_quality, max_size)
+            and (target_bytes is None or len(img_bytes) <= target_bytes)
+            and not (mode_aware and _is_colorless(preview or _jpeg_preview(img_bytes)))
+        ):
+            timings["decode"] = (time.perf_counter() - stage_start) * 1000
+            return EncodedPage(
+                index=idx,
+                data=img_bytes,
+                width=img.width,
+                height=img.height,
+                timings=timings,
+                passthrough=True
+            )
+
+        img = _flatten_to_rgb(img)
+
+        timings["decode"] = (time.perf_counter() - stage_start) * 1000
+        stage_start = time.perf_counter()
+
+        if enhancement == "auto":
+            enhancement = detect_enhancement(img)
+            timings["detect"] = (time.perf_counter() - stage_start) * 1000
+            stage_start = time.perf_counter()
+
+        # Resize if image is too large
+        if img.width > max_size or img.height > max_size:
+            img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+
+        timings["resize"] = (time.perf_counter() - stage_start) * 1000
+        stage_start = time.perf_counter()
+
+        if enhancement != "color":
+            img = apply_enhancement(img, enhancement)
+            timings["enhance"] = (time.perf_counter() - stage_start) * 1000
+            stage_start = time.perf_counter()
+
+        if mode_aware:
+            img = _reduce_color_mode(img)
+
+        if img.mode == '1':
+            # Black-and-white page: 1-bit samples, rows padded to whole bytes as PDF expects
+            data = zlib.compress(img.tobytes(), 6)
+            timings["encode"] = (time.perf_counter() - stage_start) * 1000
+            return EncodedPage(
+                index=idx,
+                data=data,
+                width=img.width,
+                height=img.height,
+                timings=timings,
+                color_space="DeviceGray",
+                bits_per_component=1,
+                filter_name="FlateDecode",
+                enhancement=enhancement
+            )
+
+        # Compress image
+        if target_bytes is None:
+            data = _encode_jpeg(img, compression_quality)
+            quality = compression_quality
+        else:
+            data, quality = _encode_jpeg_to_budget(img, compression_quality, target_bytes, min_quality)
+
+        timings["encode"] = (time.perf_counter() - stage_start) * 1000
+
+        return EncodedPage(
+            index=idx,
+            data=data,
+            width=img.width,
+            height=img.height,
+            timings=timings,
+            color_space="DeviceGray" if img.mode == "L" else "DeviceRGB",
+            enhancement=enhancement,
+            quality=quality
+        )
+
+    except Exception as e:
+        print(f"Error processing image {idx + 1}: {e}")
+        # Skip this image and continue
+        return None
+
+
+def _flatten_to_rgb(img: Image.Image) -> Image.Image:
+    """Decode an image and convert it to RGB, compositing transparency onto white"""
+    img.load()
+
+    # Convert to RGB if needed (removes alpha channel)
+    if img.mode != 'RGB':
+        # Create white background
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'RGBA':
+            background.paste(img, mask=img.split()[3])  # Use alpha as mask
+        else:
+            background.paste(img)
+        img = background
+
+    return img
+
+
+def page_size_budget(
+    page_count: int,
+    target_kb_per_page: Optional[int] = None,
+    target_total_kb: Optional[int] = None
+) -> Optional[int]:
+    """
+    Image data budget per page in bytes for a size-targeted PDF
+
+    Returns:
+        Bytes per page, or None if no target was given
+
+    Raises:
+        ValueError: If a target is not positive or too small to hold the PDF structure
+    """
+    budgets = []
+    if target_kb_per_page is not None:
+        if target_kb_per_page <= 0:
+            raise ValueError("target_kb_per_page must be positive")
+        budgets.append(target_kb_per_page * 1024 - PDF_PAGE_OVERHEAD)
+    if target_total_kb is not None:
+        if target_total_kb <= 0:
+            raise ValueError("target_total_kb must be positive")
+        budgets.append(
+            (target_total_kb * 1024 - PDF_DOCUMENT_OVERHEAD) // max(page_count, 1) - PDF_PAGE_OVERHEAD
+        )
+
+    if not budgets:
+        return None
+    if min(budgets) <= 0:
+        raise ValueError("Size target is too small for the number of pages")
+    return min(budgets)
+
+
+def _encode_jpeg(img: Image.Image, quality: int, optimize: bool = True) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, 'JPEG', quality=quality, optimize=optimize, progressive=optimize)
+    return buffer.getvalue()
+
+
+def _encode_jpeg_to_budget(
+    img: Image.Image,
+    max_quality: int,
+    target_bytes: int,
+    min_quality: int
+) -> Tuple[bytes, int]:
+    """
+    Find the highest JPEG quality within [min_quality, max_quality] that fits target_bytes
+
+    Pages that fit at max_quality (blank or sparse pages) cost one encode.
+    Otherwise the search runs on a half-size copy with fast encoder
+    settings, scaled by the measured full/half size ratio, followed by one
+    full-size encode (plus a step down in the rare case the estimate was
+    optimistic). The quality never drops below min_quality, even if the
+    page then exceeds the budget.
+
+    Returns:
+        Tuple of (JPEG bytes, quality used)
+    """
+    min_quality = min(min_quality, max_quality)
+    data = _encode_jpeg(img, max_quality)
+    if len(data) <= target_bytes or max_quality == min_quality:
+        return data, max_quality
+
+    trial = img.reduce(2) if min(img.size) >= 400 else img
+    ratio = len(data) / len(_encode_jpeg(trial, max_quality, optimize=False))
+
+    best = min_quality
+    low, high = min_quality + 1, max_quality - 1
+    while low <= high:
+        mid = (low + high) // 2
+        if len(_encode_jpeg(trial, mid, optimize=False)) * ratio <= target_bytes:
+            best = mid
+            low = mid + 1
+        else:
+            high = mid - 1
+
+    quality = best
+    data = _encode_jpeg(img, quality)
+    while len(data) > target_bytes and quality > min_quality:
+        quality = max(min_quality, quality - TARGET_QUALITY_STEP)
+        data = _encode_jpeg(img, quality)
+    return data, quality
+
+
+def _reduce_color_mode(img: Image.Image) -> Image.Image:
+    """
+    Drop color information the page doesn't use
+
+    RGB pages without visible color become single-channel; single-channel
+    pages that are only black and white (e.g. the bw enhancement, or a B&W
+    scan that went through JPEG) become 1-bit.
+    """
+    if img.mode == 'RGB' and _is_colorless(img):
+        img = img.convert('L')
+
+    if img.mode == 'L':
+        hist = img.histogram()
+        midtones = sum(hist[BITONAL_MARGIN:256 - BITONAL_MARGIN])
+        if midtones <= BITONAL_MAX_MIDTONES * img.width * img.height:
+            img = img.convert('1', dither=Image.Dither.NONE)
+
+    return img
+
+
+def _is_colorless(img: Image.Image) -> bool:
+    """Check whether an RGB image is gray apart from noise, on a copy of at most ~1024 px"""
+    factor = max(1, max(img.size) // 1024)
+    sample = np.asarray(img.reduce(factor) if factor > 1 else img, dtype=np.int16)
+    spread = sample.max(axis=2) - sample.min(axis=2)
+    return np.count_nonzero(spread > COLORLESS_TOLERANCE) <= COLORLESS_MAX_COLORED * spread.size
+
+
+def _jpeg_preview(img_bytes: bytes) -> Image.Image:
+    """Decode a JPEG at 1/2-1/8 scale (DCT scaling, much cheaper than a full decode)"""
+    preview = Image.open(io.BytesIO(img_bytes))
+    preview.draft('RGB', (DETECT_SIZE, DETECT_SIZE))
+    return preview.convert('RGB')
+
+
+def _read_page_source(source: PageSource) -> bytes:
+    """Get the raw image bytes for a page"""
+    if isinstance(source, bytes):
+        return source
+
+    if isinstance(source, Path):
+        return source.read_bytes()
+
+    # Remove data URI prefix if present
+    if ',' in source:
+        source = source.split(',', 1)[1]
+
+    # Decode base64 to image bytes
+    return base64.b64decode(source)
+
+
+def _can_pass_through(img: Image.Image, img_bytes: bytes, compression_quality: int, max_size: int) -> bool:
+    """Check whether an image can be embedded as its original DCT stream"""
+    if img.format != 'JPEG' or img.mode != 'RGB':
+        return False
+
+    if img.width > max_size or img.height > max_size:
+        return False
+
+    # Truncated files would otherwise have been rejected by a full decode
+    if not img_bytes.rstrip(b'\x00').endswith(b'\xff\xd9'):
+        return False
+
+    source_quality = _estimate_jpeg_quality(img)
+    if source_quality is None:
+        return False
+
+    return compression_quality >= source_quality - PASSTHROUGH_QUALITY_TOLERANCE
+
+
+def _estimate_jpeg_quality(img: Image.Image) -> Optional[int]:
+    """Estimate the libjpeg quality setting from the luminance quantization table"""
+    tables = getattr(img, 'quantization', None)
+    if not tables or 0 not in tables:
+        return None
+
+    # Pillow returns tables in zigzag order, which doesn't change the sums
+    scale = sum(tables[0]) * 100 / sum(_STANDARD_LUMINANCE_TABLE)
+    if scale <= 100:
+        quality = (200 - scale) / 2
+    else:
+        quality = 5000 / scale
+
+    return max(1, min(100, round(quality)))
+
+
+async def estimate_pdf_size_from_pages(
+    images: List[PageSource],
+    num_pages: Optional[int] = None,
+    compression_quality: Optional[int] = None,
+    enhancement: EnhancementSpec = None,
+    page_size: Optional[Tuple[int, int]] = None
+) -> SizeEstimate:
+    """
+    Predict the size of a PDF from sample pages and/or page thumbnails
+
+    Full-resolution pages are decoded and enhanced like in build_pdf, but
+    only ESTIMATE_STRIPS full-width strips are encoded and scaled up to the
+    page. Thumbnails are encoded whole and scaled with a fitted exponent.
+    When both are sent, each sample is also predicted from a thumbnail of
+    itself, and the thumbnails are corrected by how far off that was (so
+    one full-size capture calibrates a whole batch of thumbnails).
+
+    Args:
+        images: Base64-encoded pages or raw image bytes; full-resolution
+            samples, thumbnails, or a mix
+        num_pages: Pages in the document, defaults to the number of images;
+            pages without an image get the average estimate
+        compression_quality: JPEG compression quality (1-100), uses config default if None
+        enhancement: Enhancement mode for every image, or one per image
+        page_size: Full-resolution (width, height) of the pages, defaults
+            to the largest image; smaller images count as thumbnails
+
+    Returns:
+        SizeEstimate
+
+    Raises:
+        PDFQueueFullError: If too many exports are already in progress
+        PixelBudgetExceededError: If the decode memory budget stays exhausted
+        ValueError: If no image could be decoded, num_pages is smaller than
+            the number of images, or an enhancement mode is invalid
+    """
+    start = time.perf_counter()
+    if compression_quality is None:
+        compression_quality = settings.pdf_compression_quality
+    if num_pages is None:
+        num_pages = len(images)
+    if num_pages < len(images):
+        raise ValueError(f"Got {len(images)} images for {num_pages} pages")
+
+    modes = resolve_page_modes(enhancement, len(images))
+    workers = get_worker_count() if settings.pdf_executor != "inline" else 1
+
+    sizes = await asyncio.to_thread(probe_page_sizes, images)
+    known = [size for size in sizes if size is not None]
+    if not known:
+        raise ValueError("None of the images could be decoded")
+
+    async with pdf_job_slot(), pixel_budget_slot(pixels_in_flight(sizes, workers)):
+        if page_size is None:
+            page_size = max(known, key=lambda size: size[0] * size[1])
+        page_pixels = page_size[0] * page_size[1]
+        is_thumbnail = [
+            size is not None and size[0] * size[1] < ESTIMATE_THUMBNAIL_MAX_SHARE * page_pixels
+            for size in sizes
+        ]
+        thumbnail_side = max(
+            (max(size) for size, thumbnail in zip(sizes, is_thumbnail) if thumbnail),
+            default=None
+        )
+
+        estimates: List[Optional[PageEstimate]] = await asyncio.gather(*(
+            run_cpu_bound(
+                _estimate_page,
+                idx,
+                source,
+                compression_quality,
+                settings.pdf_max_image_size,
+                settings.pdf_jpeg_passthrough,
+                modes[idx],
+                settings.pdf_mode_aware_encoding,
+                page_size if is_thumbnail[idx] else None,
+                thumbnail_side
             )
-            img_buffer.seek(0)
-
-            # Calculate scaling to fit page while maintaining aspect ratio
-            img_aspect = img.width / img.height
-            page_aspect = page_width / page_height
-
-            if img_aspect > page_aspect:
-                # Image is wider than page
-                draw_width = page_width
-                draw_height = page_width / img_aspect
-            else:
-                # Image is taller than page
-                draw_height = page_height
-                draw_width = page_height * img_aspect
-
-            # Center image on page
-            x_offset = (page_width - draw_width) / 2
-            y_offset = (page_height - draw_height) / 2
-
-            # Draw image on PDF
-            c.drawImage(
-                ImageReader(img_buffer),
-                x_offset,
-                y_offset,
-                width=draw_width,
-                height=draw_height,
-                preserveAspectRatio=True
+            for idx, source in enumerate(images)
+        ))
+
+    calibrations = [e.calibration for e in estimates if e is not None and e.calibration]
+    calibration = math.exp(sum(map(math.log, calibrations)) / len(calibrations)) if calibrations else 1.0
+
+    page_sizes = [
+        None if e is None
+        else round(e.size * (1.0 if e.measured else calibration)) + PDF_PAGE_OVERHEAD
+        for e in estimates
+    ]
+    decoded = [size for size in page_sizes if size is not None]
+    if not decoded:
+        raise ValueError("None of the images could be decoded")
+
+    # Pages without an image are assumed to be average; undecodable images are skipped like in build_pdf
+    missing = num_pages - len(images)
+    total = sum(decoded) + round(missing * sum(decoded) / len(decoded)) + PDF_DOCUMENT_OVERHEAD
+
+    return SizeEstimate(
+        size=total,
+        num_pages=num_pages,
+        page_sizes=page_sizes,
+        page_enhancements=[e.enhancement if e else None for e in estimates],
+        measured_pages=sum(1 for e in estimates if e is not None and e.measured),
+        thumbnail_pages=sum(1 for e in estimates if e is not None and not e.measured),
+        calibration=round(calibration, 3),
+        elapsed_ms=round((time.perf_counter() - start) * 1000, 1)
+    )
+
+
+def probe_page_sizes(images: List[PageSource]) -> List[Optional[Tuple[int, int]]]:
+    """
+    Read the pixel dimensions of pages from their image headers, without decoding
+
+    Returns:
+        (width, height) per page, None for pages that are not readable images
+    """
+    return [_probe_page_size(source) for source in images]
+
+
+def _probe_page_size(source: PageSource) -> Optional[Tuple[int, int]]:
+    try:
+        return Image.open(io.BytesIO(_read_page_header(source))).size
+    except Exception:
+        pass
+    try:
+        return Image.open(io.BytesIO(_read_page_source(source))).size
+    except Exception:
+        return None
+
+
+def _read_page_header(source: PageSource) -> bytes:
+    """Get the first PROBE_HEADER_BYTES of a page's image data"""
+    if isinstance(source, bytes):
+        return source[:PROBE_HEADER_BYTES]
+
+    if isinstance(source, Path):
+        with open(source, 'rb') as f:
+            return f.read(PROBE_HEADER_BYTES)
+
+    # Skip a data URI prefix; 4 base64 characters per 3 bytes
+    start = source.find(',', 0, 100) + 1
+    return base64.b64decode(source[start:start + PROBE_HEADER_BYTES // 3 * 4])
+
+
+def pixels_in_flight(sizes: List[Optional[Tuple[int, int]]], pages_at_once: int) -> int:
+    """Decoded pixels an export holds at its peak, with up to pages_at_once pages being processed"""
+    pixels = sorted((width * height for width, height in filter(None, sizes)), reverse=True)
+    return sum(pixels[:pages_at_once])
+
+
+def _estimate_page(
+    idx: int,
+    source: PageSource,
+    compression_quality: int,
+    max_size: int,
+    allow_passthrough: bool = True,
+    enhancement: str = "color",
+    mode_aware: bool = True,
+    page_size: Optional[Tuple[int, int]] = None,
+    thumbnail_side: Optional[int] = None
+) -> Optional[PageEstimate]:
+    """
+    Predict the image data size of one page (runs inside the PDF worker pool)
+
+    Args:
+        page_size: Full-resolution page size if the image is a thumbnail
+        thumbnail_side: Long side of the thumbnails in the same request, to
+            calibrate them against this (full-resolution) page
+    """
+    try:
+        img_bytes = _read_page_source(source)
+        img = Image.open(io.BytesIO(img_bytes))
+
+        if (
+            page_size is None
+            and allow_passthrough
+            and enhancement == "color"
+            and _can_pass_through(img, img_bytes, compression_quality, max_size)
+            and not (mode_aware and _is_colorless(_jpeg_preview(img_bytes)))
+        ):
+            return PageEstimate(idx, len(img_bytes), img.width, img.height)
+
+        img = _flatten_to_rgb(img)
+        if enhancement == "auto":
+            enhancement = detect_enhancement(img)
+
+        if page_size is not None:
+            width, height = _fit_within(page_size, max_size)
+            size = _thumbnail_trial_size(img, width * height, compression_quality, enhancement, mode_aware)
+            return PageEstimate(idx, size, width, height, enhancement, measured=False)
+
+        if img.width > max_size or img.height > max_size:
+            img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+
+        sample = _sample_strips(img)
+        sample_size, _ = _trial_encode_size(sample, compression_quality, enhancement, mode_aware)
+        size = round(sample_size * (img.width * img.height) / (sample.width * sample.height))
+
+        calibration = None
+        if thumbnail_side:
+            thumbnail = img.copy()
+            thumbnail.thumbnail((thumbnail_side, thumbnail_side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+            predicted = _thumbnail_trial_size(
+                thumbnail, img.width * img.height, compression_quality, enhancement, mode_aware
             )
+            calibration = size / max(predicted, 1)
 
-            # DON'T add page numbers - this causes OCRmyPDF to skip OCR!
-            # The PDF must be pure images for Paperless OCR to work
+        return PageEstimate(idx, size, img.width, img.height, enhancement, calibration=calibration)
 
-            # Move to next page if not the last image
-            if idx < len(images_base64) - 1:
-                c.showPage()
+    except Exception as e:
+        print(f"Error estimating image {idx + 1}: {e}")
+        return None
 
-        except Exception as e:
-            print(f"Error processing image {idx + 1}: {e}")
-            # Skip this image and continue
-            continue
 
-    # Save PDF
-    c.save()
+def _fit_within(size: Tuple[int, int], max_size: int) -> Tuple[int, int]:
+    """Page size after the PDF_MAX_IMAGE_SIZE downscale, keeping the aspect ratio"""
+    width, height = size
+    scale = min(1.0, max_size / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
 
-    # Get PDF bytes
-    pdf_buffer.seek(0)
-    return pdf_buffer.getvalue()
+
+def _sample_strips(img: Image.Image) -> Image.Image:
+    """Stack ESTIMATE_STRIPS evenly spaced full-width strips into one image"""
+    if img.height <= 2 * ESTIMATE_STRIPS * ESTIMATE_STRIP_ROWS:
+        return img
+
+    sample = Image.new(img.mode, (img.width, ESTIMATE_STRIPS * ESTIMATE_STRIP_ROWS))
+    pitch = img.height / ESTIMATE_STRIPS
+    last = (img.height - ESTIMATE_STRIP_ROWS) // ESTIMATE_STRIP_ALIGN * ESTIMATE_STRIP_ALIGN
+    for strip in range(ESTIMATE_STRIPS):
+        center = int((strip + 0.5) * pitch) - ESTIMATE_STRIP_ROWS // 2
+        top = min(max(0, center // ESTIMATE_STRIP_ALIGN * ESTIMATE_STRIP_ALIGN), last)
+        sample.paste(img.crop((0, top, img.width, top + ESTIMATE_STRIP_ROWS)), (0, strip * ESTIMATE_STRIP_ROWS))
+    return sample
+
+
+def _trial_encode_size(img: Image.Image, quality: int, enhancement: str, mode_aware: bool) -> Tuple[int, bool]:
+    """
+    Encode an image the way _encode_page would and measure it
+
+    Returns:
+        Tuple of (encoded bytes, whether it was stored as 1-bit)
+    """
+    if enhancement != "color":
+        img = apply_enhancement(img, enhancement)
+    if mode_aware:
+        img = _reduce_color_mode(img)
+
+    if img.mode == '1':
+        return len(zlib.compress(img.tobytes(), 6)), True
+    return len(_encode_jpeg(img, quality)), False
+
+
+def _thumbnail_trial_size(
+    thumbnail: Image.Image,
+    page_pixels: int,
+    quality: int,
+    enhancement: str,
+    mode_aware: bool
+) -> int:
+    """Predict a page's encoded size from a trial encode of its thumbnail"""
+    size, bitonal = _trial_encode_size(thumbnail, quality, enhancement, mode_aware)
+    if bitonal:
+        exponent = THUMBNAIL_BITONAL_EXPONENT
+    else:
+        exponent = THUMBNAIL_JPEG_EXPONENT[0] + THUMBNAIL_JPEG_EXPONENT[1] * quality / 100
+    return round(size * (page_pixels / (thumbnail.width * thumbnail.height)) ** exponent)
 
 
 def get_pdf_file_size(pdf_bytes: bytes) -> int:
@@ -131,7 +1137,10 @@ def get_pdf_file_size(pdf_bytes: bytes) -> int:
 
 def estimate_pdf_size(num_pages: int, compression_quality: int = 85) -> int:
     """
-    Estimate PDF file size based on number of pages
+    Rough PDF size from the page count alone
+
+    Fallback for when no sample pages or thumbnails are available, see
+    estimate_pdf_size_from_pages.
 
     Args:
         num_pages: Number of pages
@@ -0,0 +1,177 @@
+import hashlib
+from datetime import datetime
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+
+def _pdf_number(value: float) -> str:
+    """Format a number for a PDF content stream"""
+    return f"{value:.4f}".rstrip('0').rstrip('.')
+
+
+def _pdf_string(value: str) -> str:
+    """Encode a text string for the document info dictionary"""
+    try:
+        value.encode('ascii')
+    except UnicodeEncodeError:
+        # Non-ASCII text must be UTF-16BE with a byte order mark
+        return '<FEFF' + value.encode('utf-16-be').hex().upper() + '>'
+
+    escaped = value.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return f'({escaped})'
+
+
+class ImagePDFWriter:
+    """
+    Minimal PDF writer for documents made of one full-page image per page
+
+    Image data is embedded exactly as given (e.g. an existing JPEG as a
+    DCTDecode stream), so pages never have to be decoded again during
+    assembly. Each page is written to the output as soon as it is added.
+    Identical images are stored only once.
+    """
+
+    def __init__(
+        self,
+        output: BinaryIO,
+        page_size: Tuple[float, float],
+        title: str = "",
+        author: str = "",
+        subject: str = "",
+        creator: str = ""
+    ):
+        self._output = output
+        self._page_width, self._page_height = page_size
+        self._offsets: Dict[int, int] = {}
+        self._page_refs: List[int] = []
+        self._image_refs: Dict[bytes, int] = {}
+        self._position = 0
+
+        # Object numbers 1-3 are reserved for the catalog, page tree and info
+        self._next_object = 4
+
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+
+        info = {
+            'Title': title,
+            'Author': author,
+            'Subject': subject,
+            'Creator': creator,
+            'Producer': creator
+        }
+        entries = ' '.join(f'/{key} {_pdf_string(value)}' for key, value in info.items() if value)
+        created = datetime.now().strftime("D:%Y%m%d%H%M%S")
+        self._write_object(3, f'<< {entries} /CreationDate ({created}) >>'.encode('latin-1'))
+
+    @property
+    def page_count(self) -> int:
+        return len(self._page_refs)
+
+    def add_image_page(
+        self,
+        data: bytes,
+        width: int,
+        height: int,
+        color_space: str = "DeviceRGB",
+        bits_per_component: int = 8,
+        filter_name: Optional[str] = "DCTDecode",
+        decode_parms: Optional[str] = None
+    ) -> None:
+        """
+        Add a page showing one image, scaled to fit and centered
+
+        Args:
+            data: Encoded image stream (e.g. complete JPEG file for DCTDecode)
+            width: Image width in pixels
+            height: Image height in pixels
+            color_space: PDF color space name
+            bits_per_component: Bits per color component
+            filter_name: PDF filter the data is encoded with, or None for raw samples
+            decode_parms: Optional DecodeParms dictionary for the filter
+        """
+        image_dict = (
+            f'<< /Type /XObject /Subtype /Image /Width {width} /Height {height} '
+            f'/ColorSpace /{color_space} /BitsPerComponent {bits_per_component} '
+        )
+        if filter_name:
+            image_dict += f'/Filter /{filter_name} '
+        if decode_parms:
+            image_dict += f'/DecodeParms {decode_parms} '
+        image_dict += f'/Length {len(data)} >>'
+
+        hasher = hashlib.sha1(image_dict.encode('latin-1'))
+        hasher.update(data)
+        digest = hasher.digest()
+        image_ref = self._image_refs.get(digest)
+        if image_ref is None:
+            image_ref = self._allocate()
+            self._write_stream(image_ref, image_dict.encode('latin-1'), data)
+            self._image_refs[digest] = image_ref
+
+        content_ref = self._allocate()
+        page_ref = self._allocate()
+
+        # Scale to fit the page while maintaining aspect ratio
+        img_aspect = width / height
+        page_aspect = self._page_width / self._page_height
+
+        if img_aspect > page_aspect:
+            # Image is wider than page
+            draw_width = self._page_width
+            draw_height = self._page_width / img_aspect
+        else:
+            # Image is taller than page
+            draw_height = self._page_height
+            draw_width = self._page_height * img_aspect
+
+        # Center image on page
+        x_offset = (self._page_width - draw_width) / 2
+        y_offset = (self._page_height - draw_height) / 2
+
+        content = (
+            f'q {_pdf_number(draw_width)} 0 0 {_pdf_number(draw_height)} '
+            f'{_pdf_number(x_offset)} {_pdf_number(y_offset)} cm /Im0 Do Q'
+        ).encode('latin-1')
+        self._write_stream(content_ref, f'<< /Length {len(content)} >>'.encode('latin-1'), content)
+
+        self._write_object(page_ref, (
+            f'<< /Type /Page /Parent 2 0 R '
+            f'/MediaBox [0 0 {_pdf_number(self._page_width)} {_pdf_number(self._page_height)}] '
+            f'/Resources << /XObject << /Im0 {image_ref} 0 R >> >> '
+            f'/Contents {content_ref} 0 R >>'
+        ).encode('latin-1'))
+
+        self._page_refs.append(page_ref)
+
+    def close(self) -> None:
+        """Write the page tree, cross-reference table and trailer"""
+        kids = ' '.join(f'{ref} 0 R' for ref in self._page_refs)
+        self._write_object(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self._page_refs)} >>'.encode('latin-1'))
+
+        xref_position = self._position
+        size = self._next_object
+        lines = [f'xref\n0 {size}\n', '0000000000 65535 f \n']
+        for number in range(1, size):
+            lines.append(f'{self._offsets[number]:010d} 00000 n \n')
+        lines.append(f'trailer\n<< /Size {size} /Root 1 0 R /Info 3 0 R >>\n')
+        lines.append(f'startxref\n{xref_position}\n%%EOF\n')
+        self._write(''.join(lines).encode('latin-1'))
+
+    def _allocate(self) -> int:
+        number = self._next_object
+        self._next_object += 1
+        return number
+
+    def _write(self, data: bytes) -> None:
+        self._output.write(data)
+        self._position += len(data)
+
+    def _write_object(self, number: int, body: bytes) -> None:
+        self._offsets[number] = self._position
+        self._write(f'{number} 0 obj\n'.encode('latin-1') + body + b'\nendobj\n')
+
+    def _write_stream(self, number: int, dictionary: bytes, data: bytes) -> None:
+        self._offsets[number] = self._position
+        self._write(f'{number} 0 obj\n'.encode('latin-1') + dictionary + b'\nstream\n')
+        self._write(data)
+        self._write(b'\nendstream\nendobj\n')
@@ -0,0 +1,247 @@
+import asyncio
+import contextvars
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.config import settings
+from app.services.settings_service import SETTINGS_FILE
+
+# Only requests to these prefixes can be profiled
+PROFILED_PREFIXES = ("/api/pdf", "/api/paperless")
+# Header only: a query parameter would end up in access logs and browser history
+PROFILE_HEADER = b"x-profile-token"
+
+# Profile of the request being handled, visible to tasks it starts and to run_cpu_bound
+_current: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("request_profile", default=None)
+
+
+def _frame_label(code) -> str:
+    """'function (dir/file.py:line)', without the ';' collapsed stacks use as separator"""
+    path = Path(code.co_filename)
+    return f"{code.co_name} ({path.parent.name}/{path.name}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _collapse(frames) -> str:
+    """Join frames (outermost first) into a collapsed stack"""
+    return ";".join(_frame_label(frame.f_code) for frame in frames)
+
+
+def _thread_stack(frame) -> list:
+    """Frames of a thread's stack, outermost first"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+class _Sampler(threading.Thread):
+    """Calls sample() every interval until stopped"""
+
+    def __init__(self, interval: float, sample: Callable[[], None]):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.sample = sample
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+
+class RequestProfile:
+    """
+    Wall-clock samples of one request, as collapsed stacks
+
+    The request's task is sampled on the event loop thread: its running
+    stack while it runs, its chain of awaiting coroutines (ending in an
+    "[await ...]" frame) while it is suspended. Work it sends to the PDF
+    worker pool is sampled in the worker and added under a "[pdf worker]"
+    root, so those samples overlap the awaiting ones in time.
+    """
+
+    def __init__(self, path: str, interval: float):
+        self.id = secrets.token_hex(4)
+        self.path = path
+        self.interval = interval
+        self.started = time.time()
+        self.stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self._loop_thread = threading.get_ident()
+        self._sampler = _Sampler(interval, self._sample)
+
+    def start(self) -> None:
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._sampler.stop()
+
+    def add(self, stacks: Dict[str, int], root: str) -> None:
+        """Merge samples taken elsewhere (e.g. a worker process) under a root frame"""
+        with self._lock:
+            for stack, count in stacks.items():
+                self.stacks[f"{root};{stack}"] += count
+
+    def _sample(self) -> None:
+        if self._task.done():
+            return
+
+        if asyncio.current_task(self._loop) is self._task:
+            frame = sys._current_frames().get(self._loop_thread)
+            frames = _thread_stack(frame)
+            # Start at the task's outermost coroutine, dropping the event loop machinery
+            outer = self._task.get_coro().cr_frame
+            if outer in frames:
+                frames = frames[frames.index(outer):]
+            stack = _collapse(frames)
+        else:
+            frames = []
+            awaited: Any = self._task.get_coro()
+            while awaited is not None:
+                frame = getattr(awaited, "cr_frame", None) or getattr(awaited, "ag_frame", None) or getattr(awaited, "gi_frame", None)
+                if frame is None:
+                    break
+                frames.append(frame)
+                awaited = getattr(awaited, "cr_await", None) or getattr(awaited, "ag_await", None) or getattr(awaited, "gi_yieldfrom", None)
+            # Futures are awaited through their FutureIter
+            leaf = "[await]" if awaited is None else f"[await {type(awaited).__name__.replace('FutureIter', 'Future')}]"
+            stack = f"{_collapse(frames)};{leaf}" if frames else leaf
+
+        with self._lock:
+            self.stacks[stack] += 1
+
+    def render(self) -> str:
+        """Collapsed stacks ('frame;frame;frame count' per line), as read by flamegraph.pl and speedscope"""
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+def profiled_call(interval: float, func: Callable[..., Any], args: Tuple) -> Tuple[Any, Dict[str, int]]:
+    """
+    Run func(*args) while sampling the calling thread (runs in the PDF worker)
+
+    Returns:
+        Tuple of (func's return value, collapsed stack counts)
+    """
+    thread = threading.get_ident()
+    stacks: Counter = Counter()
+    outer = sys._getframe()
+
+    def sample() -> None:
+        frames = _thread_stack(sys._current_frames().get(thread))
+        if outer in frames:
+            frames = frames[frames.index(outer) + 1:]
+        stacks[_collapse(frames)] += 1
+
+    sampler = _Sampler(interval, sample)
+    sampler.start()
+    try:
+        result = func(*args)
+    finally:
+        sampler.stop()
+    return result, dict(stacks)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """Profile of the request being handled, if it is being profiled"""
+    return _current.get()
+
+
+def is_profiling_enabled() -> bool:
+    return bool(settings.profile_token)
+
+
+def get_profile_dir() -> Path:
+    """PROFILE_DIR, or 'profiles' next to the settings file"""
+    if settings.profile_dir:
+        return Path(settings.profile_dir)
+    return Path(SETTINGS_FILE).parent / "profiles"
+
+
+def _requested(scope) -> bool:
+    """Whether a request asks to be profiled with the right token"""
+    if not scope["path"].startswith(PROFILED_PREFIXES):
+        return False
+
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return secrets.compare_digest(value, settings.profile_token.encode())
+    return False
+
+
+def _write_profile(profile: RequestProfile, status: int) -> Path:
+    """Write a profile and drop old ones beyond PROFILE_MAX_FILES / PROFILE_MAX_AGE_HOURS"""
+    directory = get_profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    route = re.sub(r"[^\w-]+", "_", profile.path).strip("_")[:60]
+    started = datetime.fromtimestamp(profile.started).strftime("%Y%m%d-%H%M%S")
+    elapsed_ms = round((time.time() - profile.started) * 1000)
+    path = directory / f"{started}_{route}_{status}_{elapsed_ms}ms_{profile.id}.collapsed"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(profile.render())
+    os.replace(tmp, path)
+
+    cutoff = time.time() - settings.profile_max_age_hours * 3600
+    files = sorted(directory.glob("*.collapsed"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for index, old in enumerate(files):
+        if index >= settings.profile_max_files or old.stat().st_mtime < cutoff:
+            old.unlink(missing_ok=True)
+    return path
+
+
+class ProfilingMiddleware:
+    """
+    Profile single /api/pdf and /api/paperless requests on demand
+
+    A request is profiled when it carries PROFILE_TOKEN in the
+    X-Profile-Token header. The profile is written to PROFILE_DIR and
+    named in the X-Profile-Id response header.
+    Only installed when PROFILE_TOKEN is set; other requests just pass
+    through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["path"], settings.profile_interval_ms / 1000)
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        token = _current.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.stop()
+            _current.reset(token)
+            try:
+                path = await asyncio.to_thread(_write_profile, profile, status)
+                print(f"Request profile written to {path}")
+            except OSError as e:
+                print(f"Warning: Could not write request profile: {e}")
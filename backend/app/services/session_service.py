@@ -0,0 +1,331 @@
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from app.config import settings
+from app.services.enhancement_service import resolve_page_modes
+from app.services.executor_service import acquire_pixels, pdf_job_slot, get_worker_count, release_pixels
+from app.services.pdf_service import (
+    EncodedPage,
+    PDFBuildResult,
+    assemble_pdf,
+    encode_page,
+    page_size_budget,
+    pixels_in_flight,
+    probe_page_sizes
+)
+
+
+class SessionNotFoundError(KeyError):
+    """Raised when a scan session does not exist or has expired"""
+
+
+class SessionLimitError(ValueError):
+    """Raised when a session or page limit would be exceeded"""
+
+
+class SessionMemoryError(SessionLimitError):
+    """Raised when open sessions already hold SESSION_MAX_MB of pages"""
+
+
+@dataclass
+class SessionPage:
+    """A page uploaded to a scan session, encoding in the background"""
+    number: int
+    task: asyncio.Task
+    received_bytes: int
+    enhancement: str = "color"  # As requested, may be "auto"
+
+    @property
+    def status(self) -> str:
+        if not self.task.done():
+            return "processing"
+        if self.task.cancelled() or self.task.exception() or self.task.result() is None:
+            return "failed"
+        return "ready"
+
+    @property
+    def held_bytes(self) -> int:
+        """Memory the page holds: its upload while encoding, then the encoded image"""
+        if not self.task.done():
+            return self.received_bytes
+        if self.status != "ready":
+            return 0
+        return len(self.task.result().data)
+
+    @property
+    def applied_enhancement(self) -> Optional[str]:
+        """Mode actually applied, once encoding has finished"""
+        if self.status != "ready":
+            return None
+        return self.task.result().enhancement
+
+    @property
+    def applied_quality(self) -> Optional[int]:
+        """JPEG quality actually used, once encoding has finished (None if not re-encoded)"""
+        if self.status != "ready":
+            return None
+        return self.task.result().quality
+
+
+@dataclass
+class ScanSession:
+    """Pages captured so far for one document, in display order"""
+    id: str
+    title: str
+    compression_quality: int
+    enhancement: str = "color"  # Default for pages uploaded without one
+    target_kb_per_page: Optional[int] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    pages: Dict[int, SessionPage] = field(default_factory=dict)
+    order: List[int] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return {
+            "session_id": self.id,
+            "title": self.title,
+            "compression_quality": self.compression_quality,
+            "enhancement": self.enhancement,
+            "target_kb_per_page": self.target_kb_per_page,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "pages": [
+                {
+                    "page": number,
+                    "status": self.pages[number].status,
+                    "received_bytes": self.pages[number].received_bytes,
+                    "enhancement": self.pages[number].enhancement,
+                    "applied_enhancement": self.pages[number].applied_enhancement,
+                    "applied_quality": self.pages[number].applied_quality
+                }
+                for number in self.order
+            ]
+        }
+
+
+_sessions: Dict[str, ScanSession] = {}
+
+
+def _expire_sessions() -> None:
+    """Drop sessions that have been idle longer than SESSION_TTL_SECONDS"""
+    cutoff = time.time() - settings.session_ttl_seconds
+    for session_id in [sid for sid, s in _sessions.items() if s.updated_at < cutoff]:
+        delete_session(session_id)
+
+
+def _held_bytes(exclude: Optional[SessionPage] = None) -> int:
+    """Bytes of pages held across all sessions"""
+    return sum(
+        page.held_bytes
+        for session in _sessions.values()
+        for page in session.pages.values()
+        if page is not exclude
+    )
+
+
+def create_session(
+    title: str = "Scanned Document",
+    compression_quality: Optional[int] = None,
+    enhancement: Optional[str] = None,
+    target_kb_per_page: Optional[int] = None
+) -> ScanSession:
+    """
+    Start a new scan session
+
+    Args:
+        title: PDF title used when the session is finalized
+        compression_quality: JPEG quality for pages, uses config default if None
+        enhancement: Default enhancement mode for the session's pages
+        target_kb_per_page: Size budget per page (pages are encoded as they
+            arrive, so a total budget for the document is not supported)
+
+    Returns:
+        The new session
+
+    Raises:
+        SessionLimitError: If SESSION_MAX_SESSIONS sessions are already open
+        ValueError: If the enhancement mode or size budget is invalid
+    """
+    _expire_sessions()
+
+    enhancement = resolve_page_modes(enhancement, 1)[0]
+    page_size_budget(1, target_kb_per_page)
+
+    if len(_sessions) >= settings.session_max_sessions:
+        raise SessionLimitError("Too many open scan sessions, try again later")
+
+    session = ScanSession(
+        id=uuid.uuid4().hex,
+        title=title,
+        compression_quality=compression_quality or settings.pdf_compression_quality,
+        enhancement=enhancement,
+        target_kb_per_page=target_kb_per_page
+    )
+    _sessions[session.id] = session
+    return session
+
+
+def get_session(session_id: str) -> ScanSession:
+    """
+    Look up an open scan session
+
+    Raises:
+        SessionNotFoundError: If the session does not exist or has expired
+    """
+    _expire_sessions()
+
+    session = _sessions.get(session_id)
+    if session is None:
+        raise SessionNotFoundError(session_id)
+    return session
+
+
+async def put_page(session_id: str, number: int, data: bytes, enhancement: Optional[str] = None) -> SessionPage:
+    """
+    Add or replace page N and start encoding it in the background
+
+    New page numbers are appended to the end of the page order; replacing
+    an existing page keeps its position. The page's decode memory is
+    reserved from the shared budget until encoding finishes.
+
+    Args:
+        session_id: Session ID
+        number: Client-chosen page number
+        data: Raw image bytes
+        enhancement: Enhancement mode, defaults to the session's
+
+    Returns:
+        The session page (encoding may still be in progress)
+
+    Raises:
+        PixelBudgetExceededError: If the decode memory budget stays exhausted
+        SessionMemoryError: If open sessions already hold SESSION_MAX_MB of pages
+        ValueError: If the enhancement mode is unknown or the session is full
+    """
+    session = get_session(session_id)
+    enhancement = resolve_page_modes(enhancement or session.enhancement, 1)[0]
+
+    reserved = await acquire_pixels(pixels_in_flight(probe_page_sizes([data]), 1))
+    held_since = time.monotonic()
+    try:
+        # The session may have changed while waiting for memory
+        session = get_session(session_id)
+        if number not in session.pages and len(session.pages) >= settings.session_max_pages:
+            raise SessionLimitError(f"A session can hold at most {settings.session_max_pages} pages")
+
+        previous = session.pages.get(number)
+        # The new page is counted at its upload size, its encoded size isn't known yet
+        limit = settings.session_max_mb * 1024 * 1024
+        if limit and _held_bytes(exclude=previous) + len(data) > limit:
+            raise SessionMemoryError("Scan sessions are holding too many pages, finalize or delete some first")
+        if previous is not None:
+            previous.task.cancel()
+
+        target_bytes = page_size_budget(1, session.target_kb_per_page)
+        task = asyncio.ensure_future(
+            encode_page(number, data, session.compression_quality, enhancement, target_bytes)
+        )
+    except BaseException:
+        release_pixels(reserved)
+        raise
+    task.add_done_callback(lambda _: release_pixels(reserved, held_since))
+
+    page = SessionPage(number=number, task=task, received_bytes=len(data), enhancement=enhancement)
+    session.pages[number] = page
+    if number not in session.order:
+        session.order.append(number)
+    session.updated_at = time.time()
+    return page
+
+
+def delete_page(session_id: str, number: int) -> None:
+    """Remove page N from a session"""
+    session = get_session(session_id)
+
+    page = session.pages.pop(number, None)
+    if page is None:
+        raise SessionNotFoundError(f"{session_id}/{number}")
+
+    page.task.cancel()
+    session.order.remove(number)
+    session.updated_at = time.time()
+
+
+def reorder_pages(session_id: str, order: List[int]) -> ScanSession:
+    """
+    Set the page order of a session
+
+    Args:
+        session_id: Session ID
+        order: Every page number of the session, in the new order
+
+    Raises:
+        ValueError: If order is not a permutation of the session's pages
+    """
+    session = get_session(session_id)
+
+    if sorted(order) != sorted(session.order):
+        raise ValueError("Order must list every page of the session exactly once")
+
+    session.order = list(order)
+    session.updated_at = time.time()
+    return session
+
+
+def delete_session(session_id: str) -> None:
+    """Discard a session and cancel any page encoding still running"""
+    session = _sessions.pop(session_id, None)
+    if session is None:
+        raise SessionNotFoundError(session_id)
+
+    for page in session.pages.values():
+        page.task.cancel()
+
+
+async def finalize_session(session_id: str) -> PDFBuildResult:
+    """
+    Assemble the session's already-encoded pages into a PDF
+
+    Only pages still encoding are waited for, so this is close to constant
+    time regardless of page count. The session stays open so the same
+    pages can be exported again (e.g. download, then upload).
+
+    Args:
+        session_id: Session ID
+
+    Returns:
+        PDFBuildResult (call close() when done)
+
+    Raises:
+        PDFQueueFullError: If too many exports are already in progress
+        ValueError: If the session has no pages, or none could be encoded
+    """
+    session = get_session(session_id)
+    if not session.order:
+        raise ValueError("Session has no pages")
+
+    session.updated_at = time.time()
+
+    order = list(session.order)
+    async with pdf_job_slot():
+        pages = [_page_result(session.pages[number].task) for number in order]
+        workers = get_worker_count() if settings.pdf_executor != "inline" else 1
+        try:
+            return await assemble_pdf(pages, session.title, workers=workers, page_numbers=order)
+        finally:
+            # assemble_pdf clears each entry once awaited; close the rest if it stopped early
+            for page in pages:
+                if page is not None:
+                    page.close()
+
+
+async def _page_result(task: asyncio.Task) -> Optional[EncodedPage]:
+    """Wait for a page without letting cancellation of the export cancel the page itself"""
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        if task.cancelled():
+            return None
+        raise
@@ -1,7 +1,9 @@
 import json
 import os
+import tempfile
+import threading
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any, Tuple
 from pydantic import BaseModel
 
 # Settings file location - can be overridden with environment variable
@@ -16,21 +18,38 @@ class UserSettings(BaseModel):
     defaultEnhancement: str = "auto"
 
 
+# Called with (old, new) whenever the settings change, via save or an edit on disk
+SettingsListener = Callable[[UserSettings, UserSettings], None]
+
+# (mtime_ns, inode, size) of the file the cache was loaded from, None if it didn't exist
+FileSignature = Optional[Tuple[int, int, int]]
+
+_lock = threading.Lock()
+_cached: Optional[UserSettings] = None
+_cached_signature: FileSignature = None
+_dir_ready = False
+_listeners: List[SettingsListener] = []
+
+
 def _ensure_settings_dir():
-    """Ensure the settings directory exists"""
-    settings_path = Path(SETTINGS_FILE)
-    settings_path.parent.mkdir(parents=True, exist_ok=True)
+    """Ensure the settings directory exists (checked once per process)"""
+    global _dir_ready
 
+    if not _dir_ready:
+        settings_path = Path(SETTINGS_FILE)
+        settings_path.parent.mkdir(parents=True, exist_ok=True)
+        _dir_ready = True
 
-def load_settings() -> UserSettings:
-    """
-    Load user settings from JSON file
 
-    Returns:
-        UserSettings object with loaded or default values
-    """
-    _ensure_settings_dir()
+def _file_signature() -> FileSignature:
+    try:
+        st = os.stat(SETTINGS_FILE)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_ino, st.st_size)
 
+
+def _read_settings_file() -> UserSettings:
     if not os.path.exists(SETTINGS_FILE):
         # Return default settings if file doesn't exist
         return UserSettings()
@@ -44,25 +63,98 @@ def load_settings() -> UserSettings:
         return UserSettings()
 
 
+def on_settings_change(listener: SettingsListener) -> None:
+    """
+    Register a callback for settings changes
+
+    Listeners are called with (old, new) only when the content actually
+    changes, whether through save_settings or an edit of the file on disk.
+    They run synchronously and must not block.
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def _notify(old: Optional[UserSettings], new: UserSettings) -> None:
+    if old is None or old == new:
+        return
+
+    for listener in _listeners:
+        try:
+            listener(old, new)
+        except Exception as e:
+            print(f"Warning: Settings change listener {listener.__name__} failed: {e}")
+
+
+def load_settings() -> UserSettings:
+    """
+    Load user settings, served from memory while the file is unchanged
+
+    The file is only re-read when its mtime, inode or size changes, so
+    reads cost a single stat().
+
+    Returns:
+        UserSettings object with loaded or default values
+    """
+    global _cached, _cached_signature
+
+    _ensure_settings_dir()
+
+    signature = _file_signature()
+    with _lock:
+        if _cached is None or signature != _cached_signature:
+            old = _cached
+            _cached = _read_settings_file()
+            _cached_signature = signature
+            _notify(old, _cached)
+        return _cached.model_copy()
+
+
 def save_settings(settings: UserSettings) -> bool:
     """
     Save user settings to JSON file
 
+    The file is written to a temporary file in the same directory and
+    renamed over the old one, so readers never see a partial write.
+
     Args:
         settings: UserSettings object to save
 
     Returns:
         True if saved successfully, False otherwise
     """
+    global _cached, _cached_signature
+
     _ensure_settings_dir()
 
+    settings_path = Path(SETTINGS_FILE)
+    tmp_path = None
     try:
-        with open(SETTINGS_FILE, 'w') as f:
-            json.dump(settings.model_dump(), f, indent=2)
+        with _lock:
+            old = _cached if _cached is not None else _read_settings_file()
+            with tempfile.NamedTemporaryFile(
+                'w', dir=settings_path.parent, prefix=f".{settings_path.name}.", suffix=".tmp", delete=False
+            ) as f:
+                tmp_path = f.name
+                json.dump(settings.model_dump(), f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, settings_path)
+            tmp_path = None
+
+            _cached = settings.model_copy()
+            _cached_signature = _file_signature()
+            _notify(old, _cached)
         return True
     except IOError as e:
         print(f"Error: Failed to save settings to {SETTINGS_FILE}: {e}")
         return False
+    finally:
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
 
 
 def get_paperless_config() -> Dict[str, Any]:
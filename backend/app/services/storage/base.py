@@ -0,0 +1,72 @@
+import re
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+
+@dataclass
+class StoredDocument:
+    """What a sink needs to know about the PDF it is writing"""
+    title: str
+    filename: str
+    size: int
+    tags: Optional[List[str]] = None
+    correspondent: Optional[str] = None
+    document_type: Optional[str] = None
+
+
+@dataclass
+class SinkResult:
+    """Outcome of writing one PDF to one sink"""
+    sink: str
+    success: bool
+    elapsed_ms: float
+    location: Optional[str] = None  # Remote path, URL, Paperless task ID or outbox ID if queued
+    error: Optional[str] = None
+    queued: bool = False            # Paperless only: kept in the outbox for a later retry
+
+    def to_dict(self) -> Dict:
+        return {
+            "sink": self.sink,
+            "success": self.success,
+            "elapsed_ms": self.elapsed_ms,
+            "location": self.location,
+            "error": self.error,
+            "queued": self.queued
+        }
+
+
+class StorageSink:
+    """
+    A destination for generated PDFs
+
+    Sinks receive the PDF as an async stream of chunks shared with every
+    other sink, so they must consume it as they go rather than buffer it.
+    Connections are kept open between documents and released in close().
+    """
+    name = "sink"
+
+    async def store(self, chunks: AsyncIterator[bytes], document: StoredDocument) -> str:
+        """
+        Write one PDF
+
+        Returns:
+            Where the document ended up (path, URL or ID)
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release pooled connections (called on shutdown)"""
+
+
+def document_filename(title: str, now: Optional[datetime] = None) -> str:
+    """Filesystem-safe, unique file name for a document, e.g. 'Invoice_March_20250131-142501_3f9a1c.pdf'"""
+    safe_title = re.sub(r'[^\w\-]+', '_', title).strip('_')[:80] or "scan"
+    return f"{safe_title}_{(now or datetime.now()).strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:6]}.pdf"
+
+
+def join_remote_path(directory: str, filename: str) -> str:
+    """Join a configured default path ('/Scans/', 'Scans', '') and a file name with '/'"""
+    directory = directory.strip('/')
+    return f"/{directory}/{filename}" if directory else f"/{filename}"
@@ -0,0 +1,85 @@
+import asyncio
+import ssl
+import time
+from typing import AsyncIterator, List, Set, Tuple
+import aioftp
+from app.config import settings
+from app.services.storage.base import StorageSink, StoredDocument, join_remote_path
+
+# Logged-in connections kept open between documents
+MAX_IDLE_CONNECTIONS = 2
+# Servers drop idle sessions (often after 300s); don't reuse ones idle longer than this
+MAX_IDLE_SECONDS = 60
+
+
+class FTPSink(StorageSink):
+    """
+    Uploads PDFs to an FTP or FTPS server with aioftp
+
+    Logged-in control connections are kept open between documents. FTP
+    transfers on one connection are sequential, so concurrent documents
+    each borrow their own connection.
+    """
+    name = "ftp"
+
+    def __init__(self):
+        self._idle: List[Tuple[aioftp.Client, float]] = []  # (client, idle since)
+        self._created_dirs: Set[str] = set()
+
+    async def _connect(self) -> aioftp.Client:
+        # FTP_TLS is explicit FTPS (AUTH TLS on the plain FTP port, usually 21);
+        # FTP_TLS_IMPLICIT starts TLS right away instead (usually port 990)
+        implicit = settings.ftp_tls and settings.ftp_tls_implicit
+        client = aioftp.Client(
+            socket_timeout=settings.storage_timeout,
+            ssl=ssl.create_default_context() if implicit else None
+        )
+        await client.connect(settings.ftp_host, settings.ftp_port)
+        if settings.ftp_tls and not implicit:
+            await client.upgrade_to_tls(ssl.create_default_context())
+        await client.login(settings.ftp_username or "anonymous", settings.ftp_password)
+        return client
+
+    async def store(self, chunks: AsyncIterator[bytes], document: StoredDocument) -> str:
+        remote_path = join_remote_path(settings.ftp_default_path, document.filename)
+        client = await self._acquire()
+
+        try:
+            directory = remote_path.rsplit('/', 1)[0]
+            if directory and directory not in self._created_dirs:
+                await client.make_directory(directory)
+                self._created_dirs.add(directory)
+            async with client.upload_stream(remote_path) as stream:
+                async for chunk in chunks:
+                    await stream.write(chunk)
+        except BaseException:
+            # Connection state is unknown after a failure or timeout, don't reuse it
+            client.close()
+            raise
+
+        if len(self._idle) < MAX_IDLE_CONNECTIONS:
+            self._idle.append((client, time.monotonic()))
+        else:
+            await self._quit(client)
+
+        return f"ftp://{settings.ftp_host}:{settings.ftp_port}{remote_path}"
+
+    async def _acquire(self) -> aioftp.Client:
+        """Reuse a recently idle connection, or log in a new one"""
+        while self._idle:
+            client, idle_since = self._idle.pop()
+            if time.monotonic() - idle_since < MAX_IDLE_SECONDS:
+                return client
+            await self._quit(client)
+        return await self._connect()
+
+    async def _quit(self, client: aioftp.Client) -> None:
+        try:
+            await asyncio.wait_for(client.quit(), timeout=5)
+        except Exception:
+            client.close()
+
+    async def close(self) -> None:
+        while self._idle:
+            client, _ = self._idle.pop()
+            await self._quit(client)
@@ -0,0 +1,30 @@
+from typing import AsyncIterator, Optional
+from app.services.paperless_service import upload_to_paperless
+from app.services.storage.base import StorageSink, StoredDocument
+
+
+class PaperlessSink(StorageSink):
+    """
+    Uploads PDFs to Paperless-ngx
+
+    Connections are pooled by paperless_client, so there is nothing to
+    close here.
+    """
+    name = "paperless"
+
+    def __init__(self, paperless_url: Optional[str] = None, paperless_token: Optional[str] = None):
+        self.paperless_url = paperless_url
+        self.paperless_token = paperless_token
+
+    async def store(self, chunks: AsyncIterator[bytes], document: StoredDocument) -> str:
+        result = await upload_to_paperless(
+            pdf=chunks,
+            title=document.title,
+            tags=document.tags,
+            correspondent=document.correspondent,
+            document_type=document.document_type,
+            paperless_url=self.paperless_url,
+            paperless_token=self.paperless_token,
+            pdf_size=document.size
+        )
+        return result.get('id')
@@ -0,0 +1,59 @@
+import asyncio
+from typing import AsyncIterator
+import smbclient
+from app.config import settings
+from app.services.storage.base import StorageSink, StoredDocument, join_remote_path
+
+
+class SMBSink(StorageSink):
+    """
+    Writes PDFs to an SMB/CIFS share with smbprotocol
+
+    smbclient is synchronous, so every call runs in a thread. It keeps the
+    authenticated session per server in its own connection cache, which
+    is reused across documents.
+    """
+    name = "smb"
+
+    def __init__(self):
+        self._registered = False
+
+    def _register_session(self) -> None:
+        if not self._registered:
+            smbclient.register_session(
+                settings.smb_server,
+                username=f"{settings.smb_domain}\\{settings.smb_username}" if settings.smb_domain else settings.smb_username,
+                password=settings.smb_password,
+                connection_timeout=int(settings.storage_timeout)
+            )
+            self._registered = True
+
+    def _open(self, unc_path: str):
+        self._register_session()
+        directory = unc_path.rsplit('\\', 1)[0]
+        smbclient.makedirs(directory, exist_ok=True)
+        return smbclient.open_file(unc_path, mode="wb")
+
+    async def store(self, chunks: AsyncIterator[bytes], document: StoredDocument) -> str:
+        remote_path = join_remote_path(settings.smb_default_path, document.filename).replace('/', '\\')
+        unc_path = f"\\\\{settings.smb_server}\\{settings.smb_share}{remote_path}"
+
+        try:
+            f = await asyncio.to_thread(self._open, unc_path)
+        except Exception:
+            # Force a fresh session next time, the cached one may be dead
+            self._registered = False
+            raise
+
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+
+        return unc_path
+
+    async def close(self) -> None:
+        if self._registered:
+            await asyncio.to_thread(smbclient.reset_connection_cache)
+            self._registered = False
@@ -0,0 +1,62 @@
+import asyncio
+from typing import AsyncIterator, Optional, Set
+from urllib.parse import quote
+import httpx
+from app.config import settings
+from app.services.storage.base import StorageSink, StoredDocument, join_remote_path
+
+
+class WebDAVSink(StorageSink):
+    """
+    Uploads PDFs with HTTP PUT to a WebDAV server (Nextcloud, ownCloud, Apache mod_dav, ...)
+
+    Uses one pooled httpx client instead of webdavclient3, which is
+    synchronous and would need a thread per upload.
+    """
+    name = "webdav"
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._created_dirs: Set[str] = set()
+        self._mkcol_lock = asyncio.Lock()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=settings.webdav_url.rstrip('/'),
+                auth=(settings.webdav_username, settings.webdav_password) if settings.webdav_username else None,
+                timeout=settings.storage_timeout
+            )
+        return self._client
+
+    async def _ensure_directory(self, client: httpx.AsyncClient, directory: str) -> None:
+        """Create the target collection and its parents once per process"""
+        async with self._mkcol_lock:
+            path = ""
+            for part in [p for p in directory.split('/') if p]:
+                path += f"/{quote(part)}"
+                if path in self._created_dirs:
+                    continue
+                response = await client.request("MKCOL", f"{path}/")
+                # 405 = already exists
+                if response.status_code not in (201, 405):
+                    response.raise_for_status()
+                self._created_dirs.add(path)
+
+    async def store(self, chunks: AsyncIterator[bytes], document: StoredDocument) -> str:
+        client = self._get_client()
+        await self._ensure_directory(client, settings.webdav_default_path)
+
+        remote_path = quote(join_remote_path(settings.webdav_default_path, document.filename))
+        response = await client.put(
+            remote_path,
+            content=chunks,
+            headers={'Content-Type': 'application/pdf', 'Content-Length': str(document.size)}
+        )
+        response.raise_for_status()
+        return f"{settings.webdav_url.rstrip('/')}{remote_path}"
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,224 @@
+import asyncio
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
+from app.config import settings
+from app.services.outbox_service import OutboxFullError, enqueue_upload, is_outbox_running, is_transient_error
+from app.services.pdf_service import PDFBuildResult
+from app.services.storage.base import SinkResult, StorageSink, StoredDocument, document_filename
+from app.services.storage.ftp import FTPSink
+from app.services.storage.paperless import PaperlessSink
+from app.services.storage.smb import SMBSink
+from app.services.storage.webdav import WebDAVSink
+
+SINK_NAMES = ("paperless", "webdav", "ftp", "smb")
+
+FANOUT_CHUNK_SIZE = 256 * 1024
+# Chunks buffered per sink; the slowest sink sets the pace beyond this
+FANOUT_QUEUE_CHUNKS = 8
+# A sink whose buffer stays full for this share of STORAGE_TIMEOUT is dropped, so a
+# stalled sink holds up the others for at most that long instead of timing them all out
+FANOUT_STALL_SHARE = 0.25
+
+# Shared sink instances, so connections are reused across documents
+_sinks: Dict[str, StorageSink] = {}
+
+
+def get_enabled_sinks() -> List[str]:
+    """Names of the sinks that are enabled and configured"""
+    enabled = {
+        "paperless": settings.paperless_enabled,
+        "webdav": settings.webdav_enabled and bool(settings.webdav_url),
+        "ftp": settings.ftp_enabled and bool(settings.ftp_host),
+        "smb": settings.smb_enabled and bool(settings.smb_server and settings.smb_share)
+    }
+    return [name for name in SINK_NAMES if enabled[name]]
+
+
+def resolve_sinks(sinks: Optional[List[str]] = None) -> List[str]:
+    """
+    Check requested sink names against the enabled ones
+
+    Args:
+        sinks: Sink names, defaults to every enabled sink
+
+    Returns:
+        The sink names to write to, without duplicates
+
+    Raises:
+        ValueError: If a requested sink is unknown or not enabled, or none are enabled
+    """
+    enabled = get_enabled_sinks()
+    names = list(dict.fromkeys(sinks)) if sinks else enabled
+    unavailable = [name for name in names if name not in enabled]
+    if unavailable:
+        raise ValueError(f"Storage sink(s) not enabled: {', '.join(unavailable)}")
+    if not names:
+        raise ValueError("No storage sinks are enabled")
+    return names
+
+
+def _get_sink(name: str) -> StorageSink:
+    sink = _sinks.get(name)
+    if sink is None:
+        sink = {"webdav": WebDAVSink, "ftp": FTPSink, "smb": SMBSink}[name]()
+        _sinks[name] = sink
+    return sink
+
+
+class _ChunkFanout:
+    """
+    Hands every chunk of one PDF to several consumers through bounded queues
+
+    A consumer that stops early (failure, timeout) is closed and skipped,
+    so it never blocks the others. One that stops taking chunks for
+    stall_timeout is closed too and reported through on_stall.
+    """
+
+    def __init__(self, consumers: int, stall_timeout: float, on_stall: Callable[[int], None]):
+        self._queues = [asyncio.Queue(maxsize=FANOUT_QUEUE_CHUNKS) for _ in range(consumers)]
+        self._closed = [False] * consumers
+        self._stall_timeout = stall_timeout
+        self._on_stall = on_stall
+        self.stalled: Set[int] = set()
+
+    async def publish(self, chunk: Optional[bytes]) -> None:
+        """Send a chunk to every open consumer (None marks the end)"""
+        for idx, queue in enumerate(self._queues):
+            if self._closed[idx]:
+                continue
+            if not queue.full():
+                queue.put_nowait(chunk)
+                continue
+            try:
+                await asyncio.wait_for(queue.put(chunk), self._stall_timeout)
+            except asyncio.TimeoutError:
+                if not self._closed[idx]:
+                    self.stalled.add(idx)
+                    self.close(idx)
+                    self._on_stall(idx)
+
+    async def stream(self, idx: int) -> AsyncIterator[bytes]:
+        while (chunk := await self._queues[idx].get()) is not None:
+            yield chunk
+
+    def close(self, idx: int) -> None:
+        """Stop feeding a consumer and release a producer waiting on its queue"""
+        self._closed[idx] = True
+        queue = self._queues[idx]
+        while not queue.empty():
+            queue.get_nowait()
+
+
+async def store_pdf(
+    pdf_result: PDFBuildResult,
+    title: str,
+    tags: Optional[List[str]] = None,
+    correspondent: Optional[str] = None,
+    document_type: Optional[str] = None,
+    paperless_url: Optional[str] = None,
+    paperless_token: Optional[str] = None,
+    sinks: Optional[List[str]] = None
+) -> List[SinkResult]:
+    """
+    Write a generated PDF to several storage sinks at once
+
+    The PDF is read once and streamed to all sinks concurrently. Each sink
+    gets STORAGE_TIMEOUT seconds and its own result; one failing sink does
+    not affect the others. A Paperless upload that fails transiently goes
+    to the outbox like a direct upload would.
+
+    Args:
+        pdf_result: Generated PDF (left open, the caller closes it)
+        title, tags, correspondent, document_type: Document metadata
+        paperless_url, paperless_token: Per-request Paperless overrides
+        sinks: Sink names to write to, defaults to every enabled sink
+
+    Returns:
+        One SinkResult per sink, in the order requested
+
+    Raises:
+        ValueError: If a requested sink is unknown or not enabled, or none are enabled
+    """
+    names = resolve_sinks(sinks)
+
+    document = StoredDocument(
+        title=title,
+        filename=document_filename(title),
+        size=pdf_result.size,
+        tags=tags,
+        correspondent=correspondent,
+        document_type=document_type
+    )
+    stall_timeout = settings.storage_timeout * FANOUT_STALL_SHARE
+    tasks: List[asyncio.Future] = []
+    fanout = _ChunkFanout(len(names), stall_timeout, on_stall=lambda idx: tasks[idx].cancel())
+    errors: Dict[str, Exception] = {}
+
+    async def run_sink(idx: int, name: str) -> SinkResult:
+        sink = PaperlessSink(paperless_url, paperless_token) if name == "paperless" else _get_sink(name)
+        start = time.perf_counter()
+        try:
+            location = await asyncio.wait_for(sink.store(fanout.stream(idx), document), settings.storage_timeout)
+            return SinkResult(name, True, _elapsed_ms(start), location=location)
+        except (Exception, asyncio.CancelledError) as e:
+            if isinstance(e, asyncio.CancelledError):
+                # Cancelled by the fan-out for stalling; any other cancellation propagates
+                if idx not in fanout.stalled:
+                    raise
+                e = TimeoutError(f"Stopped taking data for {stall_timeout:g}s")
+            elif isinstance(e, asyncio.TimeoutError):
+                e = TimeoutError(f"No response within {settings.storage_timeout:g}s")
+            print(f"Warning: Storing '{document.filename}' to {name} failed: {e}")
+            errors[name] = e
+            return SinkResult(name, False, _elapsed_ms(start), error=str(e) or type(e).__name__)
+        finally:
+            fanout.close(idx)
+
+    tasks.extend(asyncio.ensure_future(run_sink(idx, name)) for idx, name in enumerate(names))
+    try:
+        pdf_result.file.seek(0)
+        while chunk := await asyncio.to_thread(pdf_result.file.read, FANOUT_CHUNK_SIZE):
+            await fanout.publish(chunk)
+        await fanout.publish(None)
+        results = list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    for result in results:
+        error = errors.get(result.sink)
+        if result.sink == "paperless" and error is not None and is_outbox_running() and is_transient_error(error):
+            try:
+                item = await enqueue_upload(
+                    pdf_result.file,
+                    title=title,
+                    tags=tags,
+                    correspondent=correspondent,
+                    document_type=document_type,
+                    paperless_url=paperless_url,
+                    paperless_token=paperless_token,
+                    error=error
+                )
+            except OutboxFullError as full:
+                result.error = f"{result.error} ({full}, document not queued)"
+                continue
+            result.success = True
+            result.queued = True
+            result.location = item.id
+
+    return results
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+async def close_storage_sinks() -> None:
+    """Close pooled sink connections (called on shutdown)"""
+    for sink in _sinks.values():
+        try:
+            await sink.close()
+        except Exception as e:
+            print(f"Warning: Closing {sink.name} sink failed: {e}")
+    _sinks.clear()
@@ -0,0 +1,265 @@
+import asyncio
+import io
+import os
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+from fastapi import Request
+from starlette.requests import ClientDisconnect
+from app.config import settings
+
+try:
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.exceptions import FormParserError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# Text fields (title, tags, ...) are small; anything bigger is a malformed request
+MAX_FIELD_SIZE = 64 * 1024
+
+
+class UploadError(ValueError):
+    """Raised when a multipart page upload is malformed"""
+
+
+def get_scratch_dir() -> Optional[str]:
+    """
+    Directory for spooled uploads and temporary PDFs
+
+    Returns:
+        Configured PDF_SCRATCH_DIR (created if missing), or None for the system default
+    """
+    if not settings.pdf_scratch_dir:
+        return None
+
+    Path(settings.pdf_scratch_dir).mkdir(parents=True, exist_ok=True)
+    return settings.pdf_scratch_dir
+
+
+class SpooledPage:
+    """
+    One uploaded page, kept in memory until it exceeds the spool threshold
+
+    Past the threshold the data moves to a named file in the scratch dir so
+    PDF workers can read it directly from disk instead of receiving a copy.
+    write() only collects that data; flush() writes it out off the event loop.
+    """
+
+    def __init__(self, filename: str, threshold: int):
+        self.filename = filename
+        self.size = 0
+        self._threshold = threshold
+        self._buffer: Optional[io.BytesIO] = io.BytesIO()
+        self._pending = bytearray()
+        self._finished = False
+        self._file = None
+        self.path: Optional[Path] = None
+
+    @property
+    def spooled(self) -> bool:
+        return self._buffer is None
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+
+        if self._buffer is not None and self.size > self._threshold:
+            self._pending += self._buffer.getbuffer()
+            self._buffer = None
+
+        if self._buffer is not None:
+            self._buffer.write(data)
+        else:
+            self._pending += data
+
+    def finish(self) -> None:
+        """Mark the page complete; a spooled page is closed by the next flush()"""
+        self._finished = True
+
+    def _flush(self) -> None:
+        if self._file is None and self.path is None:
+            self._file = tempfile.NamedTemporaryFile(
+                prefix="page-", suffix=".upload", dir=get_scratch_dir(), delete=False
+            )
+            self.path = Path(self._file.name)
+        if self._pending:
+            self._file.write(self._pending)
+            self._pending = bytearray()
+        if self._finished and self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def flush(self) -> None:
+        """Write data collected past the threshold to the spool file in a thread"""
+        if self.spooled and (self._pending or (self._finished and self._file is not None)):
+            await asyncio.to_thread(self._flush)
+
+    @property
+    def source(self) -> Union[bytes, Path]:
+        """Page content for the PDF pipeline: bytes if small, otherwise the spool file path"""
+        if self.path is not None:
+            return self.path
+        return self._buffer.getvalue()
+
+    def cleanup(self) -> None:
+        self._pending = bytearray()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+
+@dataclass
+class MultipartPages:
+    """Pages and text fields parsed from a multipart/form-data request"""
+    fields: Dict[str, List[str]] = field(default_factory=dict)
+    pages: List[SpooledPage] = field(default_factory=list)
+
+    def field(self, name: str) -> Optional[str]:
+        values = self.fields.get(name)
+        return values[-1] if values else None
+
+    def field_list(self, name: str) -> List[str]:
+        """Values of a field sent repeatedly and/or comma-separated"""
+        return [
+            item.strip()
+            for value in self.fields.get(name, [])
+            for item in value.split(",")
+            if item.strip()
+        ]
+
+    @property
+    def sources(self) -> List[Union[bytes, Path]]:
+        return [page.source for page in self.pages]
+
+    def cleanup(self) -> None:
+        for page in self.pages:
+            page.cleanup()
+
+
+async def read_multipart_pages(request: Request) -> MultipartPages:
+    """
+    Stream a multipart/form-data request into spooled pages and text fields
+
+    Every part with a filename is treated as a page, in the order received.
+    Pages larger than UPLOAD_SPOOL_THRESHOLD are written to disk as they
+    arrive, so the request body is never held in memory as a whole.
+
+    Args:
+        request: Incoming request with a multipart/form-data body
+
+    Returns:
+        MultipartPages (call cleanup() when done to remove spool files)
+
+    Raises:
+        UploadError: If the body is not valid multipart/form-data
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadError("Expected a multipart/form-data body")
+
+    result = MultipartPages()
+    state = {
+        "header_name": b"",
+        "header_value": b"",
+        "disposition": b"",
+        "page": None,
+        "field_name": None,
+        "field_value": bytearray(),
+        "ended": False
+    }
+    # Spooled pages with data to write once the current chunk is parsed
+    dirty: Dict[int, SpooledPage] = {}
+
+    def on_part_begin():
+        state["disposition"] = b""
+        state["page"] = None
+        state["field_name"] = None
+        state["field_value"] = bytearray()
+
+    def on_header_field(data, start, end):
+        state["header_name"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        if state["header_name"].lower() == b"content-disposition":
+            state["disposition"] = state["header_value"]
+        state["header_name"] = b""
+        state["header_value"] = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(state["disposition"])
+        if b"name" not in options:
+            raise UploadError('Every part needs a Content-Disposition "name"')
+
+        if b"filename" in options:
+            page = SpooledPage(
+                options[b"filename"].decode("utf-8", "replace"),
+                settings.upload_spool_threshold
+            )
+            result.pages.append(page)
+            state["page"] = page
+        else:
+            state["field_name"] = options[b"name"].decode("utf-8", "replace")
+
+    def on_part_data(data, start, end):
+        page = state["page"]
+        if page is not None:
+            page.write(data[start:end])
+            if page.spooled:
+                dirty[id(page)] = page
+        else:
+            state["field_value"] += data[start:end]
+            if len(state["field_value"]) > MAX_FIELD_SIZE:
+                raise UploadError(f"Field '{state['field_name']}' is too large")
+
+    def on_part_end():
+        if state["page"] is not None:
+            state["page"].finish()
+            dirty[id(state["page"])] = state["page"]
+        elif state["field_name"] is not None:
+            value = state["field_value"].decode("utf-8", "replace")
+            result.fields.setdefault(state["field_name"], []).append(value)
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_end": lambda: state.update(ended=True)
+    })
+
+    async def flush_pages():
+        for page in dirty.values():
+            await page.flush()
+        dirty.clear()
+
+    try:
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                await flush_pages()
+            parser.finalize()
+        except FormParserError as e:
+            raise UploadError(f"Malformed multipart body: {e}") from e
+        except ClientDisconnect:
+            raise UploadError("Client disconnected before the upload finished")
+        # The parser accepts a body that stops before the closing boundary
+        if not state["ended"]:
+            raise UploadError("Multipart body is truncated")
+    except BaseException:
+        result.cleanup()
+        raise
+
+    return result
@@ -0,0 +1,127 @@
+import io
+from dataclasses import dataclass
+from typing import Tuple
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+# Page sizes in pixels (width, height)
+RESOLUTIONS = {
+    "a4_150dpi": (1240, 1754),
+    "a4_300dpi": (2480, 3508),
+    "phone_12mp": (3024, 4032),
+}
+CONTENTS = ("text", "photo", "mixed")
+FORMATS = ("jpeg", "png")
+
+# Phone cameras save at about this quality; above the default export quality, so
+# such pages are re-encoded (only exports at >= INPUT_JPEG_QUALITY - 5 pass them through)
+INPUT_JPEG_QUALITY = 92
+
+_LINE = "Lorem ipsum dolor sit amet, 1234.56 EUR consectetur adipiscing elit "
+
+
+@dataclass(frozen=True)
+class PageSpec:
+    """One synthetic page; the same spec always renders to the same bytes"""
+    content: str = "text"
+    resolution: str = "a4_300dpi"
+    format: str = "jpeg"
+    alpha: bool = False
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.content not in CONTENTS:
+            raise ValueError(f"Unknown page content '{self.content}'")
+        if self.resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown page resolution '{self.resolution}'")
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown page format '{self.format}'")
+        if self.alpha and self.format != "png":
+            raise ValueError("Only PNG pages can have an alpha channel")
+
+    @property
+    def name(self) -> str:
+        alpha = "-alpha" if self.alpha else ""
+        return f"{self.content}-{self.resolution}-{self.format}{alpha}-{self.seed}"
+
+    @property
+    def filename(self) -> str:
+        return f"{self.name}.{'jpg' if self.format == 'jpeg' else 'png'}"
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return RESOLUTIONS[self.resolution]
+
+
+def render_page(spec: PageSpec) -> bytes:
+    """
+    Render a page that compresses like a real scan
+
+    Text pages are dark lines on slightly uneven, noisy paper; photo pages
+    are smooth color fields with sensor noise; mixed pages are text with a
+    photo pasted in. Alpha pages get a transparent margin, as left by a
+    perspective-corrected crop.
+
+    Returns:
+        Encoded JPEG or PNG bytes
+    """
+    rng = np.random.default_rng(spec.seed)
+    width, height = spec.size
+
+    if spec.content == "photo":
+        img = _photo(rng, (width, height))
+    else:
+        img = _text(rng, (width, height))
+        if spec.content == "mixed":
+            photo = _photo(rng, (width // 2, height // 4))
+            img.paste(photo, (width // 4, height // 3))
+
+    img = _add_noise(rng, img, amplitude=6)
+
+    if spec.alpha:
+        mask = Image.new("L", img.size, 0)
+        margin = width // 40
+        ImageDraw.Draw(mask).rectangle((margin, margin, width - margin, height - margin), fill=255)
+        img.putalpha(mask)
+
+    buffer = io.BytesIO()
+    if spec.format == "jpeg":
+        img.save(buffer, "JPEG", quality=INPUT_JPEG_QUALITY)
+    else:
+        # Fast deflate, like a browser's canvas export
+        img.save(buffer, "PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def _text(rng: np.random.Generator, size: Tuple[int, int]) -> Image.Image:
+    width, height = size
+    paper = tuple(int(v) for v in rng.integers(232, 250, 3))
+    img = Image.new("RGB", size, paper)
+    draw = ImageDraw.Draw(img)
+
+    font_size = max(12, width // 70)
+    font = ImageFont.load_default(size=font_size)
+    margin = width // 16
+    ink = tuple(int(v) for v in rng.integers(10, 50, 3))
+    for y in range(margin, height - margin, int(font_size * 1.6)):
+        # Ragged line ends, like real paragraphs
+        words = _LINE.split() * 3
+        line = " ".join(words[:int(rng.integers(len(words) // 2, len(words)))])
+        draw.text((margin, y), line, fill=ink, font=font)
+
+    # Slight camera blur and a lighting gradient from top to bottom
+    img = img.filter(ImageFilter.GaussianBlur(width / 2480))
+    shade = np.linspace(1.0, 0.92, height, dtype=np.float32)[:, None, None]
+    return Image.fromarray((np.asarray(img, dtype=np.float32) * shade).astype(np.uint8))
+
+
+def _photo(rng: np.random.Generator, size: Tuple[int, int]) -> Image.Image:
+    width, height = size
+    coarse = rng.integers(0, 256, (max(2, height // 40), max(2, width // 40), 3), dtype=np.uint8)
+    return Image.fromarray(coarse).resize(size, Image.BICUBIC).filter(ImageFilter.GaussianBlur(3))
+
+
+def _add_noise(rng: np.random.Generator, img: Image.Image, amplitude: int) -> Image.Image:
+    pixels = np.asarray(img, dtype=np.int16)
+    noise = rng.integers(-amplitude, amplitude + 1, pixels.shape[:2] + (1,), dtype=np.int16)
+    return Image.fromarray(np.clip(pixels + noise, 0, 255).astype(np.uint8))
@@ -0,0 +1,105 @@
+"""
+Minimal Paperless-ngx stand-in for the upload benchmarks
+
+Accepts documents on /api/documents/post_document/ (reading and discarding
+the body), serves tag, correspondent and document type lists, and reports
+how much it received on /_bench/received. Run it on its own with
+
+    python -m benchmarks.mock_paperless --port 8765
+"""
+import argparse
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+
+app = FastAPI()
+
+_metadata = {
+    "tags": [{"id": 1, "name": "scanned"}, {"id": 2, "name": "mobile"}, {"id": 3, "name": "invoice"}],
+    "correspondents": [{"id": 1, "name": "ACME Corp"}],
+    "document_types": [{"id": 1, "name": "Invoice"}],
+}
+_received = {"documents": 0, "bytes": 0}
+
+
+@app.get("/api/{kind}/")
+async def list_metadata(kind: str):
+    if kind not in _metadata:
+        raise HTTPException(status_code=404)
+    items = _metadata[kind]
+    return {"count": len(items), "next": None, "previous": None, "results": items}
+
+
+@app.post("/api/tags/")
+async def create_tag(request: Request):
+    tag = {"id": len(_metadata["tags"]) + 1, "name": (await request.json())["name"]}
+    _metadata["tags"].append(tag)
+    return tag
+
+
+@app.post("/api/documents/post_document/")
+async def post_document(request: Request):
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+    _received["documents"] += 1
+    _received["bytes"] += size
+    # Paperless answers with the ID of the consumption task
+    return str(uuid.uuid4())
+
+
+@app.get("/_bench/received")
+async def received():
+    return _received
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def mock_paperless_server(timeout: float = 15.0) -> Iterator[str]:
+    """
+    Run the mock in a separate process on a free local port
+
+    Yields:
+        Base URL of the server
+    """
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_paperless", "--port", str(port)],
+        cwd=Path(__file__).resolve().parent.parent
+    )
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                httpx.get(f"{url}/_bench/received", timeout=1.0).raise_for_status()
+                break
+            except httpx.HTTPError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("Mock Paperless server did not start")
+                time.sleep(0.1)
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
@@ -0,0 +1,466 @@
+"""
+Offline benchmarks for PDF generation and the Paperless upload
+
+Every case runs in a fresh process against synthetic pages (see corpus.py)
+and a local mock Paperless server (see mock_paperless.py), so the numbers
+are reproducible and nothing leaves the machine. Reported per case: median
+wall time, CPU time (including the PDF worker pool), peak RSS of the main
+process and of the largest worker, and output size.
+
+    cd backend
+    python -m benchmarks.run                    # all cases, compared with benchmarks/baseline.json
+    python -m benchmarks.run --quick            # a small subset, one repetition
+    python -m benchmarks.run --case upload      # only cases whose name contains "upload"
+    python -m benchmarks.run --update-baseline  # accept the current numbers
+
+Exits with 1 if a case got slower, bigger in memory, or its output size
+changed by more than the tolerances, and with 2 if a case failed.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.corpus import PageSpec, render_page
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+BASELINE_VERSION = 1
+
+MOCK_TOKEN = "benchmark"
+
+# Differences below these are noise, whatever the relative change
+MIN_TIME_DELTA = 0.05   # seconds
+MIN_RSS_DELTA = 16.0    # MB
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    kind: str                         # "generate" or "upload"
+    pages: Tuple[PageSpec, ...] = ()  # generate: input pages
+    compression_quality: int = 85
+    pdf_mb: float = 0.0               # upload: PDF size
+    source: str = "bytes"             # upload: "bytes" or "file"
+    tags: Tuple[str, ...] = ()
+    quick: bool = False               # part of --quick
+
+
+def _document(count: int, **spec) -> Tuple[PageSpec, ...]:
+    # Every page differs: the PDF writer stores identical images only once
+    return tuple(PageSpec(seed=idx, **spec) for idx in range(count))
+
+
+# One reference document, then one axis changed at a time
+CASES = [
+    Case("generate_text_300dpi_jpeg_q85_1p", "generate", _document(1), quick=True),
+    Case("generate_text_300dpi_jpeg_q85_8p", "generate", _document(8), quick=True),
+    Case("generate_text_300dpi_jpeg_q85_24p", "generate", _document(24)),
+    Case("generate_text_150dpi_jpeg_q85_8p", "generate", _document(8, resolution="a4_150dpi")),
+    Case("generate_text_12mp_jpeg_q85_8p", "generate", _document(8, resolution="phone_12mp")),
+    Case("generate_text_300dpi_png_q85_8p", "generate", _document(8, format="png"), quick=True),
+    Case("generate_text_300dpi_png_alpha_q85_8p", "generate", _document(8, format="png", alpha=True)),
+    Case("generate_text_300dpi_jpeg_q60_8p", "generate", _document(8), compression_quality=60),
+    # At or above the input quality, camera JPEGs are embedded without re-encoding
+    Case("generate_text_300dpi_jpeg_q95_8p", "generate", _document(8), compression_quality=95),
+    Case("generate_photo_300dpi_jpeg_q85_8p", "generate", _document(8, content="photo")),
+    Case("generate_mixed_300dpi_jpeg_q85_8p", "generate", _document(8, content="mixed")),
+    Case("upload_1mb_bytes", "upload", pdf_mb=1, quick=True),
+    Case("upload_25mb_bytes", "upload", pdf_mb=25),
+    Case("upload_25mb_file", "upload", pdf_mb=25, source="file", quick=True),
+    Case("upload_25mb_file_tags", "upload", pdf_mb=25, source="file", tags=("scanned", "mobile", "invoice")),
+]
+
+
+# --- Measurement (runs in the case process) ---
+
+def _proc_cpu_seconds(pid: int) -> float:
+    """User + system CPU time of a live process from /proc (0 where unavailable)"""
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    except OSError:
+        return 0.0
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _proc_peak_rss_mb(pid: int) -> Optional[float]:
+    """Peak resident set size of a live process from /proc"""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _cpu_seconds() -> float:
+    """CPU time of this process and its worker processes so far"""
+    return time.process_time() + sum(
+        _proc_cpu_seconds(child.pid) for child in multiprocessing.active_children()
+    )
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss survives exec on Linux, so it would include the parent's peak
+    peak = _proc_peak_rss_mb(os.getpid())
+    if peak is not None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _worker_peak_rss_mb() -> Optional[float]:
+    peaks = [_proc_peak_rss_mb(child.pid) for child in multiprocessing.active_children()]
+    peaks = [peak for peak in peaks if peak is not None]
+    return max(peaks) if peaks else None
+
+
+class _Timer:
+    """Wall and CPU time of one repetition"""
+
+    def __enter__(self) -> "_Timer":
+        self.wall = time.perf_counter()
+        self.cpu = _cpu_seconds()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.wall = time.perf_counter() - self.wall
+        self.cpu = _cpu_seconds() - self.cpu
+
+
+def _summarize(timers: List[_Timer], output_bytes: int) -> Dict:
+    return {
+        "wall_s": round(statistics.median(t.wall for t in timers), 3),
+        "wall_min_s": round(min(t.wall for t in timers), 3),
+        "cpu_s": round(statistics.median(t.cpu for t in timers), 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "worker_peak_rss_mb": _round(_worker_peak_rss_mb(), 1),
+        "output_bytes": output_bytes,
+    }
+
+
+def _round(value: Optional[float], digits: int) -> Optional[float]:
+    return round(value, digits) if value is not None else None
+
+
+async def _run_generate(case: Case, corpus_dir: Path, repeat: int) -> Dict:
+    from app.services.pdf_service import generate_pdf_from_images
+
+    images = []
+    for spec in case.pages:
+        data = (corpus_dir / spec.filename).read_bytes()
+        images.append(f"data:image/{spec.format};base64,{base64.b64encode(data).decode()}")
+
+    # Start the worker pool and load the encoders outside the measurement
+    await generate_pdf_from_images(images[:1], compression_quality=case.compression_quality)
+
+    timers = []
+    for _ in range(repeat):
+        with _Timer() as timer:
+            pdf = await generate_pdf_from_images(images, title=case.name, compression_quality=case.compression_quality)
+        timers.append(timer)
+    return _summarize(timers, len(pdf))
+
+
+async def _run_upload(case: Case, mock_url: str, repeat: int) -> Dict:
+    import httpx
+    from app.services.paperless_client import close_paperless_clients
+    from app.services.paperless_service import upload_to_paperless
+
+    # Incompressible, like the JPEG streams that make up most of a scanned PDF
+    pdf = b"%PDF-1.4\n" + random.Random(0).randbytes(int(case.pdf_mb * 1024 * 1024))
+    if case.source == "file":
+        path = Path(tempfile.mkdtemp()) / "document.pdf"
+        path.write_bytes(pdf)
+        pdf = path
+
+    async def upload():
+        await upload_to_paperless(
+            pdf,
+            title=case.name,
+            tags=list(case.tags) or None,
+            paperless_url=mock_url,
+            paperless_token=MOCK_TOKEN
+        )
+
+    async def received_bytes() -> int:
+        async with httpx.AsyncClient() as client:
+            return (await client.get(f"{mock_url}/_bench/received")).json()["bytes"]
+
+    # Open the pooled connection and load the tag mirror outside the measurement
+    await upload()
+
+    before = await received_bytes()
+    timers = []
+    try:
+        for _ in range(repeat):
+            with _Timer() as timer:
+                await upload()
+            timers.append(timer)
+    finally:
+        await close_paperless_clients()
+
+    return _summarize(timers, (await received_bytes() - before) // repeat)
+
+
+def _run_case(case: Case, corpus_dir: Path, mock_url: Optional[str], repeat: int) -> Dict:
+    """Run one case in this process (the parent starts a fresh one per case)"""
+    from app.services.executor_service import get_worker_count, shutdown_executor
+    from app.config import settings
+    import PIL
+
+    try:
+        if case.kind == "generate":
+            metrics = asyncio.run(_run_generate(case, corpus_dir, repeat))
+        else:
+            metrics = asyncio.run(_run_upload(case, mock_url, repeat))
+    finally:
+        shutdown_executor()
+
+    return {
+        **metrics,
+        "executor": settings.pdf_executor,
+        "workers": get_worker_count(),
+        "pillow": PIL.__version__,
+    }
+
+
+# --- Orchestration ---
+
+def _case_env(tmp: Path, executor: str, workers: Optional[int]) -> Dict[str, str]:
+    """Environment for a case process: app defaults except for what the benchmark pins"""
+    from app.config import Settings
+
+    # Drop any configuration from the caller's environment
+    env = {key: value for key, value in os.environ.items() if key.lower() not in Settings.model_fields}
+    env.update({
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(BACKEND_DIR), os.environ.get("PYTHONPATH")])),
+        "PDF_EXECUTOR": executor,
+        # Repetitions would otherwise be served from the page cache
+        "PAGE_CACHE_MEMORY_MB": "0",
+        "PAGE_CACHE_DIR": "",
+        "OUTBOX_ENABLED": "false",
+        "PDF_SCRATCH_DIR": str(tmp),
+        "DOCUSCAN_SETTINGS_FILE": str(tmp / "settings.json"),
+    })
+    if workers:
+        env["PDF_WORKER_PROCESSES"] = str(workers)
+    return env
+
+
+def _spawn_case(
+    case: Case,
+    args: argparse.Namespace,
+    corpus_dir: Path,
+    scratch_dir: Path,
+    mock_url: Optional[str],
+    env: Dict
+) -> Dict:
+    command = [
+        sys.executable, "-m", "benchmarks.run",
+        "--run-case", case.name,
+        "--corpus-dir", str(corpus_dir),
+        "--repeat", str(args.repeat),
+    ]
+    if mock_url:
+        command += ["--mock-url", mock_url]
+
+    # Run from the scratch dir so backend/.env isn't picked up either
+    process = subprocess.run(command, env=env, cwd=scratch_dir, capture_output=True, text=True)
+    lines = [line for line in process.stdout.splitlines() if line.startswith("{")]
+    if process.returncode != 0 or not lines:
+        raise RuntimeError(process.stderr.strip() or process.stdout.strip() or f"exit code {process.returncode}")
+    return json.loads(lines[-1])
+
+
+def _render_corpus(cases: List[Case], corpus_dir: Path) -> None:
+    """Render the pages of every case that aren't in corpus_dir yet"""
+    specs = {spec for case in cases for spec in case.pages if not (corpus_dir / spec.filename).exists()}
+    if specs:
+        print(f"Rendering {len(specs)} synthetic pages...", flush=True)
+    for spec in sorted(specs, key=lambda spec: spec.name):
+        path = corpus_dir / spec.filename
+        path.with_suffix(".tmp").write_bytes(render_page(spec))
+        path.with_suffix(".tmp").replace(path)
+
+
+def _compare(name: str, current: Dict, baseline: Dict, args: argparse.Namespace) -> List[str]:
+    """Describe every metric of a case that regressed against the baseline"""
+    problems = []
+    for metric, tolerance, floor in (
+        ("wall_s", args.time_tolerance, MIN_TIME_DELTA),
+        ("cpu_s", args.time_tolerance, MIN_TIME_DELTA),
+        ("peak_rss_mb", args.memory_tolerance, MIN_RSS_DELTA),
+        ("worker_peak_rss_mb", args.memory_tolerance, MIN_RSS_DELTA),
+    ):
+        old, new = baseline.get(metric), current.get(metric)
+        if old is None or new is None:
+            continue
+        if new - old > floor and new > old * (1 + tolerance):
+            problems.append(f"{name}: {metric} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+
+    # Output size is deterministic for a given Pillow/libjpeg, so any real change is reported
+    old, new = baseline.get("output_bytes"), current.get("output_bytes")
+    if old and new is not None and abs(new - old) > old * args.size_tolerance:
+        problems.append(f"{name}: output_bytes {old} -> {new} ({(new / old - 1) * 100:+.1f}%)")
+    return problems
+
+
+def _print_table(results: Dict[str, Dict], baseline_cases: Dict[str, Dict]) -> None:
+    header = f"{'case':<40} {'wall s':>8} {'cpu s':>8} {'rss MB':>8} {'wrk MB':>8} {'out KB':>9} {'vs base':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:<40} FAILED")
+            continue
+        base = baseline_cases.get(name, {}).get("wall_s")
+        change = f"{(result['wall_s'] / base - 1) * 100:+.0f}%" if base else "-"
+        worker = result["worker_peak_rss_mb"]
+        print(
+            f"{name:<40} {result['wall_s']:>8.3f} {result['cpu_s']:>8.3f} {result['peak_rss_mb']:>8.1f} "
+            f"{worker if worker is not None else '-':>8} {result['output_bytes'] / 1024:>9.1f} {change:>8}"
+        )
+
+
+def _machine() -> Dict:
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for PDF generation and the Paperless upload")
+    parser.add_argument("--case", action="append", default=[], help="Only cases whose name contains this (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="Only the quick subset, one repetition")
+    parser.add_argument("--repeat", type=int, default=None, help="Measured repetitions per case (default 3, 1 with --quick)")
+    parser.add_argument("--executor", default="process", choices=("process", "thread", "inline"), help="PDF_EXECUTOR for the cases")
+    parser.add_argument("--workers", type=int, default=None, help="PDF_WORKER_PROCESSES (default: one per CPU)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline file to compare with")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results into the baseline file")
+    parser.add_argument("--output", type=Path, help="Also write the results to this JSON file")
+    parser.add_argument("--corpus-dir", type=Path, help="Keep rendered pages here between runs (default: a temp dir)")
+    parser.add_argument("--time-tolerance", type=float, default=0.3, help="Allowed relative slowdown (default 0.3)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="Allowed relative peak RSS growth (default 0.25)")
+    parser.add_argument("--size-tolerance", type=float, default=0.02, help="Allowed relative output size change (default 0.02)")
+    # Internal: run a single case in this process
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--mock-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.repeat is None:
+        args.repeat = 1 if args.quick else 3
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    cases = {case.name: case for case in CASES}
+    if args.run_case:
+        print(json.dumps(_run_case(cases[args.run_case], args.corpus_dir, args.mock_url, args.repeat)))
+        return 0
+
+    selected = [
+        case for case in CASES
+        if (case.quick or not args.quick) and (not args.case or any(part in case.name for part in args.case))
+    ]
+    if not selected:
+        parser.error("No cases selected")
+
+    baseline = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("version") != BASELINE_VERSION:
+            print(f"Ignoring {args.baseline}: baseline format {baseline.get('version')}, expected {BASELINE_VERSION}")
+            baseline = {}
+    baseline_cases = baseline.get("cases", {})
+
+    from benchmarks.mock_paperless import mock_paperless_server
+
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory(prefix="docuscan-bench-") as tmp:
+        scratch_dir = Path(tmp)
+        corpus_dir = args.corpus_dir.resolve() if args.corpus_dir else scratch_dir
+        corpus_dir.mkdir(parents=True, exist_ok=True)
+        _render_corpus(selected, corpus_dir)
+        env = _case_env(scratch_dir, args.executor, args.workers)
+
+        def run_all(mock_url: Optional[str]) -> None:
+            for case in selected:
+                print(f"Running {case.name}...", flush=True)
+                try:
+                    results[case.name] = _spawn_case(case, args, corpus_dir, scratch_dir, mock_url, env)
+                except RuntimeError as e:
+                    print(f"  failed: {e}", file=sys.stderr)
+                    results[case.name] = {"error": str(e)}
+
+        if any(case.kind == "upload" for case in selected):
+            with mock_paperless_server() as mock_url:
+                run_all(mock_url)
+        else:
+            run_all(None)
+
+    print()
+    _print_table(results, baseline_cases)
+
+    report = {
+        "version": BASELINE_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": _machine(),
+        "repeat": args.repeat,
+        "cases": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    failed = [name for name, result in results.items() if "error" in result]
+    if args.update_baseline:
+        if failed:
+            print(f"\nNot updating {args.baseline}: {len(failed)} case(s) failed")
+            return 2
+        # Cases that weren't run keep their previous numbers
+        report["cases"] = {**baseline_cases, **results}
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if baseline and baseline.get("machine") != report["machine"]:
+        print(f"\nNote: baseline was recorded on {baseline['machine'].get('platform')} "
+              f"with {baseline['machine'].get('cpus')} CPUs; timings may not be comparable")
+
+    problems = []
+    for name, result in results.items():
+        if name in baseline_cases and "error" not in result:
+            problems += _compare(name, result, baseline_cases[name], args)
+
+    if problems:
+        print("\nRegressions against the baseline:")
+        for problem in problems:
+            print(f"  {problem}")
+    elif baseline_cases:
+        print("\nNo regressions against the baseline")
+
+    if failed:
+        return 2
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
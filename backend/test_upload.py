@@ -19,7 +19,7 @@ async def test():
         # Then upload to Paperless
         print("Uploading to Paperless...")
         result = await upload_to_paperless(
-            pdf_bytes=pdf_bytes,
+            pdf=pdf_bytes,
             title="Test Document",
             tags=["docu_scan"]
         )
@@ -31,4 +31,5 @@ async def test():
         import traceback
         traceback.print_exc()
 
-asyncio.run(test())
+if __name__ == "__main__":
+    asyncio.run(test())
@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+# Settings are read once on import, so configure them before the app is imported:
+# pages encoded in-process, no page cache, settings and stores in a throwaway directory
+_data_dir = tempfile.mkdtemp(prefix="docuscan-tests-")
+os.environ.setdefault("PDF_EXECUTOR", "inline")
+os.environ.setdefault("PAGE_CACHE_MEMORY_MB", "0")
+os.environ.setdefault("DOCUSCAN_SETTINGS_FILE", os.path.join(_data_dir, "settings.json"))
+os.environ.setdefault("OUTBOX_DIR", os.path.join(_data_dir, "outbox"))
+os.environ.setdefault("DOCUMENT_STORE_DIR", os.path.join(_data_dir, "documents"))
+
+import pytest
+
+
+@pytest.fixture
+def client():
+    """Test client for the API, without the lifespan (no worker pool, job workers or outbox)"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    return TestClient(app)
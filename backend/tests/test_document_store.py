@@ -0,0 +1,136 @@
+import asyncio
+import base64
+import io
+import os
+import stat
+import pytest
+from benchmarks.corpus import PageSpec, render_page
+from app.config import settings
+from app.routers import paperless as paperless_router
+from app.services.document_store_service import (
+    DocumentNotFoundError,
+    get_document,
+    get_document_dir,
+    store_document
+)
+from app.services.pdf_service import PDFBuildResult
+
+PAGE = base64.b64encode(render_page(PageSpec(resolution="a4_150dpi"))).decode()
+
+
+@pytest.fixture(autouse=True)
+def document_dir(monkeypatch, tmp_path):
+    directory = tmp_path / "documents"
+    monkeypatch.setattr(settings, "document_store_dir", str(directory))
+    monkeypatch.setattr(settings, "document_ttl_seconds", 900)
+    monkeypatch.setattr(settings, "document_store_max_mb", 1024)
+    return directory
+
+
+def _pdf_result(data: bytes) -> PDFBuildResult:
+    return PDFBuildResult(
+        file=io.BytesIO(data),
+        size=len(data),
+        page_count=1,
+        skipped_pages=[],
+        passthrough_pages=0,
+        grayscale_pages=0,
+        bitonal_pages=0,
+        cached_pages=0,
+        page_enhancements=["color"],
+        page_qualities=[85],
+        timings={},
+        workers=1,
+        speedup=1.0
+    )
+
+
+def _generate_stored(client):
+    response = client.post("/api/pdf/generate?store=true", json={"title": "Kept", "images": [PAGE]})
+    assert response.status_code == 200
+    return response.content, response.headers["X-Document-Handle"]
+
+
+def test_stored_document_downloads_again(client):
+    pdf, handle = _generate_stored(client)
+
+    response = client.get(f"/api/pdf/documents/{handle}")
+
+    assert response.status_code == 200
+    assert response.content == pdf
+    assert response.headers["X-Page-Count"] == "1"
+
+
+def test_deleted_document_is_gone(client):
+    _, handle = _generate_stored(client)
+
+    assert client.delete(f"/api/pdf/documents/{handle}").status_code == 200
+    assert client.get(f"/api/pdf/documents/{handle}").status_code == 404
+    assert client.delete(f"/api/pdf/documents/{handle}").status_code == 404
+
+
+def test_expired_document_is_gone(client, monkeypatch, document_dir):
+    monkeypatch.setattr(settings, "document_ttl_seconds", 0)
+    _, handle = _generate_stored(client)
+
+    assert client.get(f"/api/pdf/documents/{handle}").status_code == 404
+    assert list(document_dir.iterdir()) == []
+
+
+def test_oldest_documents_are_evicted_beyond_the_size_limit(monkeypatch):
+    monkeypatch.setattr(settings, "document_store_max_mb", 1)
+    data = b"%PDF-1.4\n" + b"\0" * 400 * 1024
+
+    async def run():
+        documents = []
+        for _ in range(3):
+            documents.append(await store_document(_pdf_result(data), "Scan"))
+            await asyncio.sleep(0.01)
+        return documents
+
+    oldest, middle, newest = asyncio.run(run())
+
+    with pytest.raises(DocumentNotFoundError):
+        asyncio.run(get_document(oldest.handle))
+    assert asyncio.run(get_document(middle.handle)).handle == middle.handle
+    assert asyncio.run(get_document(newest.handle)).handle == newest.handle
+
+
+def test_documents_are_only_readable_by_the_owner(document_dir):
+    document_dir.mkdir(mode=0o755)
+    os.chmod(document_dir, 0o755)
+
+    document = asyncio.run(store_document(_pdf_result(b"%PDF-1.4\n"), "Private"))
+
+    assert stat.S_IMODE(document_dir.stat().st_mode) == 0o700
+    for suffix in (".pdf", ".json"):
+        assert stat.S_IMODE((document_dir / f"{document.handle}{suffix}").stat().st_mode) == 0o600
+
+
+def test_directory_owned_by_someone_else_is_refused(monkeypatch):
+    uid = os.getuid()
+    monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+
+    with pytest.raises(PermissionError):
+        get_document_dir()
+
+
+def test_paperless_upload_by_handle_skips_encoding(client, monkeypatch):
+    pdf, handle = _generate_stored(client)
+    uploaded = []
+
+    async def build_pdf(*args, **kwargs):
+        raise AssertionError("Stored document was encoded again")
+
+    async def upload_to_paperless(pdf, **document):
+        uploaded.append((pdf.read(), document["title"]))
+        return {"id": 42}
+
+    monkeypatch.setattr(paperless_router, "build_pdf", build_pdf)
+    monkeypatch.setattr(paperless_router, "upload_to_paperless", upload_to_paperless)
+
+    response = client.post("/api/paperless/upload", json={"title": "Again", "document_handle": handle})
+
+    assert response.status_code == 200
+    assert response.json()["document_id"] == 42
+    assert uploaded == [(pdf, "Again")]
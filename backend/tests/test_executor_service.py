@@ -0,0 +1,117 @@
+import asyncio
+from collections import deque
+import pytest
+from app.config import settings
+from app.services import executor_service
+from app.services.executor_service import (
+    PixelBudgetExceededError,
+    acquire_pixels,
+    get_pixel_budget,
+    release_pixels
+)
+
+
+@pytest.fixture(autouse=True)
+def pixel_budget(monkeypatch):
+    """A 1 MB budget (131072 pixels) with nothing in use or waiting"""
+    monkeypatch.setattr(settings, "pdf_memory_budget_mb", 1)
+    monkeypatch.setattr(settings, "pdf_admission_timeout", 5.0)
+    monkeypatch.setattr(executor_service, "_pixels_in_use", 0)
+    monkeypatch.setattr(executor_service, "_pixel_waiters", deque())
+    monkeypatch.setattr(executor_service, "_pixel_rejections", 0)
+    monkeypatch.setattr(executor_service, "_lease_seconds", 2.0)
+    return get_pixel_budget()
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_waiters_are_admitted_in_arrival_order(pixel_budget):
+    admitted = []
+
+    async def wait_for(name, pixels):
+        await acquire_pixels(pixels)
+        admitted.append(name)
+
+    async def run():
+        held = await acquire_pixels(100_000)
+        large = asyncio.ensure_future(wait_for("large", 100_000))
+        await _settle()
+        # Would fit next to what is held, but must not overtake the large export
+        small = asyncio.ensure_future(wait_for("small", 1_000))
+        await _settle()
+        assert admitted == []
+
+        release_pixels(held)
+        await asyncio.gather(large, small)
+
+    asyncio.run(run())
+
+    assert admitted == ["large", "small"]
+    assert executor_service._pixels_in_use == 101_000
+
+
+def test_cancelled_waiter_hands_its_place_on(pixel_budget):
+    async def run():
+        await acquire_pixels(100_000)
+        large = asyncio.ensure_future(acquire_pixels(100_000))
+        await _settle()
+        small = asyncio.ensure_future(acquire_pixels(1_000))
+        await _settle()
+        assert not small.done()
+
+        large.cancel()
+        await _settle()
+        assert small.done() and small.result() == 1_000
+
+    asyncio.run(run())
+
+    assert executor_service._pixels_in_use == 101_000
+    assert not executor_service._pixel_waiters
+
+
+def test_timeout_rejects_with_retry_after(pixel_budget, monkeypatch):
+    monkeypatch.setattr(settings, "pdf_admission_timeout", 0.05)
+    monkeypatch.setattr(executor_service, "_lease_seconds", 3.2)
+
+    async def run():
+        await acquire_pixels(pixel_budget)
+        with pytest.raises(PixelBudgetExceededError) as error:
+            await acquire_pixels(1_000)
+        return error.value
+
+    error = asyncio.run(run())
+
+    assert error.retry_after == 4
+    assert executor_service._pixel_rejections == 1
+    assert executor_service._pixels_in_use == pixel_budget
+    assert not executor_service._pixel_waiters
+
+
+def test_export_larger_than_the_budget_runs_alone(pixel_budget):
+    async def run():
+        # Admitted straight away when nothing else is running, clamped to the budget
+        reserved = await acquire_pixels(pixel_budget * 10)
+        assert reserved == pixel_budget
+        release_pixels(reserved)
+
+        held = await acquire_pixels(1_000)
+        oversized = asyncio.ensure_future(acquire_pixels(pixel_budget * 10))
+        await _settle()
+        assert not oversized.done()
+
+        release_pixels(held)
+        assert await oversized == pixel_budget
+
+    asyncio.run(run())
+
+    assert executor_service._pixels_in_use == pixel_budget
+
+
+def test_no_budget_admits_everything(monkeypatch):
+    monkeypatch.setattr(settings, "pdf_memory_budget_mb", 0)
+
+    assert asyncio.run(acquire_pixels(10 ** 12)) == 0
+    assert executor_service._pixels_in_use == 0
@@ -0,0 +1,42 @@
+import asyncio
+import pytest
+from app.config import settings
+from app.services import job_service
+from app.services.job_service import start_job_workers, stop_job_workers, submit_job
+
+
+@pytest.fixture(autouse=True)
+def no_jobs(monkeypatch):
+    monkeypatch.setattr(job_service, "_jobs", {})
+    monkeypatch.setattr(job_service, "_queue", None)
+    monkeypatch.setattr(job_service, "_workers", [])
+
+
+def test_shutdown_fails_queued_jobs_and_cleans_them_up(monkeypatch):
+    monkeypatch.setattr(settings, "job_workers", 1)
+    cleaned = []
+
+    async def run():
+        started = asyncio.Event()
+
+        async def blocking(job):
+            started.set()
+            await asyncio.Event().wait()
+
+        async def never_started(job):
+            raise AssertionError("Queued job ran after shutdown")
+
+        start_job_workers()
+        running = submit_job("test", blocking, cleanup=lambda: cleaned.append("running"))
+        queued = submit_job("test", never_started, cleanup=lambda: cleaned.append("queued"))
+        await started.wait()
+        await stop_job_workers(drain_timeout=0)
+        return running, queued
+
+    running, queued = asyncio.run(run())
+
+    assert running.stage == "failed"
+    assert queued.stage == "failed"
+    assert queued.error == "Server shut down before the job started"
+    assert sorted(cleaned) == ["queued", "running"]
+    assert job_service._queue is None
@@ -0,0 +1,60 @@
+import asyncio
+import io
+import stat
+from types import SimpleNamespace
+import httpx
+import pytest
+from app.config import settings
+from app.routers import paperless as paperless_router
+from app.routers.paperless import PaperlessDocumentMetadata, upload_pdf_result
+from app.services.outbox_service import OutboxFullError, enqueue_upload, start_outbox, stop_outbox
+
+PDF = b"%PDF-1.4\n%%EOF\n"
+
+
+def _mode(path) -> int:
+    return stat.S_IMODE(path.stat().st_mode)
+
+
+def test_queued_items_are_private_to_the_owner(tmp_path, monkeypatch):
+    outbox_dir = tmp_path / "outbox"
+    monkeypatch.setattr(settings, "outbox_dir", str(outbox_dir))
+
+    async def run():
+        start_outbox()
+        try:
+            return await enqueue_upload(
+                io.BytesIO(PDF),
+                title="Scan",
+                paperless_url="http://paperless.local",
+                paperless_token="per-request-token",
+                error=httpx.ConnectError("connection refused")
+            )
+        finally:
+            await stop_outbox()
+
+    item = asyncio.run(run())
+
+    assert _mode(outbox_dir) == 0o700
+    assert _mode(outbox_dir / f"{item.id}.json") == 0o600
+    assert _mode(outbox_dir / f"{item.id}.pdf") == 0o600
+    assert (outbox_dir / f"{item.id}.pdf").read_bytes() == PDF
+
+
+def test_full_outbox_keeps_the_paperless_error(monkeypatch):
+    async def upload_to_paperless(**kwargs):
+        raise httpx.ConnectError("connection refused")
+
+    async def enqueue_upload(*args, **kwargs):
+        raise OutboxFullError("Paperless outbox is full")
+
+    monkeypatch.setattr(paperless_router, "upload_to_paperless", upload_to_paperless)
+    monkeypatch.setattr(paperless_router, "enqueue_upload", enqueue_upload)
+    monkeypatch.setattr(paperless_router, "is_outbox_running", lambda: True)
+    pdf_result = SimpleNamespace(file=io.BytesIO(PDF), size=len(PDF), close=lambda: None)
+
+    with pytest.raises(OutboxFullError) as raised:
+        asyncio.run(upload_pdf_result(PaperlessDocumentMetadata(title="Scan"), pdf_result))
+
+    assert str(raised.value) == "connection refused (Paperless outbox is full, document not queued)"
+    assert isinstance(raised.value.__cause__, httpx.ConnectError)
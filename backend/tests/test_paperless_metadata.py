@@ -0,0 +1,47 @@
+import asyncio
+from collections import OrderedDict
+import pytest
+from app.config import settings
+from app.services import paperless_metadata
+from app.services.paperless_metadata import get_metadata
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Paperless answering every list request with one tag; records (url, token, kind) fetched"""
+    calls = []
+
+    async def fetch_all(url, token, kind):
+        calls.append((url, token, kind))
+        return [{"id": 1, "name": f"tag-{token}"}]
+
+    monkeypatch.setattr(paperless_metadata, "_fetch_all", fetch_all)
+    monkeypatch.setattr(paperless_metadata, "_mirrors", OrderedDict())
+    monkeypatch.setattr(settings, "paperless_max_clients", 3)
+    return calls
+
+
+def test_per_request_overrides_keep_a_bounded_number_of_mirrors(fetches):
+    async def run():
+        await get_metadata("http://paperless.local", "configured", "tags")
+        for n in range(10):
+            await get_metadata("http://paperless.local", "configured", "tags")
+            await get_metadata("http://other.local", f"token-{n}", "tags")
+
+    asyncio.run(run())
+
+    assert len(paperless_metadata._mirrors) == 3
+    # The configured instance is used all the time, so it stays and is fetched once
+    assert ("http://paperless.local", "configured") in paperless_metadata._mirrors
+    assert fetches.count(("http://paperless.local", "configured", "tags")) == 1
+
+
+def test_evicted_mirror_is_loaded_again(fetches):
+    async def run():
+        for token in ("a", "b", "c", "d", "a"):
+            await get_metadata("http://paperless.local", token, "tags")
+
+    asyncio.run(run())
+
+    assert [token for _, token, _ in fetches] == ["a", "b", "c", "d", "a"]
+    assert [key[1] for key in paperless_metadata._mirrors] == ["c", "d", "a"]
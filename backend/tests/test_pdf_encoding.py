@@ -0,0 +1,132 @@
+import asyncio
+import io
+import re
+import pytest
+from PIL import Image
+from PyPDF2 import PdfReader
+from benchmarks.corpus import INPUT_JPEG_QUALITY, PageSpec, render_page
+from app.config import settings
+from app.services.pdf_service import build_pdf
+from app.services.pdf_writer import ImagePDFWriter
+
+# Camera JPEG at INPUT_JPEG_QUALITY with visible color
+PHOTO_JPEG = render_page(PageSpec(content="photo", resolution="a4_150dpi"))
+
+
+@pytest.fixture(autouse=True)
+def encoding_settings(monkeypatch):
+    monkeypatch.setattr(settings, "pdf_jpeg_passthrough", True)
+    monkeypatch.setattr(settings, "pdf_mode_aware_encoding", True)
+    monkeypatch.setattr(settings, "pdf_max_image_size", 5000)
+
+
+def _jpeg(img: Image.Image, quality: int = INPUT_JPEG_QUALITY) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def _export(pages, compression_quality=95):
+    """Build a PDF and return the result with each page's image XObject"""
+    result = asyncio.run(build_pdf(pages, compression_quality=compression_quality))
+    try:
+        pdf = result.read_bytes()
+    finally:
+        result.close()
+    reader = PdfReader(io.BytesIO(pdf))
+    images = [page["/Resources"]["/XObject"]["/Im0"] for page in reader.pages]
+    return result, pdf, images
+
+
+def test_qualifying_camera_jpeg_is_embedded_verbatim():
+    result, _, [image] = _export([PHOTO_JPEG])
+
+    assert result.passthrough_pages == 1
+    assert image.get_object()["/Filter"] == "/DCTDecode"
+    assert image.get_object()._data == PHOTO_JPEG
+
+
+@pytest.mark.parametrize("case", ["higher_quality_source", "not_rgb", "oversized"])
+def test_jpegs_that_do_not_qualify_are_re_encoded(case, monkeypatch):
+    page = PHOTO_JPEG
+    compression_quality = 95
+    if case == "higher_quality_source":
+        compression_quality = INPUT_JPEG_QUALITY - 10
+    elif case == "not_rgb":
+        page = _jpeg(Image.open(io.BytesIO(PHOTO_JPEG)).convert("CMYK"))
+    else:
+        monkeypatch.setattr(settings, "pdf_max_image_size", 1000)
+
+    result, _, [image] = _export([page], compression_quality)
+    image = image.get_object()
+
+    assert result.passthrough_pages == 0
+    assert image["/Filter"] == "/DCTDecode"
+    assert image._data != page
+    assert max(image["/Width"], image["/Height"]) <= settings.pdf_max_image_size
+    Image.open(io.BytesIO(image._data)).verify()
+
+
+def test_writer_cross_references_point_at_their_objects():
+    _, pdf, _ = _export([PHOTO_JPEG, render_page(PageSpec(resolution="a4_150dpi", format="png"))])
+
+    xref_position = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", pdf).group(1))
+    assert pdf[xref_position:].startswith(b"xref\n")
+    header, *entries = pdf[xref_position:].split(b"trailer")[0].splitlines()[1:]
+    first, count = map(int, header.split())
+    assert first == 0 and len(entries) == count
+
+    for number, entry in enumerate(entries[1:], start=1):
+        offset = int(entry.split()[0])
+        assert pdf[offset:].startswith(f"{number} 0 obj\n".encode())
+
+
+def test_writer_stores_identical_images_once():
+    output = io.BytesIO()
+    writer = ImagePDFWriter(output, page_size=(595.28, 841.89), title="Twice")
+    for _ in range(2):
+        writer.add_image_page(PHOTO_JPEG, 1240, 1754)
+    writer.close()
+
+    reader = PdfReader(io.BytesIO(output.getvalue()))
+    refs = [page["/Resources"]["/XObject"].raw_get("/Im0").idnum for page in reader.pages]
+
+    assert len(reader.pages) == 2
+    assert refs[0] == refs[1]
+    assert output.getvalue().count(PHOTO_JPEG) == 1
+
+
+def _bitonal_page() -> bytes:
+    """Black text on white, saved as an RGB PNG like a phone's B&W filter"""
+    img = Image.new("RGB", (1240, 1754), "white")
+    img.paste((0, 0, 0), (100, 100, 1140, 140))
+    img.paste((0, 0, 0), (100, 200, 900, 240))
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_page_modes_are_stored_with_matching_color_space_and_depth():
+    gray_photo = _jpeg(Image.open(io.BytesIO(PHOTO_JPEG)).convert("L").convert("RGB"))
+
+    result, _, images = _export([PHOTO_JPEG, gray_photo, _bitonal_page()])
+    color, gray, bitonal = (image.get_object() for image in images)
+
+    assert (color["/ColorSpace"], color["/BitsPerComponent"]) == ("/DeviceRGB", 8)
+    # Colorless camera JPEGs skip passthrough to drop their unused color channels
+    assert (gray["/Filter"], gray["/ColorSpace"], gray["/BitsPerComponent"]) == \
+        ("/DCTDecode", "/DeviceGray", 8)
+    assert (bitonal["/Filter"], bitonal["/ColorSpace"], bitonal["/BitsPerComponent"]) == \
+        ("/FlateDecode", "/DeviceGray", 1)
+    assert (result.passthrough_pages, result.grayscale_pages, result.bitonal_pages) == (1, 1, 1)
+    # 1-bit rows are padded to whole bytes
+    assert len(bitonal.get_data()) == (1240 + 7) // 8 * 1754
+
+
+def test_mode_aware_encoding_can_be_turned_off(monkeypatch):
+    monkeypatch.setattr(settings, "pdf_mode_aware_encoding", False)
+
+    result, _, [image] = _export([_bitonal_page()])
+
+    assert (image["/ColorSpace"], image["/BitsPerComponent"]) == ("/DeviceRGB", 8)
+    assert result.bitonal_pages == 0
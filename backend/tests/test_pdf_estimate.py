@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+from benchmarks.corpus import PageSpec, render_page
+from app.services.pdf_service import build_pdf, estimate_pdf_size_from_pages
+
+# Full-resolution estimates are measured on strips of the page itself, so they
+# should land close to the real output (thumbnail estimates are much looser)
+TOLERANCE = 0.05
+
+CORPUS = [
+    PageSpec(content=content, resolution=resolution, format=fmt)
+    for content in ("text", "photo", "mixed")
+    for resolution, fmt in (("a4_300dpi", "jpeg"), ("a4_150dpi", "png"), ("phone_12mp", "jpeg"))
+]
+
+
+def _actual_size(pages) -> int:
+    result = asyncio.run(build_pdf(pages))
+    result.close()
+    return result.size
+
+
+@pytest.mark.parametrize("spec", CORPUS, ids=lambda spec: spec.name)
+@pytest.mark.parametrize("quality", [75, 98])
+def test_estimate_matches_build_pdf(spec, quality, monkeypatch):
+    monkeypatch.setattr("app.config.settings.pdf_compression_quality", quality)
+    pages = [render_page(PageSpec(spec.content, spec.resolution, spec.format, seed=seed)) for seed in range(2)]
+
+    estimate = asyncio.run(estimate_pdf_size_from_pages(pages))
+    actual = _actual_size(pages)
+
+    assert estimate.measured_pages == 2
+    assert abs(estimate.size / actual - 1) <= TOLERANCE, f"estimated {estimate.size}, got {actual}"
+
+
+def test_estimate_scales_to_missing_pages():
+    page = render_page(PageSpec(resolution="a4_150dpi"))
+
+    one = asyncio.run(estimate_pdf_size_from_pages([page]))
+    three = asyncio.run(estimate_pdf_size_from_pages([page], num_pages=3))
+
+    assert three.num_pages == 3
+    assert three.size == pytest.approx(3 * one.size, rel=0.01)
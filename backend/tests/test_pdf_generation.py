@@ -0,0 +1,102 @@
+import asyncio
+import base64
+import io
+import pytest
+from PyPDF2 import PdfReader
+from benchmarks.corpus import PageSpec, render_page
+from app.config import settings
+from app.services import page_cache_service
+from app.services.pdf_service import build_pdf
+
+
+def test_pages_are_written_in_order_and_broken_ones_skipped():
+    pages = [
+        render_page(PageSpec(resolution="a4_150dpi", seed=0)),
+        b"not an image",
+        base64.b64encode(render_page(PageSpec(resolution="a4_150dpi", format="png", seed=1))).decode()
+    ]
+
+    result = asyncio.run(build_pdf(pages, title="Mixed"))
+    try:
+        reader = PdfReader(io.BytesIO(result.read_bytes()))
+    finally:
+        result.close()
+
+    assert result.page_count == 2
+    assert result.skipped_pages == [1]
+    assert len(reader.pages) == 2
+    assert reader.metadata.title == "Mixed"
+
+
+def test_no_decodable_page_is_an_error():
+    with pytest.raises(ValueError, match="None of the images could be decoded"):
+        asyncio.run(build_pdf([b"not an image", "bm90IGFuIGltYWdlIGVpdGhlcg=="]))
+
+
+def test_repeated_base64_page_is_served_from_the_cache(monkeypatch):
+    monkeypatch.setattr(settings, "page_cache_memory_mb", 16)
+    monkeypatch.setattr(page_cache_service, "_memory", page_cache_service.OrderedDict())
+    monkeypatch.setattr(page_cache_service, "_memory_bytes", 0)
+    image = render_page(PageSpec(resolution="a4_150dpi"))
+    page = "data:image/jpeg;base64," + base64.b64encode(image).decode()
+
+    results = [asyncio.run(build_pdf(pages)) for pages in ([page], [page, page], [image])]
+    for result in results:
+        result.close()
+
+    assert [result.cached_pages for result in results] == [0, 2, 0]
+
+
+def test_corrupt_disk_cache_entry_is_re_encoded(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "page_cache_dir", str(tmp_path))
+    monkeypatch.setattr(page_cache_service, "_disk", None)
+    monkeypatch.setattr(page_cache_service, "_disk_bytes", 0)
+    image = render_page(PageSpec(resolution="a4_150dpi"))
+
+    asyncio.run(build_pdf([image])).close()
+    [entry] = tmp_path.glob("??/*")
+    entry.write_bytes(page_cache_service.DISK_MAGIC + b'{"width": 12\n\xff\xd8')
+
+    results = [asyncio.run(build_pdf([image])) for _ in range(2)]
+    for result in results:
+        result.close()
+
+    # The bad entry is a miss and is replaced by a fresh one
+    assert [result.page_count for result in results] == [1, 1]
+    assert [result.cached_pages for result in results] == [0, 1]
+
+
+PHOTOS = [render_page(PageSpec(content="photo", resolution="a4_150dpi", format="png", seed=seed)) for seed in (0, 1)]
+
+
+def _build(pages, **kwargs):
+    result = asyncio.run(build_pdf(pages, compression_quality=85, **kwargs))
+    result.close()
+    return result
+
+
+def test_page_within_the_size_target_keeps_its_quality():
+    result = _build(PHOTOS[:1], target_kb_per_page=10_000)
+
+    assert result.page_qualities == [85]
+
+
+def test_tight_size_target_lowers_quality_down_to_the_ocr_floor(monkeypatch):
+    monkeypatch.setattr(settings, "pdf_min_ocr_quality", 60)
+
+    fitted = _build(PHOTOS[:1], target_kb_per_page=250)
+    floored = _build(PHOTOS[:1], target_kb_per_page=5)
+
+    assert 60 < fitted.page_qualities[0] < 85
+    assert fitted.size <= 250 * 1024
+    # An unreachable target stops at the floor rather than making text unreadable
+    assert floored.page_qualities == [60]
+
+
+def test_total_size_target_is_split_across_pages():
+    single = _build(PHOTOS[:1], target_total_kb=450)
+    double = _build(PHOTOS, target_total_kb=450)
+
+    assert single.page_qualities == [85]
+    assert all(60 <= quality < 85 for quality in double.page_qualities)
+    assert double.size <= 450 * 1024
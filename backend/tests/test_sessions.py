@@ -0,0 +1,118 @@
+import asyncio
+import gc
+import warnings
+import pytest
+from benchmarks.corpus import PageSpec, render_page
+from app.config import settings
+from app.services import session_service
+from app.services.executor_service import PDFQueueFullError
+from app.services.session_service import (
+    SessionMemoryError,
+    create_session,
+    delete_session,
+    finalize_session,
+    put_page
+)
+
+PAGE = render_page(PageSpec(resolution="a4_150dpi"))
+
+
+@pytest.fixture(autouse=True)
+def no_sessions(monkeypatch):
+    monkeypatch.setattr(session_service, "_sessions", {})
+
+
+def test_finalize_assembles_pages_in_order():
+    async def run():
+        session = create_session(title="Receipts")
+        for number in (3, 1, 2):
+            await put_page(session.id, number, PAGE)
+        result = await finalize_session(session.id)
+        result.close()
+        delete_session(session.id)
+        return result
+
+    result = asyncio.run(run())
+
+    assert result.page_count == 3
+    assert result.skipped_pages == []
+
+
+def test_skipped_pages_are_reported_by_session_page_number():
+    async def run():
+        session = create_session()
+        await put_page(session.id, 5, PAGE)
+        await put_page(session.id, 9, b"not an image")
+        result = await finalize_session(session.id)
+        result.close()
+        delete_session(session.id)
+        return result
+
+    result = asyncio.run(run())
+
+    assert result.page_count == 1
+    assert result.skipped_pages == [1]
+    assert result.skipped_page_numbers == [9]
+
+
+def test_finalize_with_full_queue_leaves_no_unawaited_coroutines(monkeypatch):
+    monkeypatch.setattr(settings, "pdf_max_pending_jobs", 0)
+
+    async def run():
+        session = create_session()
+        await put_page(session.id, 1, PAGE)
+        with pytest.raises(PDFQueueFullError):
+            await finalize_session(session.id)
+        delete_session(session.id)
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        asyncio.run(run())
+        gc.collect()
+
+    assert not [w for w in caught if "never awaited" in str(w.message)]
+
+
+def test_failed_assembly_leaves_no_unawaited_coroutines(monkeypatch):
+    async def failing_assemble(pages, title, workers=1, page_numbers=None):
+        await pages[0]
+        pages[0] = None
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(session_service, "assemble_pdf", failing_assemble)
+
+    async def run():
+        session = create_session()
+        for number in (1, 2, 3):
+            await put_page(session.id, number, PAGE)
+        with pytest.raises(OSError):
+            await finalize_session(session.id)
+        delete_session(session.id)
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        asyncio.run(run())
+        gc.collect()
+
+    assert not [w for w in caught if "never awaited" in str(w.message)]
+
+
+def test_pages_beyond_the_memory_limit_are_rejected(monkeypatch):
+    # Pages are about 1 MB uploaded and 1.2 MB encoded: room for two, not three
+    monkeypatch.setattr(settings, "session_max_mb", 3)
+    data = PAGE
+
+    async def run():
+        first = create_session()
+        second = create_session()
+        await (await put_page(first.id, 1, data)).task
+        await (await put_page(second.id, 1, data)).task
+        with pytest.raises(SessionMemoryError):
+            await put_page(second.id, 2, data)
+        # Replacing a page frees what it held
+        await put_page(second.id, 1, data)
+        delete_session(first.id)
+        await put_page(second.id, 2, data)
+        delete_session(second.id)
+
+    asyncio.run(run())
@@ -0,0 +1,96 @@
+import json
+import os
+import pytest
+from app.services import paperless_client, paperless_metadata, settings_service
+from app.services.settings_service import UserSettings, load_settings, on_settings_change, save_settings
+
+
+@pytest.fixture(autouse=True)
+def settings_file(monkeypatch, tmp_path):
+    path = tmp_path / "settings.json"
+    monkeypatch.setattr(settings_service, "SETTINGS_FILE", str(path))
+    monkeypatch.setattr(settings_service, "_cached", None)
+    monkeypatch.setattr(settings_service, "_cached_signature", None)
+    monkeypatch.setattr(settings_service, "_dir_ready", False)
+    # Keep the Paperless client and mirror listeners, drop any a test adds
+    monkeypatch.setattr(settings_service, "_listeners", list(settings_service._listeners))
+    return path
+
+
+@pytest.fixture
+def changes():
+    recorded = []
+    on_settings_change(lambda old, new: recorded.append((old.paperlessUrl, new.paperlessUrl)))
+    return recorded
+
+
+def _edit_on_disk(path, **values):
+    """Rewrite the file the way an editor would, with a new mtime"""
+    data = {**json.loads(path.read_text()), **values}
+    path.write_text(json.dumps(data))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_external_edit_is_picked_up(settings_file):
+    save_settings(UserSettings(paperlessUrl="http://old:8000"))
+    assert load_settings().paperlessUrl == "http://old:8000"
+
+    _edit_on_disk(settings_file, paperlessUrl="http://new:8000")
+
+    assert load_settings().paperlessUrl == "http://new:8000"
+
+
+def test_unchanged_file_is_served_from_memory(settings_file, monkeypatch):
+    save_settings(UserSettings(paperlessUrl="http://paperless:8000"))
+    monkeypatch.setattr(settings_service, "_cached", None)
+    reads = []
+    read_settings_file = settings_service._read_settings_file
+    monkeypatch.setattr(settings_service, "_read_settings_file", lambda: reads.append(1) or read_settings_file())
+
+    first = load_settings()
+    second = load_settings()
+
+    assert len(reads) == 1
+    assert first == second
+    # Callers get copies, so changing one doesn't change the cache
+    first.paperlessUrl = "http://changed"
+    assert load_settings().paperlessUrl == "http://paperless:8000"
+
+
+def test_listeners_fire_only_when_the_content_changes(settings_file, changes):
+    save_settings(UserSettings(paperlessUrl="http://a:8000"))
+    save_settings(UserSettings(paperlessUrl="http://a:8000"))
+    # Touched but identical: re-read, no change
+    _edit_on_disk(settings_file)
+    load_settings()
+    assert changes == [("", "http://a:8000")]
+
+    save_settings(UserSettings(paperlessUrl="http://b:8000"))
+    _edit_on_disk(settings_file, paperlessUrl="http://c:8000")
+    load_settings()
+
+    assert changes == [
+        ("", "http://a:8000"),
+        ("http://a:8000", "http://b:8000"),
+        ("http://b:8000", "http://c:8000")
+    ]
+
+
+def test_changed_paperless_url_releases_the_old_pool_and_mirror(settings_file, monkeypatch):
+    old = ("http://old:8000", "token")
+    pooled = paperless_client._PooledClient(client=None, users=1)
+    monkeypatch.setattr(paperless_client, "_clients", paperless_client.OrderedDict({old: pooled}))
+    monkeypatch.setattr(paperless_metadata, "_mirrors", paperless_metadata.OrderedDict({old: object()}))
+    save_settings(UserSettings(paperlessUrl=old[0], paperlessToken=old[1]))
+
+    # Other settings don't touch the pool
+    save_settings(UserSettings(paperlessUrl=old[0], paperlessToken=old[1], defaultEnhancement="bw"))
+    assert old in paperless_client._clients
+
+    save_settings(UserSettings(paperlessUrl="http://new:8000", paperlessToken=old[1]))
+
+    assert old not in paperless_client._clients
+    assert old not in paperless_metadata._mirrors
+    # Still in use, so it is closed by the last request rather than right away
+    assert pooled.evicted
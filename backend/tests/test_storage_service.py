@@ -0,0 +1,187 @@
+import asyncio
+import io
+from types import SimpleNamespace
+import httpx
+import pytest
+from app.config import settings
+from app.routers import paperless as paperless_router
+from app.services import storage_service
+from app.services.storage.base import StorageSink
+from app.services.storage_service import FANOUT_CHUNK_SIZE, FANOUT_QUEUE_CHUNKS, store_pdf
+
+# Several times what the fan-out buffers per sink, so producers have to wait on consumers
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * (FANOUT_CHUNK_SIZE * FANOUT_QUEUE_CHUNKS * 3 // 256)
+
+
+class RecordingSink(StorageSink):
+    """Collects what it receives; optionally fails after a number of chunks or stops reading"""
+
+    def __init__(self, name: str, fail_after: int = None, stall: bool = False):
+        self.name = name
+        self.fail_after = fail_after
+        self.stall = stall
+        self.received = bytearray()
+        self.documents = []
+
+    async def store(self, chunks, document):
+        self.documents.append(document)
+        count = 0
+        async for chunk in chunks:
+            if self.stall:
+                await asyncio.Event().wait()
+            if self.fail_after is not None and count == self.fail_after:
+                raise ConnectionResetError(f"{self.name} went away")
+            self.received += chunk
+            count += 1
+        return f"{self.name}:/{document.filename}"
+
+
+def _pdf_result(data: bytes = PDF):
+    return SimpleNamespace(file=io.BytesIO(data), size=len(data))
+
+
+@pytest.fixture
+def sinks(monkeypatch):
+    """WebDAV, FTP and SMB enabled and backed by recording sinks; Paperless disabled"""
+    monkeypatch.setattr(settings, "paperless_enabled", False)
+    monkeypatch.setattr(settings, "webdav_enabled", True)
+    monkeypatch.setattr(settings, "webdav_url", "http://dav.local/")
+    monkeypatch.setattr(settings, "ftp_enabled", True)
+    monkeypatch.setattr(settings, "ftp_host", "ftp.local")
+    monkeypatch.setattr(settings, "smb_enabled", True)
+    monkeypatch.setattr(settings, "smb_server", "nas")
+    monkeypatch.setattr(settings, "smb_share", "documents")
+    monkeypatch.setattr(settings, "storage_timeout", 5.0)
+
+    recording = {name: RecordingSink(name) for name in ("webdav", "ftp", "smb")}
+    monkeypatch.setattr(storage_service, "_sinks", dict(recording))
+    return recording
+
+
+def test_every_sink_receives_the_whole_pdf(sinks):
+    results = asyncio.run(store_pdf(_pdf_result(), title="Invoice March", sinks=["smb", "webdav", "ftp"]))
+
+    assert [result.sink for result in results] == ["smb", "webdav", "ftp"]
+    assert all(result.success for result in results)
+    for sink in sinks.values():
+        assert bytes(sink.received) == PDF
+    # One file name for the document across sinks
+    filenames = {sink.documents[0].filename for sink in sinks.values()}
+    assert len(filenames) == 1
+    assert filenames.pop().startswith("Invoice_March_")
+    assert results[0].location == f"smb:/{sinks['smb'].documents[0].filename}"
+
+
+def test_defaults_to_every_enabled_sink(sinks):
+    results = asyncio.run(store_pdf(_pdf_result(), title="Scan"))
+
+    assert [result.sink for result in results] == ["webdav", "ftp", "smb"]
+
+
+def test_failing_sink_does_not_stall_the_others(sinks):
+    sinks["ftp"].fail_after = 2
+
+    results = {result.sink: result for result in asyncio.run(store_pdf(_pdf_result(), title="Scan"))}
+
+    assert not results["ftp"].success
+    assert results["ftp"].error == "ftp went away"
+    assert results["webdav"].success and results["smb"].success
+    assert bytes(sinks["webdav"].received) == PDF
+    assert bytes(sinks["smb"].received) == PDF
+
+
+def test_stalled_sink_is_dropped_and_the_others_finish(sinks, monkeypatch):
+    monkeypatch.setattr(settings, "storage_timeout", 0.5)
+    sinks["webdav"].stall = True
+
+    results = {result.sink: result for result in asyncio.run(store_pdf(_pdf_result(), title="Scan"))}
+
+    assert not results["webdav"].success
+    assert results["webdav"].error == "Stopped taking data for 0.125s"
+    assert results["ftp"].success and results["smb"].success
+    assert bytes(sinks["ftp"].received) == PDF
+
+
+def test_unknown_or_disabled_sink_is_rejected(sinks):
+    with pytest.raises(ValueError, match="paperless"):
+        asyncio.run(store_pdf(_pdf_result(), title="Scan", sinks=["webdav", "paperless"]))
+    with pytest.raises(ValueError, match="dropbox"):
+        asyncio.run(store_pdf(_pdf_result(), title="Scan", sinks=["dropbox"]))
+
+
+@pytest.fixture
+def paperless(sinks, monkeypatch):
+    """Paperless enabled, failing with the error set on it, and an outbox that records what is queued"""
+    monkeypatch.setattr(settings, "paperless_enabled", True)
+    state = SimpleNamespace(error=None, queued=[])
+
+    class FailingPaperlessSink(RecordingSink):
+        def __init__(self, paperless_url=None, paperless_token=None):
+            super().__init__("paperless")
+
+        async def store(self, chunks, document):
+            async for _ in chunks:
+                pass
+            raise state.error
+
+    async def enqueue_upload(pdf, title, **kwargs):
+        pdf.seek(0)
+        state.queued.append((pdf.read(), title, kwargs))
+        return SimpleNamespace(id="outbox-1")
+
+    monkeypatch.setattr(storage_service, "PaperlessSink", FailingPaperlessSink)
+    monkeypatch.setattr(storage_service, "enqueue_upload", enqueue_upload)
+    monkeypatch.setattr(storage_service, "is_outbox_running", lambda: True)
+    return state
+
+
+def test_transient_paperless_failure_goes_to_the_outbox(paperless):
+    paperless.error = httpx.ConnectError("connection refused")
+
+    results = asyncio.run(store_pdf(_pdf_result(), title="Scan", sinks=["paperless", "ftp"]))
+
+    assert results[0].success and results[0].queued
+    assert results[0].location == "outbox-1"
+    assert results[1].success
+    assert [(pdf, title) for pdf, title, _ in paperless.queued] == [(PDF, "Scan")]
+
+
+def test_permanent_paperless_failure_is_reported(paperless):
+    request = httpx.Request("POST", "http://paperless.local/api/documents/post_document/")
+    paperless.error = httpx.HTTPStatusError("bad request", request=request, response=httpx.Response(400, request=request))
+
+    results = asyncio.run(store_pdf(_pdf_result(), title="Scan", sinks=["paperless", "ftp"]))
+
+    assert not results[0].success and not results[0].queued
+    assert results[1].success
+    assert paperless.queued == []
+
+
+def test_full_outbox_reports_the_paperless_error(paperless, monkeypatch):
+    async def enqueue_upload(*args, **kwargs):
+        raise storage_service.OutboxFullError("Paperless outbox is full")
+
+    monkeypatch.setattr(storage_service, "enqueue_upload", enqueue_upload)
+    paperless.error = httpx.ConnectError("connection refused")
+
+    results = asyncio.run(store_pdf(_pdf_result(), title="Scan", sinks=["paperless", "ftp"]))
+
+    assert not results[0].success and not results[0].queued
+    assert results[0].error == "connection refused (Paperless outbox is full, document not queued)"
+    assert results[1].success
+
+
+def test_unknown_sink_is_rejected_before_the_pdf_is_built(client, sinks, monkeypatch):
+    async def build_pdf(*args, **kwargs):
+        raise AssertionError("PDF built for a request that names an unknown sink")
+
+    monkeypatch.setattr(paperless_router, "build_pdf", build_pdf)
+
+    response = client.post("/api/storage/upload", json={
+        "title": "Scan",
+        "images": ["aGVsbG8="],
+        "sinks": ["webdav", "dropbox"]
+    })
+
+    assert response.status_code == 400
+    assert "dropbox" in response.json()["detail"]
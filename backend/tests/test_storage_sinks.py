@@ -0,0 +1,245 @@
+import asyncio
+import threading
+from pathlib import Path
+import aioftp
+import pytest
+from cheroot import wsgi
+from wsgidav.wsgidav_app import WsgiDAVApp
+from app.config import settings
+from app.services.storage import smb as smb_module
+from app.services.storage.base import StoredDocument
+from app.services.storage.ftp import FTPSink
+from app.services.storage.smb import SMBSink
+from app.services.storage.webdav import WebDAVSink
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 2000 + b"%%EOF\n"
+
+
+async def _chunks(data: bytes = PDF, size: int = 64 * 1024):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def _document(filename: str = "scan.pdf") -> StoredDocument:
+    return StoredDocument(title="Scan", filename=filename, size=len(PDF))
+
+
+# FTP: in-process aioftp server
+
+
+@pytest.fixture
+def ftp_settings(monkeypatch):
+    monkeypatch.setattr(settings, "ftp_host", "127.0.0.1")
+    monkeypatch.setattr(settings, "ftp_username", "scanner")
+    monkeypatch.setattr(settings, "ftp_password", "secret")
+    monkeypatch.setattr(settings, "ftp_tls", False)
+    monkeypatch.setattr(settings, "ftp_tls_implicit", False)
+    monkeypatch.setattr(settings, "ftp_default_path", "/Scans/")
+    monkeypatch.setattr(settings, "storage_timeout", 10.0)
+
+
+async def _ftp_server(root: Path) -> aioftp.Server:
+    user = aioftp.User("scanner", "secret", base_path=root, permissions=[aioftp.Permission("/", writable=True)])
+    server = aioftp.Server([user])
+    await server.start("127.0.0.1", 0)
+    settings.ftp_port = server.server.sockets[0].getsockname()[1]
+    return server
+
+
+def test_ftp_uploads_and_reuses_connection(tmp_path, ftp_settings):
+    async def run():
+        server = await _ftp_server(tmp_path)
+        sink = FTPSink()
+        try:
+            first = await sink.store(_chunks(), _document("first.pdf"))
+            idle_client = sink._idle[0][0]
+            second = await sink.store(_chunks(), _document("second.pdf"))
+            assert sink._idle[0][0] is idle_client
+        finally:
+            await sink.close()
+            await server.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == f"ftp://127.0.0.1:{settings.ftp_port}/Scans/first.pdf"
+    assert second.endswith("/Scans/second.pdf")
+    assert (tmp_path / "Scans" / "first.pdf").read_bytes() == PDF
+    assert (tmp_path / "Scans" / "second.pdf").read_bytes() == PDF
+
+
+def test_ftp_wrong_password_fails(tmp_path, ftp_settings, monkeypatch):
+    monkeypatch.setattr(settings, "ftp_password", "wrong")
+
+    async def run():
+        server = await _ftp_server(tmp_path)
+        sink = FTPSink()
+        try:
+            with pytest.raises(aioftp.StatusCodeError):
+                await sink.store(_chunks(), _document())
+            assert sink._idle == []
+        finally:
+            await sink.close()
+            await server.close()
+
+    asyncio.run(run())
+
+
+def test_ftp_tls_asks_for_auth_tls_on_the_plain_port(tmp_path, ftp_settings, monkeypatch):
+    monkeypatch.setattr(settings, "ftp_tls", True)
+
+    async def run():
+        # The test server has no TLS, so it refuses AUTH TLS instead of hanging in a handshake
+        server = await _ftp_server(tmp_path)
+        sink = FTPSink()
+        try:
+            with pytest.raises(aioftp.StatusCodeError) as error:
+                await sink.store(_chunks(), _document())
+            assert "234" in str(error.value.expected_codes)
+        finally:
+            await sink.close()
+            await server.close()
+
+    asyncio.run(run())
+
+
+# WebDAV: wsgidav on a local port
+
+
+@pytest.fixture
+def webdav_root(tmp_path, monkeypatch):
+    app = WsgiDAVApp({
+        "provider_mapping": {"/dav": str(tmp_path)},
+        "simple_dc": {"user_mapping": {"*": {"scanner": {"password": "secret"}}}},
+        "http_authenticator": {"accept_basic": True, "accept_digest": False, "default_to_digest": False},
+        "verbose": 0,
+        "logging": {"enable": False}
+    })
+    server = wsgi.Server(("127.0.0.1", 0), app)
+    server.prepare()
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+
+    port = server.bind_addr[1]
+    monkeypatch.setattr(settings, "webdav_url", f"http://127.0.0.1:{port}/dav/")
+    monkeypatch.setattr(settings, "webdav_username", "scanner")
+    monkeypatch.setattr(settings, "webdav_password", "secret")
+    monkeypatch.setattr(settings, "webdav_default_path", "/Scans/Inbox/")
+    monkeypatch.setattr(settings, "storage_timeout", 10.0)
+    yield tmp_path
+    server.stop()
+
+
+def test_webdav_creates_directories_and_uploads(webdav_root):
+    async def run():
+        sink = WebDAVSink()
+        try:
+            first = await sink.store(_chunks(), _document("first.pdf"))
+            # The collections exist now; a new sink has to cope with MKCOL answering 405
+            other = WebDAVSink()
+            second = await other.store(_chunks(), _document("second.pdf"))
+            await other.close()
+        finally:
+            await sink.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == f"{settings.webdav_url.rstrip('/')}/Scans/Inbox/first.pdf"
+    assert second.endswith("/Scans/Inbox/second.pdf")
+    assert (webdav_root / "Scans" / "Inbox" / "first.pdf").read_bytes() == PDF
+    assert (webdav_root / "Scans" / "Inbox" / "second.pdf").read_bytes() == PDF
+
+
+def test_webdav_rejected_credentials_fail(webdav_root, monkeypatch):
+    monkeypatch.setattr(settings, "webdav_password", "wrong")
+
+    async def run():
+        sink = WebDAVSink()
+        try:
+            await sink.store(_chunks(), _document())
+        finally:
+            await sink.close()
+
+    with pytest.raises(Exception, match="401"):
+        asyncio.run(run())
+    assert not (webdav_root / "Scans").exists()
+
+
+# SMB: there is no SMB2/3 server that runs in-process, so smbclient is replaced by a
+# stand-in that maps \\server\share\path onto a local directory. This covers what the
+# sink does (UNC paths, session registration and reset, directory creation, streamed
+# writes), not the SMB protocol itself.
+
+
+class _FakeSMBClient:
+    def __init__(self, root: Path, fail_open: bool = False):
+        self.root = root
+        self.fail_open = fail_open
+        self.sessions = []
+        self.resets = 0
+
+    def _local(self, unc_path: str) -> Path:
+        server, share, *parts = unc_path.lstrip("\\").split("\\")
+        assert (server, share) == (settings.smb_server, settings.smb_share)
+        assert server in [session[0] for session in self.sessions], "no session registered"
+        return self.root.joinpath(*parts)
+
+    def register_session(self, server, username=None, password=None, connection_timeout=None):
+        self.sessions.append((server, username, password))
+
+    def makedirs(self, path, exist_ok=False):
+        self._local(path).mkdir(parents=True, exist_ok=exist_ok)
+
+    def open_file(self, path, mode="r"):
+        if self.fail_open:
+            raise ConnectionResetError("connection reset by peer")
+        return open(self._local(path), mode)
+
+    def reset_connection_cache(self):
+        self.resets += 1
+        self.sessions.clear()
+
+
+@pytest.fixture
+def fake_smb(tmp_path, monkeypatch):
+    client = _FakeSMBClient(tmp_path)
+    monkeypatch.setattr(smb_module, "smbclient", client)
+    monkeypatch.setattr(settings, "smb_server", "nas")
+    monkeypatch.setattr(settings, "smb_share", "documents")
+    monkeypatch.setattr(settings, "smb_username", "scanner")
+    monkeypatch.setattr(settings, "smb_password", "secret")
+    monkeypatch.setattr(settings, "smb_domain", "WORKGROUP")
+    monkeypatch.setattr(settings, "smb_default_path", "/Scans/")
+    return client
+
+
+def test_smb_writes_file_and_registers_session_once(fake_smb, tmp_path):
+    async def run():
+        sink = SMBSink()
+        first = await sink.store(_chunks(), _document("first.pdf"))
+        await sink.store(_chunks(), _document("second.pdf"))
+        await sink.close()
+        return first
+
+    location = asyncio.run(run())
+
+    assert location == r"\\nas\documents\Scans\first.pdf"
+    assert fake_smb.sessions == []  # cleared by close()
+    assert fake_smb.resets == 1
+    assert (tmp_path / "Scans" / "first.pdf").read_bytes() == PDF
+    assert (tmp_path / "Scans" / "second.pdf").read_bytes() == PDF
+
+
+def test_smb_failure_registers_a_new_session(fake_smb):
+    async def run():
+        sink = SMBSink()
+        fake_smb.fail_open = True
+        with pytest.raises(ConnectionResetError):
+            await sink.store(_chunks(), _document())
+        fake_smb.fail_open = False
+        await sink.store(_chunks(), _document())
+
+    asyncio.run(run())
+
+    assert [session[1] for session in fake_smb.sessions] == ["WORKGROUP\\scanner"] * 2
@@ -0,0 +1,87 @@
+import io
+from pathlib import Path
+import pytest
+from PyPDF2 import PdfReader
+from benchmarks.corpus import PageSpec, render_page
+from app.config import settings
+from app.routers import pdf as pdf_router
+
+PAGES = [render_page(PageSpec(resolution="a4_150dpi", seed=seed)) for seed in (0, 1)]
+
+
+@pytest.fixture
+def scratch_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "pdf_scratch_dir", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def page_sources(monkeypatch):
+    """Records the page sources each export was built from"""
+    recorded = []
+    build_pdf = pdf_router.build_pdf
+
+    async def recording_build_pdf(images, **kwargs):
+        recorded.append(["file" if isinstance(source, Path) else "memory" for source in images])
+        return await build_pdf(images, **kwargs)
+
+    monkeypatch.setattr(pdf_router, "build_pdf", recording_build_pdf)
+    return recorded
+
+
+def _files():
+    return [("pages", (f"page{idx}.jpg", page, "image/jpeg")) for idx, page in enumerate(PAGES)]
+
+
+@pytest.mark.parametrize("threshold, source_type", [(len(max(PAGES, key=len)) + 1, "memory"), (1024, "file")])
+def test_pages_are_kept_in_memory_or_spooled_by_size(
+    client, scratch_dir, page_sources, monkeypatch, threshold, source_type
+):
+    monkeypatch.setattr(settings, "upload_spool_threshold", threshold)
+
+    response = client.post("/api/pdf/generate-multipart", files=_files(), data={"title": "Multipart"})
+
+    assert response.status_code == 200
+    assert response.headers["X-Page-Count"] == "2"
+    assert PdfReader(io.BytesIO(response.content)).metadata.title == "Multipart"
+    assert page_sources == [[source_type, source_type]]
+
+
+def test_spool_files_are_removed_after_the_request(client, scratch_dir, page_sources, monkeypatch):
+    monkeypatch.setattr(settings, "upload_spool_threshold", 1024)
+
+    response = client.post("/api/pdf/generate-multipart", files=_files())
+
+    assert response.status_code == 200
+    assert page_sources == [["file", "file"]]
+    assert list(scratch_dir.glob("page-*.upload")) == []
+
+
+def test_truncated_body_is_a_bad_request(client, scratch_dir, monkeypatch):
+    monkeypatch.setattr(settings, "upload_spool_threshold", 1024)
+    body = (
+        b"--boundary\r\n"
+        b'Content-Disposition: form-data; name="pages"; filename="page.jpg"\r\n'
+        b"Content-Type: image/jpeg\r\n\r\n" + PAGES[0][:50_000]
+    )
+
+    response = client.post(
+        "/api/pdf/generate-multipart",
+        content=body,
+        headers={"Content-Type": "multipart/form-data; boundary=boundary"}
+    )
+
+    assert response.status_code == 400
+    assert "truncated" in response.json()["detail"]
+    assert list(scratch_dir.glob("page-*.upload")) == []
+
+
+def test_malformed_body_is_a_bad_request(client, scratch_dir):
+    response = client.post(
+        "/api/pdf/generate-multipart",
+        content=b"this is not multipart\r\n\r\n",
+        headers={"Content-Type": "multipart/form-data; boundary=boundary"}
+    )
+
+    assert response.status_code == 400
+    assert "Malformed multipart body" in response.json()["detail"]
@@ -72,9 +72,12 @@ Type=simple
 User=root
 WorkingDirectory=$PROJECT_DIR/backend
 Environment="PATH=$PROJECT_DIR/backend/venv/bin"
-ExecStart=$PROJECT_DIR/backend/venv/bin/uvicorn app.main:app --host 0.0.0.0 --port $BACKEND_PORT
+Environment="BACKEND_HOST=0.0.0.0" "BACKEND_PORT=$BACKEND_PORT"
+ExecStart=$PROJECT_DIR/backend/venv/bin/python -m app.server
 Restart=always
 RestartSec=10
+# Requests and then export jobs each get SERVER_DRAIN_TIMEOUT (60s) to finish
+TimeoutStopSec=150
 
 [Install]
 WantedBy=multi-user.target